@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for fencing and installman.
+
+    python3 benchmarks/bench.py                      # everything, printed as a table
+    python3 benchmarks/bench.py --quick -k find      # small inputs, names matching "find"
+    python3 benchmarks/bench.py --json run.json      # save machine readable results
+    python3 benchmarks/bench.py --baseline run.json  # compare with an earlier run
+
+Each case reports the median and best wall-clock time over several repeats,
+throughput for cases that process a known number of bytes and the peak
+memory allocated by Python during one extra traced run.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT / "python" / "fencing"), str(ROOT / "python" / "installman")]
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import generators  # noqa: E402
+from fencing import CodeFence, copy_block, copy_block_file, match_cache  # noqa: E402
+
+KB = 1024
+MB = 1024 * KB
+SIZES = [1 * KB, 100 * KB, 1 * MB, 10 * MB, 50 * MB]
+QUICK_SIZES = [1 * KB, 100 * KB, 1 * MB]
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[Any], object]
+    nbytes: int | None = None
+    # called before every repeat, its result is passed to run and not timed
+    setup: Callable[[], Any] = lambda: None
+
+
+@dataclass
+class Result:
+    name: str
+    times: list[float] = field(default_factory=list)
+    nbytes: int | None = None
+    peak_bytes: int = 0
+
+    def as_json(self) -> dict[str, Any]:
+        median = statistics.median(self.times)
+        data: dict[str, Any] = {
+            "median_s": median,
+            "min_s": min(self.times),
+            "repeats": len(self.times),
+            "peak_kb": self.peak_bytes / KB,
+        }
+        if self.nbytes is not None:
+            data["bytes"] = self.nbytes
+            data["throughput_mb_s"] = self.nbytes / MB / median if median else None
+        return data
+
+
+def clear_caches():
+    """Scans of the same text are cached, every repeat has to start cold."""
+    match_cache.clear()
+
+
+def block_count(size: int) -> int:
+    # thousands of blocks in the big files, a couple in the small ones
+    return max(2, min(5000, size // 500))
+
+
+def fencing_cases(tmp: Path, sizes: list[int]) -> list[Case]:
+    from installman import SingleFileChange
+
+    cases = []
+    for size in sizes:
+        label = f"{size // KB}KB" if size < MB else f"{size // MB}MB"
+        blocks = block_count(size)
+        text = generators.rc_text(size, blocks)
+        fence = CodeFence.symettric(generators.fence_marker(blocks // 2))
+
+        cases.append(
+            Case(
+                f"fencing.find_blocks[{label}]",
+                lambda _, text=text, fence=fence: fence.find_blocks(text),
+                nbytes=len(text),
+                setup=clear_caches,
+            )
+        )
+
+        source = tmp / f"source-{label}.sh"
+        marker = generators.fence_marker(blocks // 2)
+        source.write_text(f"{marker}\necho new\n{marker}\n")
+        cases.append(
+            Case(
+                f"fencing.copy_block[{label}]",
+                lambda _, text=text, fence=fence, source=source: copy_block(
+                    fence, source, text, replace=True
+                ),
+                nbytes=len(text),
+                setup=clear_caches,
+            )
+        )
+
+        target = tmp / f"target-{label}.sh"
+        target.write_text(text)
+        cases.append(
+            Case(
+                f"fencing.copy_block_file[{label}]",
+                lambda _, fence=fence, source=source, target=target: copy_block_file(
+                    fence, source, target, replace=True
+                ),
+                nbytes=len(text),
+                # put the old block back so every repeat has something to replace
+                setup=lambda target=target, text=text: target.write_text(text),
+            )
+        )
+
+        _, after, _ = copy_block(fence, source, text, replace=True)
+        change = SingleFileChange(text, after, tmp / "zshrc")
+        cases.append(
+            Case(
+                f"installman.SingleFileChange.diff[{label}]",
+                lambda _, change=change: change.diff(),
+                nbytes=len(text),
+            )
+        )
+    return cases
+
+
+def discovery_cases(tmp: Path, quick: bool) -> list[Case]:
+    import installman
+    from installman.discovery import discover
+    from installman.manifest import Manifest
+
+    installers = 20 if quick else 200
+    root = tmp / "dotfiles"
+    generators.dotfiles_tree(
+        root, installers=installers, node_modules=50 if quick else 1000
+    )
+    manifest = tmp / "manifest.json"
+
+    load = installman.__import_and_get_installers
+    scripts = discover(root).scripts
+    # the first load imports every script, after that it should be stat calls
+    Manifest.load(root, scripts, load, path=manifest)
+
+    return [
+        Case(f"installman.discover[{installers} installers]", lambda _: discover(root)),
+        Case(
+            f"installman.discover.parallel[{installers} installers]",
+            lambda _: discover(root, parallel=True),
+        ),
+        Case(
+            f"installman.Manifest.load.warm[{installers} installers]",
+            lambda _: Manifest.load(root, discover(root).scripts, load, path=manifest),
+        ),
+    ]
+
+
+def symlink_cases(tmp: Path, quick: bool) -> list[Case]:
+    from installman import symlink_rec
+
+    source = tmp / "nvim"
+    files = generators.nvim_tree(source, depth=3 if quick else 4)
+    counter = iter(range(1_000_000))
+
+    def fresh_destination() -> Path:
+        return tmp / f"linked-{next(counter)}"
+
+    warm = tmp / "linked-warm"
+    symlink_rec(source, warm, quiet=True)
+
+    return [
+        Case(
+            f"installman.symlink_rec.cold[{files} files]",
+            lambda dest: symlink_rec(source, dest, quiet=True),
+            setup=fresh_destination,
+        ),
+        Case(
+            f"installman.symlink_rec.warm[{files} files]",
+            lambda _: symlink_rec(source, warm, quiet=True),
+        ),
+    ]
+
+
+def measure(case: Case, repeats: int, budget: float) -> Result:
+    result = Result(case.name, nbytes=case.nbytes)
+    spent = 0.0
+    for i in range(repeats):
+        arg = case.setup()
+        start = time.perf_counter()
+        case.run(arg)
+        elapsed = time.perf_counter() - start
+        result.times.append(elapsed)
+        spent += elapsed
+        # slow cases get fewer repeats, but always at least three
+        if i >= 2 and spent > budget:
+            break
+
+    arg = case.setup()
+    tracemalloc.start()
+    case.run(arg)
+    _, result.peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float):
+    """Print the change against a baseline run, returns the regressed cases."""
+    regressed = []
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        ratio = current["median_s"] / before["median_s"] if before["median_s"] else 1
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressed.append(name)
+        print(f"{name:<55} {ratio:6.2f}x{flag}")
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="benchmark fencing and installman")
+    parser.add_argument("--quick", action="store_true", help="small inputs only")
+    parser.add_argument("-k", dest="match", help="only cases whose name contains this")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument(
+        "--budget", type=float, default=2.0, help="seconds to spend per case"
+    )
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument("--baseline", type=Path, help="compare with this results file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="slowdown against the baseline that counts as a regression",
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="exit non-zero if any case regressed",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="installman-bench-") as tmpdir:
+        tmp = Path(tmpdir)
+        os.environ["INSTALLMAN_STATE_DIR"] = str(tmp / "state")
+        cases = [
+            *fencing_cases(tmp, QUICK_SIZES if args.quick else SIZES),
+            *discovery_cases(tmp, args.quick),
+            *symlink_cases(tmp, args.quick),
+        ]
+        if args.match:
+            cases = [c for c in cases if args.match in c.name]
+
+        results: dict[str, Any] = {}
+        for case in cases:
+            result = measure(case, args.repeats, args.budget)
+            data = results[case.name] = result.as_json()
+            throughput = data.get("throughput_mb_s")
+            print(
+                f"{case.name:<55} {data['median_s'] * 1000:10.3f}ms"
+                + (f" {throughput:9.1f}MB/s" if throughput else " " * 14)
+                + f" {data['peak_kb']:10.1f}KB peak",
+                flush=True,
+            )
+
+    output = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.time(),
+        },
+        "results": results,
+    }
+    if args.json:
+        args.json.write_text(json.dumps(output, indent=1, sort_keys=True))
+
+    if args.baseline:
+        print(f"\ncompared with {args.baseline}:")
+        regressed = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+        if regressed and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
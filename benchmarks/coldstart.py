@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Cold start check for install.py, meant to fail when start up gets slower.
+
+    python3 benchmarks/coldstart.py                        # the commands below
+    python3 benchmarks/coldstart.py -- bin --help          # any other command
+    python3 benchmarks/coldstart.py --budget-ms 80 -n 20   # looser budget, more runs
+
+Every run is a fresh interpreter under `-X importtime`. The import time
+reported is the cumulative time of the modules install.py brings in on top
+of what a bare `python -c pass` already imports, so interpreter start up
+doesn't count against the budget. The check fails if the median of that is
+over the budget, or if any of the modules that should only load when they
+are used (asyncio, subprocess, fencing, ...) shows up. Without a command,
+every one in DEFAULT_COMMANDS is checked.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# none of these are needed to parse arguments or print help
+DEFAULT_FORBIDDEN = [
+    "asyncio",
+    "subprocess",
+    "difflib",
+    "concurrent.futures",
+    "tempfile",
+    "fencing",
+    "hashlib",
+    # dataclasses imports it
+    "inspect",
+    "typing",
+]
+
+# what the `di` wrappers run most, with the modules each may not import
+DEFAULT_COMMANDS = {
+    ("--help",): DEFAULT_FORBIDDEN,
+    # zsh/install.py defines its CodeFences at import time
+    ("zsh", "--help"): [m for m in DEFAULT_FORBIDDEN if m != "fencing"],
+}
+
+
+@dataclass
+class Run:
+    wall: float
+    # module -> cumulative import time in seconds, top level imports only
+    imports: dict[str, float]
+    loaded: set[str]
+
+
+def _env() -> dict[str, str]:
+    env = dict(os.environ)
+    paths = [str(ROOT / "python" / "fencing"), str(ROOT / "python" / "installman")]
+    if env.get("PYTHONPATH"):
+        paths.append(env["PYTHONPATH"])
+    env["PYTHONPATH"] = os.pathsep.join(paths)
+    # stale bytecode would time the compiler instead of the imports
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def _parse_importtime(stderr: str) -> tuple[dict[str, float], set[str]]:
+    imports: dict[str, float] = {}
+    loaded: set[str] = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        loaded.add(name.strip())
+        # nested imports are indented by two more spaces per level
+        if not name.startswith("  "):
+            imports[name.strip()] = int(cumulative) / 1e6
+    return imports, loaded
+
+
+def run(argv: list[str]) -> Run:
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        cwd=ROOT,
+        env=_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    imports, loaded = _parse_importtime(completed.stderr)
+    return Run(wall, imports, loaded)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    _ = parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=50.0,
+        help="most import time install.py may add to interpreter start up",
+    )
+    _ = parser.add_argument(
+        "-n", "--repeat", type=int, default=10, help="fresh interpreters to time"
+    )
+    _ = parser.add_argument(
+        "--forbid",
+        nargs="*",
+        help="modules that must not be imported, by default DEFAULT_FORBIDDEN",
+    )
+    _ = parser.add_argument(
+        "--top", type=int, default=10, help="slowest imports to list"
+    )
+    _ = parser.add_argument(
+        "command",
+        nargs="*",
+        help="arguments for install.py, after a --, by default DEFAULT_COMMANDS",
+    )
+    args = parser.parse_args()
+
+    if args.command:
+        commands = {tuple(args.command): DEFAULT_FORBIDDEN}
+    else:
+        commands = DEFAULT_COMMANDS
+    baseline = run(["-c", "pass"])
+    ok = True
+    for command, forbid in commands.items():
+        if args.forbid is not None:
+            forbid = args.forbid
+        ok = check(list(command), forbid, baseline, args) and ok
+    return 0 if ok else 1
+
+
+def check(
+    command: list[str], forbid: list[str], baseline: Run, args: argparse.Namespace
+) -> bool:
+    """Time install.py with command and report, returning whether it passed."""
+    argv = [str(ROOT / "install.py"), *command]
+    # writes bytecode and the installer manifest, so the timed runs are warm
+    _ = run(argv)
+
+    bare = [run(["-c", "pass"]).wall for _ in range(args.repeat)]
+    runs = [run(argv) for _ in range(args.repeat)]
+
+    def added(r: Run) -> dict[str, float]:
+        return {m: t for m, t in r.imports.items() if m not in baseline.loaded}
+
+    import_times = [sum(added(r).values()) for r in runs]
+    median_imports = statistics.median(import_times)
+    median_wall = statistics.median(r.wall for r in runs)
+    median_bare = statistics.median(bare)
+
+    print(f"install.py {' '.join(command)}")
+    print(
+        f"  wall      {median_wall * 1000:8.1f}ms"
+        f"  (bare python {median_bare * 1000:.1f}ms)"
+    )
+    print(
+        f"  imports   {median_imports * 1000:8.1f}ms"
+        f"  (budget {args.budget_ms:.1f}ms)"
+    )
+
+    slowest = sorted(added(runs[-1]).items(), key=lambda item: -item[1])
+    for module, seconds in slowest[: args.top]:
+        print(f"    {seconds * 1000:8.1f}ms  {module}")
+
+    ok = True
+    forbidden = sorted({m for r in runs for m in r.loaded} & set(forbid))
+    if forbidden:
+        print(f"FAIL imported at start up: {', '.join(forbidden)}")
+        ok = False
+    if median_imports * 1000 > args.budget_ms:
+        print(f"FAIL imports took {median_imports * 1000:.1f}ms, over the budget")
+        ok = False
+    if ok:
+        print("ok")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Synthetic inputs for the benchmarks: rc files full of fenced blocks,
+dotfiles trees shaped like this repo and nvim configs.
+"""
+
+import random
+from pathlib import Path
+
+FILLER = [
+    'alias ll="ls -la"\n',
+    'export PATH="$HOME/.local/bin:$PATH"\n',
+    "bindkey '^p' up-line-or-search\n",
+    "# a comment that is just here to take up some space in the file\n",
+    'function proj {\n    cd "$(list-git-repos)"\n}\n',
+]
+
+
+def fence_marker(i: int) -> str:
+    return f"### BLOCK {i} ###"
+
+
+def rc_text(size: int, blocks: int, seed: int = 0) -> str:
+    """An rc file of roughly `size` bytes with `blocks` symmetric fenced blocks.
+
+    Block i is delimited by `fence_marker(i)` lines, spread evenly through the
+    file with filler lines in between.
+    """
+    rng = random.Random(seed)
+    per_gap = max(size // max(blocks + 1, 1), 1)
+    parts: list[str] = []
+    written = 0
+
+    def fill(amount: int):
+        nonlocal written
+        target = written + amount
+        while written < target:
+            line = rng.choice(FILLER)
+            parts.append(line)
+            written += len(line)
+
+    for i in range(blocks):
+        fill(per_gap)
+        marker = fence_marker(i)
+        body = f"echo block {i}\n"
+        parts.append(f"{marker}\n{body}{marker}\n")
+        written += 2 * len(marker) + len(body) + 2
+    fill(max(size - written, 0))
+    return "".join(parts)
+
+
+def rc_file(directory: Path, size: int, blocks: int, name: str = "zshrc") -> Path:
+    path = directory / name
+    path.write_text(rc_text(size, blocks))
+    return path
+
+
+def nvim_tree(root: Path, depth: int = 4, fanout: int = 4, files: int = 6) -> int:
+    """A deep lua/plugins style hierarchy, returns the number of files made."""
+    made = 0
+
+    def make(directory: Path, level: int):
+        nonlocal made
+        directory.mkdir(parents=True, exist_ok=True)
+        for f in range(files):
+            (directory / f"module_{f}.lua").write_text(f"return {{ level = {level} }}\n")
+            made += 1
+        if level < depth:
+            for d in range(fanout):
+                make(directory / f"dir_{d}", level + 1)
+
+    make(root, 1)
+    return made
+
+
+def dotfiles_tree(
+    root: Path,
+    installers: int = 50,
+    nvim_depth: int = 4,
+    node_modules: int = 200,
+) -> None:
+    """A dotfiles root with many install.py scripts, an nvim-style tree and a
+    vendored node_modules directory that discovery should never enter."""
+    for i in range(installers):
+        tool = root / f"tool{i}"
+        tool.mkdir(parents=True)
+        (tool / "install.py").write_text(
+            "from installman import installer\n\n\n"
+            f'@installer("tool{i}", help="install tool {i}")\n'
+            f"def install_tool{i}(args):\n"
+            "    pass\n"
+        )
+        (tool / "config").write_text(f"setting = {i}\n")
+
+    nvim_tree(root / "nvim" / "lua", depth=nvim_depth)
+
+    modules = root / "karabiner" / "node_modules"
+    for i in range(node_modules):
+        package = modules / f"pkg{i}" / "lib"
+        package.mkdir(parents=True)
+        (package / "index.js").write_text("module.exports = {}\n")
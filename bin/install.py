@@ -5,36 +5,63 @@ from installman import installer
 
 HERE = Path(__file__).parent.parent
 HOME = Path.home()
+TARGET_BIN = HOME / ".local" / "bin"
+
+
+def selected_scripts(args: Namespace) -> list[Path]:
+    source_bin = HERE / "bin"
+    if args.config[0] == "all":
+        return sorted(source_bin.glob("*"))
+    return [source_bin / script for script in args.config]
 
 
 @installer(
     "bin",
+    all_args=["all"],
+    inputs=selected_scripts,
+    outputs=lambda args: [TARGET_BIN / s.name for s in selected_scripts(args)],
     help="pick scripts from the bin to install. use 'all' to grab everything",
 )
 def install_bin(args: Namespace):
-    target_bin = Path("~/.local/bin").expanduser()
-    source_bin = HERE / "bin"
-
-    if args.config[0] == "all":
-        scripts = source_bin.glob("*")
-    else:
-        scripts = [source_bin / script for script in args.config]
+    target_bin = TARGET_BIN
 
-    for source in scripts:
+    for source in selected_scripts(args):
         if source.is_file():
-            (target_bin / source.name).symlink_to(source)
+            target = target_bin / source.name
+            if target.is_symlink() and target.resolve() == source.resolve():
+                continue
+            target.symlink_to(source)
             print(f"symlinked {source} to {target_bin / source.name}")
 
 
+class BinChoices:
+    """Scripts in bin/ that can be installed, only listed if --help needs them.
+
+    Checking an argument is a single stat, so building the parser doesn't
+    have to read the directory. The completion lists `directory`, and is made
+    again whenever its listing changes.
+    """
+
+    directory = HERE / "bin"
+
+    def __contains__(self, name: object) -> bool:
+        if name == "all":
+            return True
+        if not isinstance(name, str) or "/" in name or name == "install.py":
+            return False
+        return (self.directory / name).is_file()
+
+    def __iter__(self):
+        yield "all"
+        for p in sorted(self.directory.glob("*")):
+            if p.is_file() and p.name != "install.py":
+                yield p.name
+
+
 @install_bin.parser
 def setup_bin_args(parser: ArgumentParser):
-    bin_choices = ["all"] + [
-        p.name
-        for p in (HERE / "bin").glob("*")
-        if p.is_file() and p.name != "install.py"
-    ]
     parser.add_argument(
         "config",
         nargs="+",
-        choices=bin_choices,
+        choices=BinChoices(),
     )
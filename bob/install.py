@@ -1,26 +1,61 @@
 #!/usr/bin/env python3
+import asyncio
+import subprocess
 from argparse import ArgumentParser, Namespace
-from os import system
-from shutil import which
+from pathlib import Path
 
-from installman import dependency, installer
+from installman import dependency, installer, note_skipped, run_command
+
+# building bob from source can take a while on a fresh machine
+CARGO_TIMEOUT = 30 * 60
+BOB_TIMEOUT = 10 * 60
 
 
 @installer("bob", help="install bob (neovim version manager)")
-def install_bob(args: Namespace):
-    bob = which("bob")
-    cargo = which("cargo")
+async def install_bob(args: Namespace):
+    bob = dependency("bob")
+    cargo = dependency("cargo")
+
+    if not bob and not cargo:
+        print("I need cargo to install bob --- install rust first")
+        note_skipped()
+        return
+
+    try:
+        await _install(bob, cargo)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        print(f"Failed to install bob: {e}")
+        note_skipped()
 
+
+async def _install(bob: str | None, cargo: str | None):
     if not bob:
-        if not cargo:
-            print("I need cargo to install bob --- install rust first")
-            return
-        system("cargo install --git https://github.com/MordechaiHadad/bob.git")
-
-    bob_path = bob or "~/.cargo/bin/bob"
-    system(f"{bob_path} install nightly")
-    system(f"{bob_path} install v0.11.4")
-    system(f"{bob_path} use v0.11.4")
+        assert cargo is not None
+        await run_command(
+            [cargo, "install", "--git", "https://github.com/MordechaiHadad/bob.git"],
+            timeout=CARGO_TIMEOUT,
+        )
+
+    bob_path = bob or str(Path("~/.cargo/bin/bob").expanduser())
+    # the two downloads don't depend on each other, but both have to finish
+    # (or fail) before bob can switch versions
+    results = await asyncio.gather(
+        run_command(
+            [bob_path, "install", "nightly"],
+            timeout=BOB_TIMEOUT,
+            prefix="[bob nightly] ",
+        ),
+        run_command(
+            [bob_path, "install", "v0.11.4"],
+            timeout=BOB_TIMEOUT,
+            prefix="[bob v0.11.4] ",
+        ),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    await run_command([bob_path, "use", "v0.11.4"], timeout=BOB_TIMEOUT)
 
 
 @install_bob.parser
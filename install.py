@@ -1,5 +1,5 @@
-import subprocess
 import sys
+from importlib.util import find_spec
 from pathlib import Path
 
 HERE = Path(__file__).parent
@@ -10,20 +10,18 @@ def ensure_module_installed() -> None:
 
     This is idempotent because pip install -e will skip installation if the
     package is already installed in editable mode from the same path.
+
+    Only looks for the packages, importing fencing here would put it on the
+    start up path of every command, most of which never use it.
     """
-    try:
-        import fencing
-    except ModuleNotFoundError:
-        subprocess.run(
-            [sys.executable, "-m", "pip", "install", str(HERE / "python/fencing")]
-        )
-
-    try:
-        import installman
-    except ModuleNotFoundError:
-        subprocess.run(
-            [sys.executable, "-m", "pip", "install", str(HERE / "python/installman")]
-        )
+    for module, path in (
+        ("fencing", "python/fencing"),
+        ("installman", "python/installman"),
+    ):
+        if find_spec(module) is None:
+            import subprocess
+
+            subprocess.run([sys.executable, "-m", "pip", "install", str(HERE / path)])
 
 
 if __name__ == "__main__":
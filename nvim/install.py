@@ -8,7 +8,7 @@ HERE = Path(__file__).parent
 HOME = Path.home()
 
 
-@installer("nvim", help="install neovim config, or parts of it")
+@installer("nvim", all_args=["all"], help="install neovim config, or parts of it")
 def install_nvim(args: Namespace):
     if args.mode == "all":
         nvim_path = HOME / ".config/nvim"
@@ -1,17 +1,41 @@
-import difflib
+from __future__ import annotations
+
+import os
 import re
-from dataclasses import dataclass
-from functools import cached_property, lru_cache
+from collections import namedtuple
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from functools import cached_property
+from itertools import islice
 from pathlib import Path
 
+# Installers import fencing for their CodeFences, so this module is on the
+# start up path of commands that never scan a file. Everything else is
+# imported where it is used, typing only by type checkers, and the records
+# below are namedtuples and plain classes because dataclasses imports inspect.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import mmap
+    from typing import IO, Literal
+
+# (start, end) offsets of a marker match
+Span = tuple[int, int]
+
+
+class FencedBlock(
+    namedtuple(
+        "FencedBlock",
+        ["content_location", "block_location", "content", "text", "source_path"],
+        defaults=[None],
+    )
+):
+    __slots__ = ()
 
-@dataclass(frozen=True)
-class FencedBlock:
     content_location: tuple[int, int]
     block_location: tuple[int, int]
     content: str
     text: str
-    source_path: Path | None = None
+    source_path: Path | None
 
     def append_to(self, path: Path):
         """
@@ -37,11 +61,144 @@ class FencedBlock:
         return new_file_content
 
 
-@dataclass(frozen=True)
+class MatchCache:
+    """Marker matches of recently scanned content, bounded by size.
+
+    Entries are keyed by the pattern and a digest of the content, so the
+    content itself is never kept alive, and hold plain (start, end) offsets
+    rather than match objects. The least recently used entries are dropped
+    once the (approximate) size of the cached offsets exceeds `max_bytes`.
+    One cache is shared by every CodeFence and FenceSet, see `match_cache`.
+    """
+
+    # rough overhead of one entry: its key, the list and the dict slot
+    ENTRY_BYTES = 64
+    # rough size of one cached match: a tuple of two small ints
+    SPAN_BYTES = 72
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        import threading
+        from collections import OrderedDict
+
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple[str, int, bytes], tuple[int, list]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(pattern: re.Pattern[str], content: str) -> tuple[str, int, bytes]:
+        import hashlib
+
+        digest = hashlib.blake2b(
+            content.encode("utf-8", "surrogatepass"), digest_size=16
+        ).digest()
+        return pattern.pattern, pattern.flags, digest
+
+    def _get(self, key: tuple[str, int, bytes], compute: Callable[[], list]) -> list:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+        cost = self.ENTRY_BYTES + self.SPAN_BYTES * len(value)
+        with self._lock:
+            if key in self._entries or cost > self.max_bytes:
+                return value
+            self._entries[key] = (cost, value)
+            self.size += cost
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+        return value
+
+    def spans(self, pattern: re.Pattern[str], content: str) -> list[Span]:
+        """(start, end) of every match of pattern in content."""
+
+        def compute() -> list[Span]:
+            if _is_literal(pattern.pattern):
+                return list(_find_literal(pattern.pattern, content))
+            return [m.span() for m in pattern.finditer(content)]
+
+        return self._get(self._key(pattern, content), compute)
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> str:
+        return (
+            f"{len(self._entries)} entries, {self.size} bytes, "
+            f"{self.hits} hits, {self.misses} misses, {self.evictions} evictions"
+        )
+
+
+match_cache = MatchCache()
+
+_REGEX_SPECIAL = frozenset(".^$*+?{}[]\\|()")
+
+
+def _is_literal(marker: str) -> bool:
+    """Whether marker matches only itself, so str.find can stand in for re."""
+    return bool(marker) and not _REGEX_SPECIAL.intersection(marker)
+
+
+def _find_literal(marker: str, content: str) -> Iterator[Span]:
+    """Non-overlapping occurrences of marker, like re.finditer would find."""
+    position = content.find(marker)
+    while position != -1:
+        end = position + len(marker)
+        yield position, end
+        position = content.find(marker, end)
+
+
 class CodeFence:
+    """The start and end markers (regexes) around a block. Immutable."""
+
+    __slots__ = ("start", "end", "__dict__")
+
     start: str
     end: str
 
+    def __init__(self, start: str, end: str):
+        object.__setattr__(self, "start", start)
+        object.__setattr__(self, "end", end)
+
+    def __setattr__(self, name: str, value: object):
+        raise AttributeError(f"cannot assign to field {name!r}")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"cannot delete field {name!r}")
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.start, self.end) == (other.start, other.end)
+
+    def __hash__(self) -> int:
+        return hash((self.start, self.end))
+
+    def __repr__(self) -> str:
+        return f"CodeFence(start={self.start!r}, end={self.end!r})"
+
+    def __reduce__(self):
+        # the compiled patterns are left behind, they are cheap to rebuild
+        return CodeFence, (self.start, self.end)
+
     @staticmethod
     def symettric(start: str):
         return CodeFence(start, start)
@@ -54,53 +211,519 @@ class CodeFence:
     def end_pattern(self):
         return re.compile(self.end)
 
+    @cached_property
+    def byte_patterns(self) -> tuple[re.Pattern[bytes], re.Pattern[bytes]]:
+        """start and end patterns for matching utf-8 encoded bytes"""
+        return re.compile(self.start.encode()), re.compile(self.end.encode())
+
     @property
     def is_symmetric(self):
         return self.start == self.end
 
-    @lru_cache
-    def _find_matches(self, pattern: re.Pattern[str], content: str):
-        """
-        currently just re.finditer; here in case this changes later.
+    def _find_matches(self, pattern: re.Pattern[str], content: str) -> list[Span]:
+        """(start, end) of every match of pattern, for find_blocks.
 
-        this method also handles the caching.
+        Results are cached in `match_cache`, and literal markers are found
+        with str.find instead of re (see `_is_literal`).
         """
-        return list(pattern.finditer(content))
+        return match_cache.spans(pattern, content)
 
-    def _find_starts(self, content: str):
-        matches = self._find_matches(self.start_pattern, content)
+    def _iter_matches(self, pattern: re.Pattern[str], content: str) -> Iterator[Span]:
+        if _is_literal(pattern.pattern):
+            return _find_literal(pattern.pattern, content)
+        return (m.span() for m in pattern.finditer(content))
 
+    def iter_blocks(
+        self, content: str, source_path: Path | None = None
+    ) -> Iterator[FencedBlock]:
+        """Blocks in order, found as they are asked for.
+
+        Unlike find_blocks this scans only as far as the blocks taken and
+        doesn't go through the match cache.
+        """
+        starts = self._iter_matches(self.start_pattern, content)
         if self.is_symmetric:
-            # if start and end are the same, the starts the first match, then every second match
-            return matches[::2]
+            # the matches alternate start, end, start, end...
+            ends = starts
+        else:
+            ends = self._iter_matches(self.end_pattern, content)
 
-        # otherwise, the starts are all the matches
-        return matches
+        for start_start, start_end in starts:
+            end = next(ends, None)
+            if end is None:
+                return
+            end_start, end_end = end
+            yield FencedBlock(
+                content_location=(start_end, end_start),
+                block_location=(start_start, end_end),
+                text=content[start_start:end_end],
+                content=content[start_end:end_start],
+                source_path=source_path,
+            )
 
-    def _find_ends(self, content: str):
-        matches = self._find_matches(self.end_pattern, content)
-        if self.is_symmetric:
-            # if start and end are the same, the ends are every second match (skipping the first)
-            return matches[1::2]
-        return matches
+    def first_block(
+        self, content: str, source_path: Path | None = None
+    ) -> FencedBlock | None:
+        """The first block, scanning no further than its end marker."""
+        return next(self.iter_blocks(content, source_path), None)
+
+    def count_blocks(self, content: str, limit: int | None = 2) -> int:
+        """Number of blocks, counting no further than limit."""
+        return sum(1 for _ in islice(self.iter_blocks(content), limit))
 
     def find_blocks(self, content: str, source_path: Path | None = None):
-        starts = self._find_starts(content)
-        ends = self._find_ends(content)
-        # TODO: handle missing end blocks
-        # atleast the last end could be omitted
-        startends = zip(starts, ends)
+        return self._pair(
+            self._find_matches(self.start_pattern, content),
+            self._find_matches(self.end_pattern, content),
+            content,
+            source_path,
+        )
 
+    def _pair(
+        self,
+        start_matches: list[Span],
+        end_matches: list[Span],
+        content: str,
+        source_path: Path | None = None,
+    ) -> list[FencedBlock]:
+        """Pair up start and end marker matches into blocks."""
         return [
             FencedBlock(
-                content_location=(smatch.end(0), ematch.start(0)),
-                block_location=(smatch.start(0), ematch.end(0)),
-                text=content[smatch.start(0) : ematch.end(0)],
-                content=content[smatch.end(0) : ematch.start(0)],
+                content_location=content_location,
+                block_location=block_location,
+                text=content[block_location[0] : block_location[1]],
+                content=content[content_location[0] : content_location[1]],
                 source_path=source_path,
             )
-            for smatch, ematch in startends
+            for block_location, content_location in self._pair_spans(
+                start_matches, end_matches
+            )
+        ]
+
+    def _pair_spans(
+        self, start_matches: list[Span], end_matches: list[Span]
+    ) -> list[tuple[Span, Span]]:
+        """(block location, content location) of every block."""
+        if self.is_symmetric:
+            # if start and end are the same, the starts are every other match
+            # beginning with the first, the ends every other match after it
+            starts, ends = start_matches[::2], start_matches[1::2]
+        else:
+            starts, ends = start_matches, end_matches
+        # TODO: handle missing end blocks
+        # atleast the last end could be omitted
+        return [
+            ((start_start, end_end), (start_end, end_start))
+            for (start_start, start_end), (end_start, end_end) in zip(starts, ends)
+        ]
+
+
+class FenceSet:
+    """Many fences, found with a single scan of the content.
+
+    Plain string markers (the usual `### NAME ###`) of every fence are
+    compiled into one trie shaped regex, which writes their common prefixes
+    once and lets re skip ahead to candidates like it does for a single
+    literal, so finding the blocks of N fences reads the content once
+    instead of 2N times. Markers are tried longest first; two different
+    markers matching overlapping text only count once. Markers that are
+    regexes are scanned on their own.
+    """
+
+    def __init__(self, fences: Iterable[CodeFence]):
+        # dict keeps the order fences were given in, without duplicates
+        self.fences = tuple(dict.fromkeys(fences))
+        markers = dict.fromkeys(
+            m for fence in self.fences for m in (fence.start, fence.end)
+        )
+        self.literals = [m for m in markers if _is_literal(m)]
+        self.regexes = [m for m in markers if not _is_literal(m)]
+
+    @cached_property
+    def pattern(self) -> re.Pattern[str] | None:
+        """One pattern for all the literal markers."""
+        if not self.literals:
+            return None
+        return re.compile(_trie_pattern(self.literals))
+
+    def scan(
+        self, content: str, source_path: Path | None = None
+    ) -> dict[CodeFence, list[FencedBlock]]:
+        """Find the blocks of every fence in content.
+
+        Returns:
+            Every fence in the set, mapped to its blocks in order of appearance
+        """
+        matches: dict[str, list[Span]] = {m: [] for m in self.literals}
+        if self.pattern is not None:
+            # a literal marker is exactly the text it matched
+            for start, end in match_cache.spans(self.pattern, content):
+                matches[content[start:end]].append((start, end))
+        for marker in self.regexes:
+            matches[marker] = match_cache.spans(re.compile(marker), content)
+
+        return {
+            fence: fence._pair(
+                matches[fence.start], matches[fence.end], content, source_path
+            )
+            for fence in self.fences
+        }
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """A regex matching any of words, longest first, with shared prefixes
+    written once: ["ab", "ac", "a"] becomes "a(?:b|c)?"."""
+    trie: dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict[str, dict]) -> str:
+        branches = [
+            re.escape(char) + build(child) for char, child in node.items() if char
+        ]
+        if not branches:
+            return ""
+        if len(branches) > 1:
+            body = f"(?:{'|'.join(branches)})"
+        elif "" in node:
+            body = f"(?:{branches[0]})"
+        else:
+            return branches[0]
+        # a word ending here makes the rest optional, longer matches first
+        return body + "?" if "" in node else body
+
+    return build(trie)
+
+
+class _Piece:
+    """A run of plain text (fence is None) or one fenced block."""
+
+    __slots__ = ("index", "fence", "start", "content", "end", "origin")
+
+    def __init__(
+        self,
+        index: int,
+        content: str,
+        fence: CodeFence | None = None,
+        start="",
+        end="",
+        origin: int | None = None,
+    ):
+        # pieces are only ever added at the end, so this never changes
+        self.index = index
+        self.fence = fence
+        self.start = start
+        self.content = content
+        self.end = end
+        # (offset, length) in the text the document was made from
+        self.origin = (origin, len(self)) if origin is not None else None
+
+    def __len__(self):
+        return len(self.start) + len(self.content) + len(self.end)
+
+
+class FencedDocument:
+    """Text with the blocks of some fences indexed, editable without rescanning.
+
+    The text is split once into pieces, plain text between blocks and one
+    piece per block, so replacing, appending or removing a block changes a
+    single piece. Block offsets are worked out from the piece lengths when
+    asked for, and only from the first edited piece onwards, so N edits cost
+    O(N + edited bytes) plus one join for the final `text`.
+
+    Raises:
+        ValueError: if blocks of different fences overlap
+    """
+
+    def __init__(self, text: str, fences: Iterable[CodeFence]):
+        fence_set = FenceSet(fences)
+        found = [
+            (block.block_location, block.content_location, fence)
+            for fence, blocks in fence_set.scan(text).items()
+            for block in blocks
         ]
+        found.sort(key=lambda b: b[0])
+
+        self._pieces: list[_Piece] = []
+        self._blocks: dict[CodeFence, list[_Piece]] = {
+            fence: [] for fence in fence_set.fences
+        }
+        position = 0
+        for (start, end), (content_start, content_end), fence in found:
+            if start < position:
+                raise ValueError(f"{fence} overlaps another block, can't index it")
+            if start > position:
+                self._add(
+                    _Piece(len(self._pieces), text[position:start], origin=position)
+                )
+            piece = _Piece(
+                len(self._pieces),
+                text[content_start:content_end],
+                fence,
+                start=text[start:content_start],
+                end=text[content_end:end],
+                origin=start,
+            )
+            self._add(piece)
+            position = end
+        if position < len(text):
+            self._add(_Piece(len(self._pieces), text[position:], origin=position))
+
+        self._length = self._original_length = len(text)
+        self._text: str | None = text
+        self._changed: set[int] = set()
+        # start offset of each piece, correct up to (not including) _valid
+        self._offsets: list[int] = []
+        self._valid = 0
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "".join(
+                p.start + p.content + p.end if p.fence else p.content
+                for p in self._pieces
+            )
+        return self._text
+
+    def __len__(self):
+        return self._length
+
+    def _add(self, piece: _Piece):
+        self._pieces.append(piece)
+        if piece.fence is not None:
+            self._blocks.setdefault(piece.fence, []).append(piece)
+
+    def _edited(self, piece: _Piece, delta: int):
+        self._text = None
+        self._length += delta
+        self._changed.add(piece.index)
+        # offsets of the pieces before this one are still right
+        self._valid = min(self._valid, piece.index)
+
+    def _offset(self, index: int) -> int:
+        if self._valid <= index:
+            del self._offsets[self._valid :]
+            position = (
+                self._offsets[-1] + len(self._pieces[self._valid - 1])
+                if self._valid
+                else 0
+            )
+            for piece in self._pieces[self._valid : index + 1]:
+                self._offsets.append(position)
+                position += len(piece)
+            self._valid = index + 1
+        return self._offsets[index]
+
+    def changes(self) -> list[tuple[Span, Span]]:
+        """(range in the original text, range in `text`) of every edit, in order.
+
+        Added blocks have an empty range at the end of the original text,
+        removed ones an empty range in `text`.
+        """
+        regions: list[tuple[Span, Span]] = []
+        for index in sorted(self._changed):
+            piece = self._pieces[index]
+            origin, length = piece.origin or (self._original_length, 0)
+            offset = self._offset(index)
+            regions.append(((origin, origin + length), (offset, offset + len(piece))))
+        return regions
+
+    def blocks(self, fence: CodeFence) -> list[FencedBlock]:
+        """The blocks of fence at their current offsets."""
+        blocks = []
+        for piece in self._blocks.get(fence, []):
+            offset = self._offset(piece.index)
+            content_start = offset + len(piece.start)
+            content_end = content_start + len(piece.content)
+            blocks.append(
+                FencedBlock(
+                    content_location=(content_start, content_end),
+                    block_location=(offset, content_end + len(piece.end)),
+                    content=piece.content,
+                    text=piece.start + piece.content + piece.end,
+                )
+            )
+        return blocks
+
+    def replace(self, fence: CodeFence, content: str, index: int = 0):
+        """Replace the content of the index-th block of fence."""
+        piece = self._blocks[fence][index]
+        delta = len(content) - len(piece.content)
+        piece.content = content
+        self._edited(piece, delta)
+
+    def append(self, fence: CodeFence, block: FencedBlock):
+        """Add block (markers included) to the end, on a line of its own."""
+        start = block.content_location[0] - block.block_location[0]
+        end = len(block.text) - (block.block_location[1] - block.content_location[1])
+        if self._length:
+            separator = _Piece(len(self._pieces), "\n")
+            self._add(separator)
+            self._edited(separator, 1)
+        piece = _Piece(
+            len(self._pieces),
+            block.content,
+            fence,
+            start=block.text[:start],
+            end=block.text[end:],
+        )
+        self._add(piece)
+        self._edited(piece, len(piece))
+
+    def remove(self, fence: CodeFence, index: int = 0):
+        """Remove the index-th block of fence, markers and all."""
+        piece = self._blocks[fence].pop(index)
+        delta = -len(piece)
+        piece.fence = None
+        piece.start = piece.content = piece.end = ""
+        self._edited(piece, delta)
+
+    def copy_block(
+        self, fence: CodeFence, block: FencedBlock, replace: bool = False
+    ) -> bool:
+        """`copy_block` on the document, with an already parsed source block.
+
+        Returns:
+            True if the document changed (or the block was replaced)
+
+        Raises:
+            ValueError: If multiple blocks matching the fence are found
+        """
+        existing = self._blocks.get(fence, [])
+        if len(existing) > 1:
+            raise ValueError(
+                f"Your config has two or more existing blocks matching the {fence}, I don't know what to do here"
+            )
+        if existing:
+            if replace:
+                self.replace(fence, block.content)
+            return replace
+        self.append(fence, block)
+        return True
+
+
+class IndexedBlock(
+    namedtuple(
+        "IndexedBlock",
+        ["fence", "block", "parent", "depth", "source"],
+        defaults=[None],
+    )
+):
+    __slots__ = ()
+
+    fence: CodeFence
+    block: FencedBlock
+    # position in BlockIndex.blocks of the smallest block containing this one
+    parent: int | None
+    depth: int
+    source: Path | None
+
+
+class BlockIndex:
+    """The blocks of a document, for answering "which block is this in".
+
+    Built once per document, lookups by offset or (1-based) line number
+    are a binary search plus a walk up through the enclosing blocks, so
+    they stay cheap with thousands of blocks. Blocks of different fences
+    may nest inside one another.
+
+    Args:
+        text: the document
+        fences: fences whose blocks to index
+        sources: the file each fence's block was copied from
+
+    Raises:
+        ValueError: if two blocks overlap without one containing the other
+    """
+
+    def __init__(
+        self,
+        text: str,
+        fences: Iterable[CodeFence],
+        sources: dict[CodeFence, Path] | None = None,
+    ):
+        sources = sources or {}
+        found = [
+            (block.block_location[0], -block.block_location[1], fence, block)
+            for fence, blocks in FenceSet(fences).scan(text).items()
+            for block in blocks
+        ]
+        # outer blocks sort before the blocks they contain
+        found.sort(key=lambda b: (b[0], b[1]))
+
+        self.blocks: list[IndexedBlock] = []
+        ends: list[int] = []
+        enclosing: list[int] = []
+        for _, _, fence, block in found:
+            start, end = block.block_location
+            while enclosing and ends[enclosing[-1]] <= start:
+                _ = enclosing.pop()
+            parent = enclosing[-1] if enclosing else None
+            if parent is not None and ends[parent] < end:
+                raise ValueError(
+                    f"{fence} block at {start} overlaps {self.blocks[parent].fence}"
+                )
+            enclosing.append(len(self.blocks))
+            ends.append(end)
+            self.blocks.append(
+                IndexedBlock(
+                    fence, block, parent, len(enclosing) - 1, sources.get(fence)
+                )
+            )
+        self._starts = [b.block.block_location[0] for b in self.blocks]
+
+        self.line_starts = [0]
+        position = text.find("\n")
+        while position != -1:
+            self.line_starts.append(position + 1)
+            position = text.find("\n", position + 1)
+        self.length = len(text)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def line_of(self, offset: int) -> int:
+        """1-based line number of offset."""
+        from bisect import bisect_right
+
+        return bisect_right(self.line_starts, offset)
+
+    def line_start(self, line: int) -> int:
+        """Offset of the start of a 1-based line number.
+
+        Raises:
+            IndexError: if the document has no such line
+        """
+        if line < 1:
+            raise IndexError(f"line {line} is before the start of the document")
+        return self.line_starts[line - 1]
+
+    def blocks_at(self, offset: int) -> list[IndexedBlock]:
+        """Every block containing offset, innermost first."""
+        from bisect import bisect_right
+
+        found: list[IndexedBlock] = []
+        # the last block starting at or before offset, any block containing
+        # offset is either this one or one of the blocks around it
+        index: int | None = bisect_right(self._starts, offset) - 1
+        while index is not None and index >= 0:
+            candidate = self.blocks[index]
+            if offset < candidate.block.block_location[1]:
+                found.append(candidate)
+            index = candidate.parent
+        return found
+
+    def block_at(self, offset: int) -> IndexedBlock | None:
+        """The innermost block containing offset."""
+        blocks = self.blocks_at(offset)
+        return blocks[0] if blocks else None
+
+    def block_at_line(self, line: int) -> IndexedBlock | None:
+        """The innermost block containing the start of a 1-based line."""
+        return self.block_at(self.line_start(line))
 
 
 def copy_block(
@@ -123,11 +746,14 @@ def copy_block(
         Change object if a change is needed, None if already installed and replace=False
 
     Raises:
-        ValueError: If multiple blocks matching the fence are found
+        ValueError: If multiple blocks matching the fence are found, or source
+            has none
     """
-    block = fence.find_blocks(source.read_text())[0]
-    existing_blocks = fence.find_blocks(existing_content)
-    # expect zero or one existing_blocks
+    block = fence.first_block(source.read_text())
+    if block is None:
+        raise ValueError(f"{source} has no block matching the {fence}")
+    # only need to know if there are zero, one or more existing blocks
+    existing_blocks = list(islice(fence.iter_blocks(existing_content), 2))
     if len(existing_blocks) > 1:
         existing_texts = "\n...".join((block.text for block in existing_blocks))
         raise ValueError(
@@ -152,3 +778,302 @@ def copy_block(
         existing_content + "\n" + block.text if existing_content else block.text
     )
     return existing_content, new_content, True
+
+
+class FileBlock(
+    namedtuple("FileBlock", ["content_location", "block_location", "path"])
+):
+    """A fenced block in a file, located by byte offsets."""
+
+    __slots__ = ()
+
+    content_location: Span
+    block_location: Span
+    path: Path
+
+    def read(self, whole_block: bool = False) -> bytes:
+        """The block's content, or the block with its markers if whole_block."""
+        start, end = self.block_location if whole_block else self.content_location
+        with self.path.open("rb") as f:
+            _ = f.seek(start)
+            return f.read(end - start)
+
+
+@contextmanager
+def _mapped(path: Path) -> Iterator[mmap.mmap | bytes]:
+    import mmap
+
+    with path.open("rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # empty files can't be mapped
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def find_file_blocks(fence: CodeFence, path: Path) -> list[FileBlock]:
+    """Find the blocks of fence in a file without reading it into memory.
+
+    The file is memory mapped and the fence markers are matched against its
+    bytes, so nothing is decoded and the pages are left to the OS.
+    """
+    start_pattern, end_pattern = fence.byte_patterns
+    with _mapped(path) as data:
+        starts = [m.span() for m in start_pattern.finditer(data)]
+        ends = starts
+        if not fence.is_symmetric:
+            ends = [m.span() for m in end_pattern.finditer(data)]
+    return [
+        FileBlock(content_location, block_location, path)
+        for block_location, content_location in fence._pair_spans(starts, ends)
+    ]
+
+
+def _create_temp(target: Path) -> tuple[int, Path]:
+    """A new, empty file next to target, opened for writing.
+
+    It gets the mode a plain open() would have given it (0666 less the
+    umask), which mkstemp's 0600 doesn't, without reading the umask: that
+    can only be done by setting it, which races with other threads.
+    """
+    while True:
+        tmp = target.with_name(f".{target.name}.{os.urandom(4).hex()}.tmp")
+        try:
+            return os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), tmp
+        except FileExistsError:
+            continue
+
+
+def _fsync_directory(directory: Path):
+    """Make a rename in directory durable, where the platform allows it."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def _replacing(path: Path) -> Iterator[IO[bytes]]:
+    """A temporary file that replaces path once the block exits cleanly.
+
+    Symlinks are followed, so the link stays in place and its target is
+    replaced. The temporary file is made next to the target, fsynced and
+    renamed over it, so a crash leaves either the old or the new file. The
+    target's permissions (and owner, where allowed) are kept.
+    """
+    target = Path(os.path.realpath(path))
+    try:
+        original = target.stat()
+    except FileNotFoundError:
+        original = None
+
+    fd, tmp = _create_temp(target)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            yield out
+            out.flush()
+            os.fsync(out.fileno())
+        if original is not None:
+            os.chmod(tmp, original.st_mode & 0o7777)
+            try:
+                os.chown(tmp, original.st_uid, original.st_gid)
+            except OSError:
+                pass
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(target.parent)
+
+
+def write_atomic(path: Path, content: str | bytes):
+    """Replace the contents of path in a single rename, see `_replacing`."""
+    with _replacing(path) as out:
+        _ = out.write(content.encode() if isinstance(content, str) else content)
+
+
+def replace_in_file(path: Path, replacements: Iterable[tuple[Span, bytes]]):
+    """Replace byte ranges of a file, streaming everything else.
+
+    The untouched ranges are written straight from a memory map of the file
+    into a temporary file next to it, which is then renamed over the
+    original (following symlinks), so memory use doesn't depend on the size
+    of the file.
+
+    Args:
+        path: file to change
+        replacements: ((start, end), new bytes), the ranges must not overlap
+    """
+    ordered = sorted(replacements, key=lambda r: r[0])
+    with _replacing(path) as out, _mapped(path) as data:
+        # the view has to be released before the mapping is closed
+        with memoryview(data) as view:
+            position = 0
+            for (start, end), new in ordered:
+                if start < position:
+                    raise ValueError(f"overlapping replacements in {path}")
+                _ = out.write(view[position:start])
+                _ = out.write(new)
+                position = end
+            _ = out.write(view[position:])
+
+
+def copy_block_file(
+    fence: CodeFence,
+    source: Path,
+    target: Path,
+    replace: bool = False,
+) -> bool:
+    """copy_block for files on disk, working on bytes without loading target.
+
+    Target is never modified in place. An existing block's content is swapped,
+    or a new block appended, through `replace_in_file`, streaming the rest of
+    target into a new copy; a missing or empty target gets `write_atomic`.
+
+    Returns:
+        True if target was changed
+
+    Raises:
+        ValueError: If multiple blocks matching the fence are found in target,
+            or source has none
+    """
+    block = _source_block(fence, source)
+    return _copy_into_file(
+        fence, block.read(), block.read(whole_block=True), target, replace
+    )
+
+
+def _source_block(fence: CodeFence, source: Path) -> FileBlock:
+    blocks = find_file_blocks(fence, source)
+    if not blocks:
+        raise ValueError(f"{source} has no block matching the {fence}")
+    return blocks[0]
+
+
+def _copy_into_file(
+    fence: CodeFence, content: bytes, text: bytes, target: Path, replace: bool
+) -> bool:
+    """copy_block_file with the source block already read."""
+    existing_blocks = find_file_blocks(fence, target) if target.exists() else []
+    if len(existing_blocks) > 1:
+        raise ValueError(
+            f"Your config has two or more existing blocks matching the {fence}, I don't know what to do here"
+        )
+
+    if existing_blocks:
+        if not replace or existing_blocks[0].read() == content:
+            return False
+        replace_in_file(target, [(existing_blocks[0].content_location, content)])
+        return True
+
+    size = target.stat().st_size if target.exists() else 0
+    if size:
+        replace_in_file(target, [((size, size), b"\n" + text)])
+    else:
+        write_atomic(target, text)
+    return True
+
+
+class TargetResult(
+    namedtuple(
+        "TargetResult", ["target", "status", "size", "error"], defaults=[0, None]
+    )
+):
+    __slots__ = ()
+
+    target: Path
+    status: Literal["changed", "unchanged", "conflict", "error"]
+    size: int
+    error: str | None
+
+
+class BatchResult:
+    __slots__ = ("results", "elapsed")
+
+    def __init__(self, results: list[TargetResult], elapsed: float):
+        self.results = results
+        self.elapsed = elapsed
+
+    def count(self, status: str) -> int:
+        return sum(1 for r in self.results if r.status == status)
+
+    @property
+    def size(self) -> int:
+        return sum(r.size for r in self.results)
+
+    def summary(self) -> str:
+        throughput = self.size / 1024 / 1024 / self.elapsed if self.elapsed else 0
+        return (
+            f"{len(self.results)} targets: {self.count('changed')} changed, "
+            f"{self.count('unchanged')} unchanged, {self.count('conflict')} "
+            f"conflicting, {self.count('error')} failed in {self.elapsed:.2f}s "
+            f"({throughput:.1f}MB/s)"
+        )
+
+
+def _copy_to_target(
+    fence: CodeFence, content: bytes, text: bytes, target: Path, replace: bool
+) -> TargetResult:
+    try:
+        changed = _copy_into_file(fence, content, text, target, replace)
+        size = target.stat().st_size
+    except ValueError as e:
+        return TargetResult(target, "conflict", error=str(e))
+    except OSError as e:
+        return TargetResult(target, "error", error=str(e))
+    return TargetResult(target, "changed" if changed else "unchanged", size)
+
+
+def copy_block_many(
+    fence: CodeFence,
+    source: Path,
+    targets: Iterable[Path],
+    replace: bool = False,
+    max_workers: int | None = None,
+) -> BatchResult:
+    """copy_block_file from one source into many targets, on a process pool.
+
+    The source block is read once and sent to the workers, which scan and
+    rewrite the targets in bytes mode. A target with more than one block of
+    the fence is reported as a conflict and left alone.
+
+    Args:
+        max_workers: processes to use, 1 to work in this process
+
+    Raises:
+        ValueError: If source has no block matching the fence
+    """
+    import time
+
+    started = time.perf_counter()
+    block = _source_block(fence, source)
+    content, text = block.read(), block.read(whole_block=True)
+    targets = list(targets)
+
+    if max_workers == 1 or len(targets) < 2:
+        results = [
+            _copy_to_target(fence, content, text, target, replace) for target in targets
+        ]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        from functools import partial
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(
+                pool.map(
+                    partial(_copy_to_target, fence, content, text, replace=replace),
+                    targets,
+                    chunksize=max(1, len(targets) // ((max_workers or 4) * 4)),
+                )
+            )
+    return BatchResult(results, time.perf_counter() - started)
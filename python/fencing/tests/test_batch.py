@@ -0,0 +1,57 @@
+import pytest
+
+from fencing import CodeFence, copy_block_many
+
+FENCE = CodeFence("### ZSH ###", "### END ZSH ###")
+BLOCK = "### ZSH ###\nexport EDITOR=nvim\n### END ZSH ###"
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "source"
+    path.write_text(f"# source\n{BLOCK}\n")
+    return path
+
+
+def targets(tmp_path):
+    directory = tmp_path / "targets"
+    directory.mkdir()
+    contents = {
+        "new": "# empty rc\n",
+        "installed": f"# rc\n{BLOCK}\n",
+        "old": "# rc\n### ZSH ###\nexport EDITOR=vim\n### END ZSH ###\n",
+        "conflict": f"{BLOCK}\n{BLOCK}\n",
+    }
+    for name, content in contents.items():
+        (directory / name).write_text(content)
+    return [directory / name for name in contents] + [directory / "missing" / "rc"]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_copy_block_many(tmp_path, source, max_workers):
+    paths = targets(tmp_path)
+
+    batch = copy_block_many(FENCE, source, paths, replace=True, max_workers=max_workers)
+
+    statuses = {r.target.name: r.status for r in batch.results}
+    assert statuses == {
+        "new": "changed",
+        "installed": "unchanged",
+        "old": "changed",
+        "conflict": "conflict",
+        "rc": "error",
+    }
+    assert [r.target for r in batch.results] == paths
+    for path in paths[:3]:
+        assert FENCE.first_block(path.read_text()).text == BLOCK
+    assert paths[3].read_text() == f"{BLOCK}\n{BLOCK}\n"
+    summary = batch.summary()
+    assert "5 targets: 2 changed, 1 unchanged, 1 conflicting, 1 failed" in summary
+
+
+def test_source_without_block(tmp_path):
+    source = tmp_path / "source"
+    source.write_text("no block\n")
+
+    with pytest.raises(ValueError, match="no block"):
+        copy_block_many(FENCE, source, targets(tmp_path))
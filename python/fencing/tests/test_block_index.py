@@ -0,0 +1,79 @@
+from pathlib import Path
+
+import pytest
+
+from fencing import BlockIndex, CodeFence
+
+OUTER = CodeFence("### OUTER ###", "### END OUTER ###")
+INNER = CodeFence("### INNER ###", "### END INNER ###")
+OTHER = CodeFence.symettric("### OTHER ###")
+
+TEXT = """\
+first line
+### OUTER ###
+outer
+### INNER ###
+inner
+### END INNER ###
+### END OUTER ###
+between
+### OTHER ###
+other
+### OTHER ###
+### INNER ###
+second inner
+### END INNER ###
+last line
+"""
+
+
+@pytest.fixture
+def index():
+    return BlockIndex(TEXT, [OUTER, INNER, OTHER], {OTHER: Path("other.sh")})
+
+
+def naive_blocks_at(index, offset):
+    containing = [
+        b
+        for b in index.blocks
+        if b.block.block_location[0] <= offset < b.block.block_location[1]
+    ]
+    return sorted(containing, key=lambda b: -b.depth)
+
+
+def test_blocks_at_every_offset(index):
+    assert len(index) == 4
+    for offset in range(len(TEXT) + 1):
+        assert index.blocks_at(offset) == naive_blocks_at(index, offset)
+
+
+def test_nesting(index):
+    outer, inner, other, second = index.blocks
+
+    assert (outer.fence, outer.parent, outer.depth) == (OUTER, None, 0)
+    assert (inner.fence, inner.parent, inner.depth) == (INNER, 0, 1)
+    assert (other.parent, other.source) == (None, Path("other.sh"))
+    assert (second.fence, second.parent) == (INNER, None)
+
+
+def test_lines(index):
+    assert index.line_of(0) == 1
+    assert index.line_of(TEXT.index("outer\n")) == 3
+    assert index.line_start(3) == TEXT.index("outer\n")
+
+    assert index.block_at_line(1) is None
+    assert index.block_at_line(3).fence == OUTER
+    assert index.block_at_line(5).fence == INNER
+    assert index.block_at_line(8) is None
+    assert index.block_at_line(10).fence == OTHER
+    with pytest.raises(IndexError):
+        index.line_start(0)
+    with pytest.raises(IndexError):
+        index.line_start(100)
+
+
+def test_overlapping_blocks_are_rejected():
+    a, b = CodeFence("<a>", "</a>"), CodeFence("<b>", "</b>")
+
+    with pytest.raises(ValueError, match="overlaps"):
+        BlockIndex("<a> <b> </a> </b>", [a, b])
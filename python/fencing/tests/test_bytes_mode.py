@@ -0,0 +1,158 @@
+import os
+
+import pytest
+
+from fencing import (
+    CodeFence,
+    copy_block_file,
+    find_file_blocks,
+    replace_in_file,
+    write_atomic,
+)
+
+FENCE = CodeFence("### ZSH ###", "### END ZSH ###")
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "source.sh"
+    path.write_text("# source\n### ZSH ###\nexport EDITOR=nvim\n### END ZSH ###\n")
+    return path
+
+
+def test_find_file_blocks_matches_text_mode(source):
+    text = source.read_text()
+    (block,) = find_file_blocks(FENCE, source)
+    (expected,) = FENCE.find_blocks(text)
+
+    assert block.content_location == expected.content_location
+    assert block.block_location == expected.block_location
+    assert block.read() == expected.content.encode()
+    assert block.read(whole_block=True) == expected.text.encode()
+
+
+def test_empty_file_has_no_blocks(tmp_path):
+    empty = tmp_path / "empty"
+    empty.write_bytes(b"")
+
+    assert find_file_blocks(FENCE, empty) == []
+
+
+def test_copy_block_file_appends_then_replaces(tmp_path, source):
+    target = tmp_path / "zshrc"
+    target.write_text("# mine\n")
+
+    assert copy_block_file(FENCE, source, target)
+    block = "### ZSH ###\nexport EDITOR=nvim\n### END ZSH ###"
+    assert target.read_text() == f"# mine\n\n{block}"
+    assert not copy_block_file(FENCE, source, target)
+    assert not copy_block_file(FENCE, source, target, replace=True)
+
+    source.write_text("### ZSH ###\nexport EDITOR=vim\n### END ZSH ###\n")
+    assert not copy_block_file(FENCE, source, target)
+    assert copy_block_file(FENCE, source, target, replace=True)
+    assert "EDITOR=vim" in target.read_text()
+    assert target.read_text().startswith("# mine\n")
+
+
+def test_copy_block_file_creates_the_target(tmp_path, source):
+    target = tmp_path / "zshrc"
+
+    assert copy_block_file(FENCE, source, target)
+    assert target.read_text() == "### ZSH ###\nexport EDITOR=nvim\n### END ZSH ###"
+
+
+def test_append_is_atomic(tmp_path, source, monkeypatch):
+    real = tmp_path / "dotfiles" / "zshrc"
+    real.parent.mkdir()
+    real.write_text("# mine\n")
+    link = tmp_path / "zshrc"
+    link.symlink_to(real)
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(os, "replace", fail)
+        with pytest.raises(OSError, match="disk full"):
+            copy_block_file(FENCE, source, link)
+    assert real.read_text() == "# mine\n"
+    assert [p.name for p in real.parent.iterdir()] == ["zshrc"]
+
+    assert copy_block_file(FENCE, source, link)
+    assert link.is_symlink()
+    assert real.read_text().startswith("# mine\n\n### ZSH ###")
+
+
+def test_source_without_block(tmp_path):
+    source = tmp_path / "source"
+    source.write_text("nothing fenced here\n")
+
+    with pytest.raises(ValueError, match="no block"):
+        copy_block_file(FENCE, source, tmp_path / "target")
+
+
+def test_target_with_two_blocks(tmp_path, source):
+    target = tmp_path / "zshrc"
+    target.write_text(source.read_text() * 2)
+
+    with pytest.raises(ValueError, match="two or more"):
+        copy_block_file(FENCE, source, target, replace=True)
+
+
+def test_replace_in_file_follows_symlinks(tmp_path):
+    real = tmp_path / "real"
+    real.write_bytes(b"hello world\n")
+    real.chmod(0o640)
+    link = tmp_path / "link"
+    link.symlink_to(real)
+
+    replace_in_file(link, [((6, 11), b"there"), ((0, 5), b"hi")])
+
+    assert link.is_symlink()
+    assert real.read_bytes() == b"hi there\n"
+    assert real.stat().st_mode & 0o777 == 0o640
+
+
+def test_replace_in_file_rejects_overlaps(tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(b"0123456789")
+
+    with pytest.raises(ValueError, match="overlapping"):
+        replace_in_file(path, [((0, 5), b"a"), ((3, 7), b"b")])
+
+    assert path.read_bytes() == b"0123456789"
+    assert [p.name for p in tmp_path.iterdir()] == ["file"]
+
+
+def test_write_atomic(tmp_path):
+    real = tmp_path / "real"
+    real.write_text("old\n")
+    real.chmod(0o600)
+    link = tmp_path / "link"
+    link.symlink_to(real)
+
+    write_atomic(link, "new\n")
+
+    assert link.is_symlink()
+    assert real.read_text() == "new\n"
+    assert real.stat().st_mode & 0o777 == 0o600
+
+    umask = os.umask(0o022)
+    try:
+        write_atomic(tmp_path / "fresh", b"bytes\n")
+    finally:
+        os.umask(umask)
+    assert (tmp_path / "fresh").stat().st_mode & 0o777 == 0o644
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["fresh", "link", "real"]
+
+
+@pytest.mark.skipif(os.geteuid() != 0, reason="only root can give files away")
+def test_write_atomic_keeps_the_owner(tmp_path):
+    path = tmp_path / "rc"
+    path.write_text("old\n")
+    os.chown(path, 1234, 1234)
+
+    write_atomic(path, "new\n")
+
+    assert (path.stat().st_uid, path.stat().st_gid) == (1234, 1234)
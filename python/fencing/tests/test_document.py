@@ -0,0 +1,100 @@
+import random
+
+import pytest
+
+from fencing import CodeFence, FencedDocument, copy_block
+
+FENCES = [CodeFence(f"### F{i} ###", f"### END F{i} ###") for i in range(4)]
+
+
+def block_text(fence, body):
+    return f"{fence.start}\n{body}\n{fence.end}"
+
+
+def make_text(rng):
+    parts = [f"line {i}\n" for i in range(rng.randrange(3))]
+    for i in range(6):
+        parts.append(block_text(rng.choice(FENCES), f"body {i}") + "\n")
+        parts.append(f"between {i}\n" * rng.randrange(3))
+    return "".join(parts)
+
+
+def assert_indexed(document):
+    """Offsets in the document match a fresh scan of its text."""
+    text = document.text
+    assert len(document) == len(text)
+    for fence in FENCES:
+        expected = [
+            (b.block_location, b.content_location, b.content)
+            for b in fence.find_blocks(text)
+        ]
+        found = [
+            (b.block_location, b.content_location, b.content)
+            for b in document.blocks(fence)
+        ]
+        assert found == expected
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_edits_keep_the_index_correct(seed):
+    rng = random.Random(seed)
+    document = FencedDocument(make_text(rng), FENCES)
+    assert_indexed(document)
+
+    for step in range(12):
+        fence = rng.choice(FENCES)
+        blocks = document.blocks(fence)
+        action = rng.choice(["replace", "append", "remove"])
+        if action == "replace" and blocks:
+            content = f"\nnew {step}\n" * rng.randrange(3)
+            document.replace(fence, content, rng.randrange(len(blocks)))
+        elif action == "remove" and blocks:
+            document.remove(fence, rng.randrange(len(blocks)))
+        else:
+            (block,) = fence.find_blocks(block_text(fence, f"added {step}"))
+            document.append(fence, block)
+        assert_indexed(document)
+
+
+def test_changes_map_original_ranges_to_new_ones():
+    a, b = block_text(FENCES[0], "a"), block_text(FENCES[1], "b")
+    original = f"top\n{a}\nmiddle\n{b}\n"
+    document = FencedDocument(original, FENCES)
+
+    document.replace(FENCES[1], "\nlonger b\n")
+    (block,) = FENCES[2].find_blocks(block_text(FENCES[2], "c"))
+    document.append(FENCES[2], block)
+
+    text = document.text
+    (replaced_old, replaced_new), (_, separator), (added_old, added_new) = (
+        document.changes()
+    )
+    assert original[slice(*replaced_old)] == b
+    assert text[slice(*replaced_new)] == block_text(FENCES[1], "longer b")
+    assert text[slice(*separator)] == "\n"
+    assert added_old == (len(original), len(original))
+    assert text[slice(*added_new)] == block_text(FENCES[2], "c")
+
+
+@pytest.mark.parametrize("replace", [False, True])
+@pytest.mark.parametrize("installed", [False, True])
+def test_copy_block_matches_module_copy_block(tmp_path, replace, installed):
+    fence = FENCES[0]
+    source = tmp_path / "source"
+    source.write_text(block_text(fence, "new") + "\n")
+    existing = "# rc\n" + (block_text(fence, "old") + "\n" if installed else "")
+
+    _, expected, expected_changed = copy_block(fence, source, existing, replace)
+    document = FencedDocument(existing, FENCES)
+    changed = document.copy_block(fence, fence.first_block(source.read_text()), replace)
+
+    assert document.text == expected
+    assert changed == expected_changed
+
+
+def test_overlapping_blocks_are_rejected():
+    outer = CodeFence("<a>", "</a>")
+    inner = CodeFence("<b>", "</b>")
+
+    with pytest.raises(ValueError):
+        FencedDocument("<a> <b> </a> </b>", [outer, inner])
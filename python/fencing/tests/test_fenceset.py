@@ -0,0 +1,84 @@
+import re
+
+import pytest
+
+from fencing import CodeFence, FenceSet, _trie_pattern
+
+VIM = CodeFence("### VIM ###", "### END VIM ###")
+VIMRC = CodeFence("### VIMRC ###", "### END VIMRC ###")
+ZOXIDE = CodeFence.symettric("### ZOXIDE ###")
+REGEX = CodeFence(r"<<\s*tmux", r"tmux\s*>>")
+
+CONTENT = """\
+# rc
+### VIM ###
+set number
+### END VIM ###
+### ZOXIDE ###
+eval "$(zoxide init zsh)"
+### ZOXIDE ###
+<<  tmux
+bind r source-file
+tmux >>
+### VIMRC ###
+source ~/.vimrc
+### END VIMRC ###
+### VIM ###
+set hidden
+### END VIM ###
+"""
+
+
+@pytest.mark.parametrize(
+    "fences",
+    [
+        [VIM],
+        [VIM, VIMRC],
+        [VIM, VIMRC, ZOXIDE],
+        [VIM, VIMRC, ZOXIDE, REGEX],
+        [REGEX],
+    ],
+)
+def test_scan_matches_each_fence_on_its_own(fences):
+    found = FenceSet(fences).scan(CONTENT)
+
+    assert list(found) == fences
+    for fence in fences:
+        assert found[fence] == fence.find_blocks(CONTENT)
+
+
+def test_scan_finds_every_block():
+    found = FenceSet([VIM, VIMRC, ZOXIDE, REGEX]).scan(CONTENT)
+
+    assert [b.content for b in found[VIM]] == ["\nset number\n", "\nset hidden\n"]
+    assert [b.content for b in found[VIMRC]] == ["\nsource ~/.vimrc\n"]
+    assert len(found[ZOXIDE]) == 1
+    assert found[REGEX][0].content == "\nbind r source-file\n"
+
+
+def test_duplicate_fences_and_no_blocks():
+    fence = CodeFence("### NONE ###", "### END NONE ###")
+    fence_set = FenceSet([VIM, fence, VIM])
+
+    assert fence_set.fences == (VIM, fence)
+    assert fence_set.scan(CONTENT)[fence] == []
+
+
+def test_only_regex_markers_have_no_combined_pattern():
+    assert FenceSet([REGEX]).pattern is None
+
+
+@pytest.mark.parametrize(
+    "words, text, expected",
+    [
+        (["ab", "ac", "a"], "a ab ac ad", ["a", "ab", "ac", "a"]),
+        (
+            ["### A ###", "### AB ###"],
+            "### AB ### ### A ###",
+            ["### AB ###", "### A ###"],
+        ),
+        (["a.b", "a+"], "a.b axb a+", ["a.b", "a+"]),
+    ],
+)
+def test_trie_pattern(words, text, expected):
+    assert re.findall(_trie_pattern(words), text) == expected
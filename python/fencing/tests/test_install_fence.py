@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[3]
+SCRIPT = ROOT / "bin" / "install-fence"
+
+
+def install_fence(*args: str) -> subprocess.CompletedProcess[str]:
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "python" / "fencing")}
+    return subprocess.run(
+        [sys.executable, str(SCRIPT), *args],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    _ = (tmp_path / "zsh.sh").write_text(
+        "# ALIAS #\nalias g=git\n# ALIAS #\n# PATH #\nPATH=~/bin:$PATH\n# PATH #\n"
+    )
+    _ = (tmp_path / "rust.sh").write_text("<rust>\n. ~/.cargo/env\n</rust>\n")
+    path = tmp_path / "manifest.json"
+    _ = path.write_text(
+        json.dumps(
+            {
+                "fence": [
+                    {"start": "# ALIAS #", "source": "zsh.sh", "targets": ["*rc"]},
+                    {"start": "# PATH #", "source": "zsh.sh", "targets": ["zshrc"]},
+                    {
+                        "start": "<rust>",
+                        "end": "</rust>",
+                        "source": "rust.sh",
+                        "targets": ["zshrc"],
+                        "replace": False,
+                    },
+                ]
+            }
+        )
+    )
+    return path
+
+
+def test_applies_every_fence_of_a_manifest(tmp_path, manifest):
+    _ = (tmp_path / "zshrc").write_text(
+        "export A=1\n# ALIAS #\nalias old=1\n# ALIAS #\n<rust>\nmine\n</rust>\n"
+    )
+    _ = (tmp_path / "bashrc").write_text("")
+
+    result = install_fence("--manifest", str(manifest))
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert (tmp_path / "zshrc").read_text() == (
+        "export A=1\n# ALIAS #\nalias g=git\n# ALIAS #\n<rust>\nmine\n</rust>\n"
+        "\n# PATH #\nPATH=~/bin:$PATH\n# PATH #"
+    )
+    assert (tmp_path / "bashrc").read_text() == "# ALIAS #\nalias g=git\n# ALIAS #"
+
+    again = install_fence("--manifest", str(manifest))
+    assert again.returncode == 0
+    assert all(line.startswith("unchanged") for line in again.stdout.splitlines())
+
+
+def test_a_conflict_writes_nothing(tmp_path, manifest):
+    zshrc = "# ALIAS #\na\n# ALIAS #\n# ALIAS #\nb\n# ALIAS #\n"
+    _ = (tmp_path / "zshrc").write_text(zshrc)
+    _ = (tmp_path / "bashrc").write_text("")
+
+    result = install_fence("--manifest", str(manifest))
+
+    assert result.returncode == 1
+    assert "Nothing written" in result.stdout
+    assert (tmp_path / "zshrc").read_text() == zshrc
+    assert (tmp_path / "bashrc").read_text() == ""
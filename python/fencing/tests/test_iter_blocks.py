@@ -0,0 +1,90 @@
+import random
+import re
+
+import pytest
+
+from fencing import CodeFence, _find_literal, _is_literal, match_cache
+
+FENCES = [
+    CodeFence("### VIM ###", "### END VIM ###"),
+    CodeFence.symettric("### ZOXIDE ###"),
+    # regex metacharacters: "x.y" also matches "xzy", r"a\+b" only "a+b"
+    CodeFence("x.y", r"a\+b"),
+    CodeFence.symettric(r"a\+b"),
+    # start and end markers overlapping each other in the text
+    CodeFence("==", "==="),
+    CodeFence.symettric("aa"),
+]
+
+PIECES = [
+    "### VIM ###",
+    "### END VIM ###",
+    "### ZOXIDE ###",
+    "x.y",
+    "xzy",
+    "a+b",
+    "aab",
+    "==",
+    "===",
+    "aaa",
+    "a",
+    "\n",
+    "text ",
+]
+
+
+def reference_blocks(fence, content):
+    """Blocks paired from plain re.finditer matches, no cache or fast path."""
+    starts = [m.span() for m in re.finditer(fence.start, content)]
+    ends = [m.span() for m in re.finditer(fence.end, content)]
+    return fence._pair(starts, ends, content)
+
+
+def random_contents(count=200):
+    rng = random.Random(19)
+    for _ in range(count):
+        yield "".join(rng.choice(PIECES) for _ in range(rng.randrange(30)))
+
+
+@pytest.mark.parametrize("fence", FENCES, ids=repr)
+def test_agrees_with_find_blocks(fence):
+    match_cache.clear()
+    for content in random_contents():
+        expected = reference_blocks(fence, content)
+        assert fence.find_blocks(content) == expected
+        assert list(fence.iter_blocks(content)) == expected
+        assert fence.first_block(content) == (expected[0] if expected else None)
+        for limit in (0, 1, 2, 5, None):
+            count = len(expected) if limit is None else min(limit, len(expected))
+            assert fence.count_blocks(content, limit) == count
+
+
+def test_source_path_is_passed_on(tmp_path):
+    fence = FENCES[0]
+    content = "### VIM ###\nset number\n### END VIM ###\n"
+    (block,) = fence.iter_blocks(content, tmp_path)
+    assert block.source_path == tmp_path
+    assert fence.first_block(content, tmp_path) == block
+
+
+@pytest.mark.parametrize(
+    ("marker", "literal"),
+    [
+        ("### VIM ###", True),
+        ("<rust>", True),
+        ("x.y", False),
+        (r"a\+b", False),
+        ("^start", False),
+        ("(a|b)", False),
+        ("", False),
+    ],
+)
+def test_is_literal(marker, literal):
+    assert _is_literal(marker) is literal
+
+
+@pytest.mark.parametrize("marker", ["aa", "aba", "###", "a"])
+def test_find_literal_agrees_with_finditer(marker):
+    for content in random_contents(100):
+        expected = [m.span() for m in re.finditer(re.escape(marker), content)]
+        assert list(_find_literal(marker, content)) == expected
@@ -0,0 +1,67 @@
+import re
+
+from fencing import MatchCache
+
+MARKER = re.compile("### A ###")
+
+
+def cost(matches: int) -> int:
+    return MatchCache.ENTRY_BYTES + MatchCache.SPAN_BYTES * matches
+
+
+def test_counts_hits_and_misses():
+    cache = MatchCache()
+    content = "### A ###\nx\n### A ###\n"
+
+    assert cache.spans(MARKER, content) == [(0, 9), (12, 21)]
+    assert cache.spans(MARKER, content) == [(0, 9), (12, 21)]
+    assert cache.spans(MARKER, content + "y") == [(0, 9), (12, 21)]
+
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.size == 2 * cost(2)
+    assert cache.stats() == (
+        f"2 entries, {2 * cost(2)} bytes, 1 hits, 2 misses, 0 evictions"
+    )
+
+
+def test_evicts_least_recently_used_to_stay_under_max_bytes():
+    cache = MatchCache(max_bytes=2 * cost(1))
+    first, second, third = "### A ### 1", "### A ### 2", "### A ### 3"
+    _ = cache.spans(MARKER, first)
+    _ = cache.spans(MARKER, second)
+    # first is now the most recently used, so second goes
+    _ = cache.spans(MARKER, first)
+    _ = cache.spans(MARKER, third)
+
+    assert cache.evictions == 1
+    assert cache.size == 2 * cost(1) <= cache.max_bytes
+    hits = cache.hits
+    _ = cache.spans(MARKER, first)
+    _ = cache.spans(MARKER, third)
+    assert cache.hits == hits + 2
+    _ = cache.spans(MARKER, second)
+    assert cache.hits == hits + 2
+
+
+def test_entries_bigger_than_the_cache_are_not_kept():
+    cache = MatchCache(max_bytes=cost(1))
+    content = "### A ###" * 3
+
+    assert len(cache.spans(MARKER, content)) == 3
+    assert cache.size == 0
+    assert cache.evictions == 0
+    _ = cache.spans(MARKER, content)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_clear_resets_entries_and_counters():
+    cache = MatchCache(max_bytes=cost(1))
+    _ = cache.spans(MARKER, "### A ### 1")
+    _ = cache.spans(MARKER, "### A ### 1")
+    _ = cache.spans(MARKER, "### A ### 2")
+
+    cache.clear()
+
+    assert cache.stats() == "0 entries, 0 bytes, 0 hits, 0 misses, 0 evictions"
+    _ = cache.spans(MARKER, "### A ### 1")
+    assert cache.misses == 1
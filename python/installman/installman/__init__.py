@@ -3,12 +3,13 @@ installman - utilities for writing standaolone installation scripts that combine
     into a person dotfile management CLI
 """
 
-import difflib
-import importlib.util
+from __future__ import annotations
+
+import importlib
 import os
-import shutil
-import subprocess
 import sys
+import threading
+import time
 
 # pyright: reportPrivateUsage=false
 # pyright: reportAny=false,reportExplicitAny=false
@@ -16,10 +17,74 @@ import sys
 # pyright: reportUnknownArgumentType=false
 # pyright: reportMissingParameterType=false
 from argparse import ArgumentParser, Namespace, _SubParsersAction
+from collections.abc import Awaitable, Callable
 from pathlib import Path
-from typing import Any, Callable, final
+
+from installman.discovery import discover
+from installman.files import WriteStats, write_file, write_stats
+from installman.manifest import Manifest
+from installman.timing import recorder, span
+
+# typing takes longer to import than the rest of installman together, so
+# only type checkers import it, annotations are never evaluated at run time
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, final
+
+    from installman.diffs import Region
+    from installman.journal import Journal, Paths
+    from installman.symlinks import SymlinkPlan
+else:
+
+    def final(cls):
+        return cls
+
+# the rest of the API is imported the first time it is used, `install.py --help`
+# and most single installers never need asyncio, subprocess or fencing
+_LAZY = {
+    "Backup": "installman.backup",
+    "BackupStore": "installman.backup",
+    "backup_path": "installman.backup",
+    "backups": "installman.backup",
+    "BrewRequests": "installman.brew",
+    "brew_install": "installman.brew",
+    "Region": "installman.diffs",
+    "unified_diff": "installman.diffs",
+    "Journal": "installman.journal",
+    "Paths": "installman.journal",
+    "note_declined": "installman.journal",
+    "note_skipped": "installman.journal",
+    "reset_declined": "installman.journal",
+    "was_declined": "installman.journal",
+    "probe_output": "installman.probe",
+    "probes": "installman.probe",
+    "tool_version": "installman.probe",
+    "Completed": "installman.proc",
+    "run_command": "installman.proc",
+    "Job": "installman.schedule",
+    "run_jobs": "installman.schedule",
+    "SymlinkPlan": "installman.symlinks",
+    "plan_symlinks": "installman.symlinks",
+    "FencePlan": "installman.plan",
+    "deferred_plans": "installman.plan",
+    "plan_for": "installman.plan",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_LAZY])
+
 
 type Subparsers = _SubParsersAction[ArgumentParser]
+type InstallFunction = Callable[[Namespace], None | Awaitable[None]]
 
 
 @final
@@ -27,15 +92,25 @@ class Installer:
     def __init__(
         self,
         name: str,
-        install: Callable[[Namespace], None],
+        install: InstallFunction,
         _subparser_args: dict[str, Any] | None = None,
         _setup_subparser: Callable[[Subparsers], ArgumentParser] | None = None,
         _setup_parser: Callable[[ArgumentParser], None] | None = None,
+        requires: tuple[str, ...] = (),
+        all_args: list[str] | None = None,
+        inputs: "Paths | None" = None,
+        outputs: "Paths | None" = None,
+        brew: tuple[str, ...] = (),
     ) -> None:
         self.name = name
         self.install = install
+        self.requires = requires
+        self.all_args = all_args
+        self.inputs = inputs
+        self.outputs = outputs
+        self.brew = brew
+        self._subparser_args = _subparser_args = _subparser_args or {}
         if _setup_subparser is None:
-            _subparser_args = _subparser_args or {}
 
             def _default_subparser(subparsers: Subparsers):
                 return subparsers.add_parser(name=name, **_subparser_args)
@@ -55,56 +130,120 @@ class Installer:
 
         self._setup_parser = _setup_parser
 
+    @property
+    def aliases(self) -> tuple[str, ...]:
+        return tuple(self._subparser_args.get("aliases", ()))
+
+    @property
+    def help(self) -> str | None:
+        return self._subparser_args.get("help")
+
     def parser(self, f: Callable[[ArgumentParser], None]):
         self._setup_parser = f
         return f
 
+    def run(self, args: Namespace):
+        """Call the install function, driving it on an event loop if it is async."""
+        import inspect
 
-def installer(name: str, **kwargs):
+        with span(self.name, "install"):
+            if inspect.iscoroutinefunction(self.install):
+                import asyncio
+
+                asyncio.run(self.install(args))  # pyright: ignore[reportArgumentType]
+            else:
+                self.install(args)
+
+
+def installer(
+    name: str,
+    *,
+    requires: tuple[str, ...] | list[str] = (),
+    all_args: list[str] | None = None,
+    inputs: "Paths | None" = None,
+    outputs: "Paths | None" = None,
+    brew: tuple[str, ...] | list[str] = (),
+    **kwargs,
+):
     """
     Decorator for creating an install subcommand. Kwargs are passed to argparse
-    add_subparsers function.
+    add_subparsers function. The decorated function can be `async def`, see
+    `run_command` for running external commands from it.
+
+    `requires` names installers that must finish before this one when running
+    `install.py all`. `all_args` are the arguments used for this installer in
+    `install.py all`, installers without them are left out of it.
+
+    `inputs` (files the installer reads) and `outputs` (files it produces) can
+    be paths or a function of the parsed args. Installers declaring them are
+    journaled, and skipped when run again with the same args and none of
+    those files (or the install script) have changed. An installer that
+    returns without installing everything should call `note_skipped()` so
+    the run isn't recorded.
+
+    `brew` lists Homebrew packages the installer needs. Whatever is missing is
+    installed before the installer runs (with every other installer's
+    packages in one `brew install` for `install.py all`), unless it was
+    given `--no-install`.
     """
 
-    def _installer(f: Callable[[Namespace], None]):
-        return Installer(name=name, install=f, _subparser_args=kwargs)
+    def _installer(f: InstallFunction):
+        return Installer(
+            name=name,
+            install=f,
+            _subparser_args=kwargs,
+            requires=tuple(requires),
+            all_args=all_args,
+            inputs=inputs,
+            outputs=outputs,
+            brew=tuple(brew),
+        )
 
     return _installer
 
 
-def symlink_rec(source: Path, destination: Path, quiet: bool = False):
+def symlink_rec(
+    source: Path,
+    destination: Path,
+    quiet: bool = False,
+    max_workers: int | None = None,
+) -> "SymlinkPlan":
     """Recursively symlink all leaf files from source to destination.
 
     Creates directory structure in destination as needed, but only symlinks
-    individual files, not directories.
+    individual files, not directories. Links that are already correct are
+    left alone, stale links into source are removed, and existing files are
+    reported as conflicts rather than replaced.
     """
+    from installman.symlinks import plan_symlinks
+
     if not destination.exists():
-        destination.mkdir()
+        # e.g. ~/.config/nvim on a fresh HOME without ~/.config
+        destination.mkdir(parents=True, exist_ok=True)
 
     if not source.is_dir() or not destination.is_dir():
         raise ValueError(f"{source} or {destination} is not a directory")
 
-    for item in source.rglob("*"):
-        if item.is_file():
-            rel = item.relative_to(source)
-            dest = destination / rel
-            dest.parent.mkdir(parents=True, exist_ok=True)
-            try:
-                dest.symlink_to(item)
-            except OSError:
-                if not quiet:
-                    print(
-                        f"- failed to symlink {item} to {dest} (probably already exists)"
-                    )
+    plan = plan_symlinks(source, destination)
+    failed = plan.apply(max_workers=max_workers)
+
+    if not quiet:
+        print(plan.summary())
+        for conflict in plan.conflicts:
+            print(f"- {conflict} already exists and is not a link into {source}")
+        for path, error in failed:
+            print(f"- failed to update {path}: {error}")
 
-            if not quiet:
-                print(f"- symlinked {item} to {dest}")
+    return plan
 
 
 def dependency(str):
     # routing through here in case we need logic later
     # For example, to get things that would exist but not be on the PATH yet
-    return shutil.which(str)
+    # lookups are cached on disk until PATH or the binary changes
+    from installman.probe import probes
+
+    return probes().which(str)
 
 
 def path_exists(path: Path) -> bool:
@@ -112,9 +251,20 @@ def path_exists(path: Path) -> bool:
     return path.exists()
 
 
+# diffs longer than this are cut short before asking to apply them, None shows
+# them whole. Set by cli from --max-diff-lines or INSTALLMAN_MAX_DIFF_LINES
+MAX_DIFF_LINES: int | None = None
+
+
 @final
 class SingleFileChange:
-    def __init__(self, before: str | None, after: str, path: Path) -> None:
+    def __init__(
+        self,
+        before: str | None,
+        after: str,
+        path: Path,
+        regions: "list[Region] | None" = None,
+    ) -> None:
         if before is None:
             before = ""
         # assuming there is some content
@@ -123,20 +273,30 @@ class SingleFileChange:
         self.before = before
         self.after = after
         self.path = path
+        # the edited ranges, when known only these are diffed
+        self.regions = regions
+
+    def apply(self) -> bool:
+        """Write the change, returns False if the file already had this content."""
+        return write_file(self.path, self.after)
 
-    def apply(self):
-        _ = self.path.write_text(self.after)
+    def iter_diff(self, contextlines=2, max_lines: int | None = None):
+        """Lines of the diff, only computed as far as they are read."""
+        from installman.diffs import unified_diff
 
-    def diff(self, contextlines=2):
         assert self.before is not None
-        _diff = difflib.unified_diff(
-            self.before.splitlines(keepends=True),
-            self.after.splitlines(keepends=True),
-            fromfile=str(self.path),
-            tofile=str(self.path),
-            n=contextlines,
-        )
-        return "".join(_diff)
+        with span(f"diff {self.path}", "diff"):
+            yield from unified_diff(
+                self.before,
+                self.after,
+                str(self.path),
+                regions=self.regions,
+                context=contextlines,
+                max_lines=max_lines,
+            )
+
+    def diff(self, contextlines=2, max_lines: int | None = None):
+        return "".join(self.iter_diff(contextlines, max_lines))
 
     def confirm(
         self,
@@ -144,18 +304,44 @@ class SingleFileChange:
         prompt="Apply this change? [y/N]: ",
         onapplied=lambda: print("Applied!"),
         onabort=lambda: print("Skipped!"),
+        max_diff_lines: int | None = None,
     ):
-        print(f"Changes to {self.path}:")
-        print(self.diff())
-
         global confirm
-        if confirm(yes=yes, prompt=prompt):
+        if max_diff_lines is None:
+            max_diff_lines = MAX_DIFF_LINES
+        # keep the diff and its prompt together when installers run in parallel
+        with _prompt_lock:
+            print(f"Changes to {self.path}:")
+            for line in self.iter_diff(max_lines=max_diff_lines):
+                # the last line of a file may not end in a newline
+                print(line, end="" if line.endswith("\n") else "\n")
+            confirmed = confirm(yes=yes, prompt=prompt)
+
+        if confirmed:
             self.apply()
             onapplied()
         else:
             onabort()
 
 
+# only one installer can be asking a question at a time
+_prompt_lock = threading.RLock()
+
+_file_locks: dict[Path, threading.Lock] = {}
+_file_locks_guard = threading.Lock()
+
+
+def editing(path: Path) -> threading.Lock:
+    """Lock to hold while reading, changing and writing back a file.
+
+    Installers running in parallel (`install.py all`) edit some of the same
+    files, like ~/.zshrc, so each read-modify-write has to be done as a unit.
+    """
+    key = path.expanduser().absolute()
+    with _file_locks_guard:
+        return _file_locks.setdefault(key, threading.Lock())
+
+
 def confirm(
     *,
     yes=False,
@@ -164,10 +350,14 @@ def confirm(
     if yes:
         return True
 
-    response = input(prompt).strip().lower()
+    with _prompt_lock, span(prompt, "prompt"):
+        response = input(prompt).strip().lower()
     if response.startswith("y"):
         return True
     else:
+        from installman.journal import note_declined
+
+        note_declined()
         return False
 
 
@@ -205,38 +395,33 @@ def confirm_brewed(
     package_path = dependency(package)
     if package_path:
         return package_path
-    
-    # Check if brew is available
-    brew_path = dependency("brew")
-    if not brew_path:
-        print(f"brew not found. Cannot install {package}.")
-        print("Please install Homebrew first: https://brew.sh/")
-        return None
-    
-    # Prompt for installation
-    if not confirm(
-        yes=yes,
-        prompt=f"{package} not found on PATH. Install via Homebrew? [y/N]: ",
-    ):
-        print(f"Skipping {package} installation")
+
+    from installman.brew import brew_install
+
+    if not brew_install([package], yes=yes):
         return None
-    
-    # Install via brew
-    print(f"Installing {package} via Homebrew...")
-    
-    try:
-        subprocess.run(
-            [brew_path, "install", package],
-            check=True,
+    print(f"{package} installed successfully")
+
+    # Get the path to the newly installed package
+    return dependency(package)
+
+
+def _replace_existing(destination: Path, backup: bool):
+    """Get a file or directory out of the way, into the backup store if backup."""
+    import shutil
+
+    from installman.backup import backup_path
+
+    if backup:
+        entry = backup_path(destination)
+        print(
+            f"Backed up existing {entry.kind} {destination} "
+            f"(undo with: install.py restore {destination})"
         )
-        print(f"{package} installed successfully")
-        
-        # Get the path to the newly installed package
-        installed_path = dependency(package)
-        return installed_path
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to install {package}: {e}")
-        return None
+    elif destination.is_dir():
+        shutil.rmtree(destination)
+    else:
+        destination.unlink()
 
 
 def confirm_symlink(
@@ -252,7 +437,8 @@ def confirm_symlink(
         source: The file/directory to symlink to (must exist)
         destination: Where to create the symlink
         yes: Automatically approve without prompting (replaces existing files/directories)
-        backup: If True and replacing existing file, create backup before replacing
+        backup: If True and replacing existing file, move it to the backup store
+            (see `install.py restore`) before replacing
         
     Returns:
         True if symlink was created or already exists correctly, False if user declined
@@ -284,19 +470,7 @@ def confirm_symlink(
             destination.unlink()
         elif yes:
             # Regular file/directory, replace automatically if yes=True
-            if backup and destination.is_file():
-                backup_path = destination.with_suffix(destination.suffix + ".bak")
-                shutil.copy(destination, backup_path)
-                print(f"Backed up existing file to {backup_path}")
-            elif backup and destination.is_dir():
-                backup_path = destination.with_name(destination.name + ".bak")
-                shutil.copytree(destination, backup_path)
-                print(f"Backed up existing directory to {backup_path}")
-            if destination.is_file() or destination.is_dir():
-                if destination.is_dir():
-                    shutil.rmtree(destination)
-                else:
-                    destination.unlink()
+            _replace_existing(destination, backup)
         else:
             # Regular file/directory exists, ask to replace it
             if not confirm(
@@ -305,19 +479,7 @@ def confirm_symlink(
             ):
                 return False
             # User confirmed, proceed with replacement
-            if backup and destination.is_file():
-                backup_path = destination.with_suffix(destination.suffix + ".bak")
-                shutil.copy(destination, backup_path)
-                print(f"Backed up existing file to {backup_path}")
-            elif backup and destination.is_dir():
-                backup_path = destination.with_name(destination.name + ".bak")
-                shutil.copytree(destination, backup_path)
-                print(f"Backed up existing directory to {backup_path}")
-            if destination.is_file() or destination.is_dir():
-                if destination.is_dir():
-                    shutil.rmtree(destination)
-                else:
-                    destination.unlink()
+            _replace_existing(destination, backup)
     
     # Confirm creation if not yes and file doesn't exist
     if not yes and not destination.exists():
@@ -343,11 +505,19 @@ def confirm_symlink(
 type Change = SingleFileChange
 
 
+_loaded_scripts: dict[Path, list[Installer]] = {}
+
+
 def __import_and_get_installers(module_path):
     """
     Dynamically imports a module from a file path and returns all global
     instances of a specified class defined within that module.
     """
+    if module_path in _loaded_scripts:
+        return _loaded_scripts[module_path]
+
+    import importlib.util
+
     module_name = os.path.splitext(os.path.basename(module_path))[0]
 
     # 1. Dynamically import the module
@@ -357,7 +527,8 @@ def __import_and_get_installers(module_path):
     module = importlib.util.module_from_spec(spec)
     sys.modules[module_name] = module
     assert spec.loader is not None
-    spec.loader.exec_module(module)
+    with span(f"import {module_path}", "import"):
+        spec.loader.exec_module(module)
 
     # 3. Find and return all instances of that class
     instances = []
@@ -367,31 +538,438 @@ def __import_and_get_installers(module_path):
         if isinstance(attribute, Installer):
             instances.append(attribute)
 
+    _loaded_scripts[module_path] = instances
     return instances
 
 
-def cli(root: Path | str, *args, **kwargs):
+# root options that take a value, which is not the subcommand
+_ROOT_VALUE_OPTIONS = {"--trace"}
+
+# subcommands of installman itself, not defined by any install script
+_BUILTIN_SUBCOMMANDS = {"all", "restore"}
+
+# the zsh wrappers that run install.py, see zsh/bin_wrappers.sh
+COMPLETION_COMMANDS = ("dotinstall", "di")
+
+
+def _selected_subcommand(argv: list[str]) -> str | None:
+    """The first positional argument, which is the installer being run."""
+    args = iter(argv)
+    for arg in args:
+        if arg == "--":
+            return None
+        if arg in _ROOT_VALUE_OPTIONS:
+            _ = next(args, None)
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+
+def _timing_requested(argv: list[str]) -> bool:
+    for arg in argv:
+        if arg == "--":
+            return False
+        if arg == "--timings" or arg == "--trace" or arg.startswith("--trace="):
+            return True
+    return False
+
+
+def _all_args(installer: Installer, yes: bool) -> Namespace:
+    """Parse the `all_args` an installer declared with its own parser."""
+    assert installer.all_args is not None
+    parser = ArgumentParser(prog=installer.name)
+    installer._setup_parser(parser)
+    argv = list(installer.all_args)
+    if yes and "--yes" in parser._option_string_actions and "--yes" not in argv:
+        argv.insert(0, "--yes")
+    args = parser.parse_args(argv)
+    args.subcommand = installer.name
+    return args
+
+
+def _brew_packages(installer: Installer, args: Namespace) -> tuple[str, ...]:
+    if getattr(args, "no_install", False):
+        return ()
+    return installer.brew
+
+
+def _run_journaled(
+    installer: Installer,
+    args: Namespace,
+    journal: "Journal",
+    rerun: bool = False,
+    ensure_brewed: bool = True,
+) -> bool:
+    """Run the installer unless the journal says it is up to date.
+
+    Subcommands that only report on things (e.g. `zsh profile`) set
+    `journal=False` in their parser's defaults to always run, unrecorded.
+
+    Returns:
+        True if it ran and the result should be recorded in the journal
+    """
+    from installman.brew import brew_install
+    from installman.journal import Journal, reset_declined, was_declined
+
+    tracked = Journal.tracks(installer) and getattr(args, "journal", True)
+    if tracked and not rerun and journal.up_to_date(installer, args):
+        print(f"{installer.name} is up to date (use --rerun to run it anyway)")
+        return False
+
+    reset_declined()
+    if ensure_brewed and _brew_packages(installer, args):
+        brew_install(
+            _brew_packages(installer, args), yes=getattr(args, "yes", False)
+        )
+    installer.run(args)
+    # a declined prompt means something was left uninstalled
+    return tracked and not was_declined()
+
+
+def install_all(
+    installers: list[Installer],
+    *,
+    yes: bool = False,
+    jobs: int = 4,
+    only: list[str] | None = None,
+    skip: list[str] | None = None,
+    journal: "Journal | None" = None,
+    rerun: bool = False,
+) -> bool:
+    """Run every installer that declares `all_args`, in dependency order.
+
+    Independent installers run concurrently on up to `jobs` threads. Returns
+    True if every installer succeeded.
+    """
+    from installman.brew import BrewRequests
+    from installman.journal import Journal, reset_declined, was_declined
+    from installman.plan import deferred_plans
+    from installman.schedule import Job, JobResult, run_jobs
+
+    selected = [
+        i
+        for i in installers
+        if i.all_args is not None
+        and (not only or i.name in only)
+        and i.name not in (skip or [])
+    ]
+    names = {i.name for i in selected}
+    journal = journal or Journal()
+    completed: list[tuple[Installer, Namespace]] = []
+    parsed = {i.name: _all_args(i, yes) for i in selected}
+
+    # every installer's Homebrew packages go into one brew install up front
+    requests = BrewRequests()
+    for i in selected:
+        requests.request(_brew_packages(i, parsed[i.name]))
+    requests.install(yes=yes)
+
+    def job(installer: Installer) -> Job:
+        args = parsed[installer.name]
+
+        def run():
+            if _run_journaled(installer, args, journal, rerun, ensure_brewed=False):
+                completed.append((installer, args))
+
+        # requirements left out of this run are assumed to be installed already
+        requires = tuple(dep for dep in installer.requires if dep in names)
+        return Job(installer.name, run, requires)
+
+    # edits to the same file from different installers are written once, at the end
+    with deferred_plans() as failed_writes:
+        schedule = run_jobs([job(i) for i in selected], max_workers=jobs)
+        reset_declined()
+
+    schedule.results.extend(
+        JobResult(f"write {path}", "failed", error=error)
+        for path, error in failed_writes.items()
+    )
+
+    # outputs are only final once the deferred writes are done
+    if not was_declined() and not failed_writes:
+        for installer, args in completed:
+            journal.record(installer, args)
+        journal.save()
+
+    print(schedule.summary())
+    return schedule.ok
+
+
+def _setup_all_parser(subparsers: Subparsers):
+    parser = subparsers.add_parser(
+        "all", help="run every installer at once, in dependency order"
+    )
+    parser.add_argument(
+        "--yes",
+        help="automatically approve changes without prompting",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=4, help="installers to run at once"
+    )
+    parser.add_argument(
+        "--only", nargs="+", default=None, help="run just these installers"
+    )
+    parser.add_argument(
+        "--skip", nargs="+", default=None, help="leave these installers out"
+    )
+
+
+def _setup_restore_parser(subparsers: Subparsers):
+    parser = subparsers.add_parser(
+        "restore", help="put back files and directories replaced by installers"
+    )
+    parser.add_argument("paths", nargs="*", type=Path, help="paths to restore")
+    parser.add_argument(
+        "--all", action="store_true", help="restore every backed up path"
+    )
+    parser.add_argument(
+        "--list", action="store_true", help="list backups instead of restoring"
+    )
+
+
+def restore(args: Namespace) -> bool:
+    from installman.backup import Backup, backups
+
+    store = backups()
+    if args.list:
+        for entry in store.entries():
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.time))
+            print(f"{stamp}  {entry.kind:<4}  {entry.path}")
+        return True
+
+    if args.all:
+        # each path gets its oldest backup, what was there before any installer
+        first: dict[str, Backup] = {}
+        for entry in store.entries():
+            first.setdefault(entry.path, entry)
+        entries = list(first.values())
+    elif not args.paths:
+        print("Nothing to restore, give some paths or --all")
+        return False
+    else:
+        entries = []
+        for path in args.paths:
+            entry = store.latest(path)
+            if entry is None:
+                print(f"No backup of {path}")
+                continue
+            entries.append(entry)
+
+    ok = True
+    for entry in entries:
+        try:
+            print(f"Restored {store.restore(entry)}")
+        except OSError as e:
+            print(f"Could not restore {entry.path}: {e}")
+            ok = False
+    return ok
+
+
+def cli(
+    root: Path | str,
+    *args,
+    commands: tuple[str, ...] = COMPLETION_COMMANDS,
+    **kwargs,
+):
+    """Parse sys.argv and run the selected installers found under root.
+
+    Args:
+        root: dotfiles root to discover install.py scripts under
+        commands: the shell commands (zsh wrappers) that run this cli, the
+            generated zsh completion is made for them
+        *args, **kwargs: passed on to the root ArgumentParser
+    """
     if isinstance(root, str):
         root = Path(root)
-    install_scripts = root.expanduser().rglob("install.py")
+    root = root.expanduser().resolve()
+    # turned on before parsing so discovery and imports are timed too
+    if _timing_requested(sys.argv[1:]):
+        recorder.enable()
+
+    with span("discover", "discovery"):
+        discovery = discover(root)
+    install_scripts = discovery.scripts
+
+    # only scripts that changed since the last run get imported here
+    with span("manifest", "import"):
+        manifest = Manifest.load(root, install_scripts, __import_and_get_installers)
+    _update_completion(manifest, commands, *args, **kwargs)
+
+    # import just the script defining the selected installer, the rest of the
+    # subcommands are stubs built from the manifest for --help
+    subcommand = _selected_subcommand(sys.argv[1:])
+    selected = manifest.lookup(subcommand or "")
+    installers: dict[str, Installer] = {}
+    if subcommand == "all":
+        scripts = sorted({entry.script for entry in manifest.entries()})
+    else:
+        scripts = [selected.script] if selected is not None else []
+    for script in scripts:
+        for installer in __import_and_get_installers(script):
+            installers[installer.name] = installer
+
+    # a known subcommand only needs its own parser, the others are only
+    # built (as stubs) to list them in --help and usage errors
+    known = selected is not None or subcommand in _BUILTIN_SUBCOMMANDS
+    with span("build parsers", "parser"):
+        root_parser = _root_parser(
+            manifest, installers, *args, only=subcommand if known else None, **kwargs
+        )
+    args = root_parser.parse_args()
+    global MAX_DIFF_LINES
+    MAX_DIFF_LINES = args.max_diff_lines
+    if args.discovery_stats:
+        stats = discovery.stats
+        print(
+            f"found {len(install_scripts)} install scripts, visited {stats.visited} "
+            f"directories, pruned {stats.pruned} in {stats.elapsed * 1000:.1f}ms",
+            file=sys.stderr,
+        )
+    if args.subcommand is None:
+        root_parser.print_help()
+        exit(1)
 
-    installers = []
-    for script in install_scripts:
-        installers.extend(__import_and_get_installers(script))
+    try:
+        ok = _dispatch(args, installers)
+    finally:
+        _report_writes()
+        _report_timings(args)
+    if not ok:
+        exit(1)
 
+
+# kept in the manifest with the generated zsh completion, bump it when the
+# output changes so existing completions are made again
+_COMPLETION_VERSION = 3
+
+
+def _update_completion(manifest: Manifest, commands: tuple[str, ...], *args, **kwargs):
+    """Regenerate the zsh completion if the installers changed since it was made.
+
+    The installers' parsers come described from the manifest, so nothing is
+    imported here. It runs on the first run after an install script, a
+    directory listed as choices (like bin/) or the commands change; every
+    other run only compares the key kept in the manifest and checks the file
+    is there.
+    """
+    key = f"{_COMPLETION_VERSION}:{' '.join(commands)}:{manifest.listings_key()}"
+    current = manifest.completion or {}
+    if current.get("key") == key and os.path.exists(current.get("path", "")):
+        return
+
+    from installman.completion import describe, write_completion
+
+    with span("completion", "parser"):
+        parser = _root_parser(manifest, {}, *args, **kwargs)
+        info = describe(parser, installers=manifest.parsers())
+        path = write_completion(info, commands)
+    # renamed commands get a new file, zsh would otherwise load both
+    if current.get("path") and current["path"] != str(path):
+        Path(current["path"]).unlink(missing_ok=True)
+    manifest.completion = {"key": key, "path": str(path)}
+    manifest.save()
+
+
+def _root_parser(
+    manifest: Manifest,
+    installers: dict[str, Installer],
+    *args,
+    only: str | None = None,
+    **kwargs,
+) -> ArgumentParser:
     root_parser = ArgumentParser(*args, **kwargs)
+    root_parser.add_argument(
+        "--rerun",
+        action="store_true",
+        help="run installers even if the journal says they are up to date",
+    )
+    root_parser.add_argument(
+        "--discovery-stats",
+        action="store_true",
+        help="report how many directories were searched for installers",
+    )
+    root_parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="print where the time went: discovery, imports, diffs, prompts, commands",
+    )
+    root_parser.add_argument(
+        "--trace",
+        type=Path,
+        metavar="FILE",
+        help="write a Chrome trace (chrome://tracing, ui.perfetto.dev) of the run",
+    )
+    root_parser.add_argument(
+        "--max-diff-lines",
+        type=int,
+        metavar="N",
+        # argparse runs string defaults through type too
+        default=os.environ.get("INSTALLMAN_MAX_DIFF_LINES"),
+        help="show at most N lines of each diff before asking to apply it "
+        "(default: $INSTALLMAN_MAX_DIFF_LINES, or the whole diff)",
+    )
     subparsers = root_parser.add_subparsers(
         dest="subcommand", help="Availible Installers:"
     )
 
-    for installer in installers:
+    for entry in manifest.entries():
+        if only is not None and only not in entry.names:
+            continue
+        installer = installers.get(entry.name)
+        if installer is None:
+            subparsers.add_parser(
+                entry.name, aliases=list(entry.aliases), help=entry.help
+            )
+            continue
         subparser = installer._setup_subparser(subparsers)
         installer._setup_parser(subparser)
+    if only is None or only == "all":
+        _setup_all_parser(subparsers)
+    if only is None or only == "restore":
+        _setup_restore_parser(subparsers)
+    return root_parser
+
+
+def _dispatch(args: Namespace, installers: dict[str, Installer]) -> bool:
+    from installman.journal import Journal
+
+    if args.subcommand == "restore":
+        return restore(args)
+
+    if args.subcommand == "all":
+        return install_all(
+            list(installers.values()),
+            yes=args.yes,
+            jobs=args.jobs,
+            only=args.only,
+            skip=args.skip,
+            rerun=args.rerun,
+        )
 
-    args = root_parser.parse_args()
-    if args.subcommand is None:
-        root_parser.print_help()
-        exit(1)
-    {installer.name: installer.install for installer in installers}[args.subcommand](
-        args
-    )
+    by_name = {
+        name: installer
+        for installer in installers.values()
+        for name in (installer.name, *installer.aliases)
+    }
+    installer = by_name[args.subcommand]
+    journal = Journal()
+    if _run_journaled(installer, args, journal, rerun=args.rerun):
+        journal.record(installer, args)
+        journal.save()
+    return True
+
+
+def _report_writes():
+    if write_stats.files_written or write_stats.files_skipped:
+        print(write_stats.summary())
+
+
+def _report_timings(args: Namespace):
+    if not recorder.enabled:
+        return
+    if args.timings:
+        print(recorder.breakdown(), file=sys.stderr)
+    if args.trace is not None:
+        recorder.write_trace(args.trace)
+        print(f"trace written to {args.trace}", file=sys.stderr)
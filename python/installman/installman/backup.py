@@ -0,0 +1,163 @@
+"""
+Backups of files and directories replaced by installers.
+
+Originals are moved into the state directory rather than copied: a
+directory is renamed into the store (constant time on the same
+filesystem), a file is stored by the hash of its contents (so backing up
+the same file again costs no extra disk) and a symlink is recorded by its
+target. Every backup is appended to an index so it can be restored later
+with `install.py restore`.
+"""
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Literal
+
+from installman.state import state_dir
+
+type Kind = Literal["file", "dir", "link"]
+
+
+@dataclass(frozen=True)
+class Backup:
+    id: str
+    path: str
+    kind: Kind
+    ref: str
+    time: float
+    mode: int | None = None
+
+
+def _move(src: Path, dst: Path):
+    """Rename, falling back to a copy when dst is on another filesystem."""
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+
+class BackupStore:
+    def __init__(self, root: Path | None = None) -> None:
+        self.root = root or state_dir() / "backups"
+        self.index = self.root / "index.jsonl"
+        self._lock = threading.Lock()
+
+    def _record(self, record: dict[str, object]):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self.index.open("a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def backup(self, path: Path) -> Backup:
+        """Move path into the store, leaving nothing at path.
+
+        Raises:
+            FileNotFoundError: if there is nothing at path
+        """
+        path = path.expanduser().absolute()
+        backup_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        with self._lock:
+            if path.is_symlink():
+                kind: Kind = "link"
+                ref = os.readlink(path)
+                mode = None
+                path.unlink()
+            elif path.is_dir():
+                kind = "dir"
+                ref = f"trees/{backup_id}"
+                mode = None
+                (self.root / "trees").mkdir(parents=True, exist_ok=True)
+                _move(path, self.root / ref)
+            elif path.exists():
+                kind = "file"
+                digest = hashlib.sha256(path.read_bytes()).hexdigest()
+                ref = f"objects/{digest}"
+                mode = path.stat().st_mode & 0o7777
+                (self.root / "objects").mkdir(parents=True, exist_ok=True)
+                if (self.root / ref).exists():
+                    # same content is already stored
+                    path.unlink()
+                else:
+                    _move(path, self.root / ref)
+            else:
+                raise FileNotFoundError(f"Nothing to back up at {path}")
+
+            entry = Backup(backup_id, str(path), kind, ref, time.time(), mode)
+            self._record(asdict(entry))
+        return entry
+
+    def entries(self) -> list[Backup]:
+        """Backups that have not been restored yet, oldest first."""
+        try:
+            lines = self.index.read_text().splitlines()
+        except FileNotFoundError:
+            return []
+
+        found: dict[str, Backup] = {}
+        for line in lines:
+            record = json.loads(line)
+            if "restored" in record:
+                found.pop(record["restored"], None)
+            else:
+                found[record["id"]] = Backup(**record)
+        return list(found.values())
+
+    def latest(self, path: Path) -> Backup | None:
+        key = str(path.expanduser().absolute())
+        matching = [b for b in self.entries() if b.path == key]
+        return matching[-1] if matching else None
+
+    def restore(self, entry: Backup) -> Path:
+        """Put a backup back where it came from.
+
+        A symlink at the original path (what an installer replaced it with)
+        is removed first.
+
+        Raises:
+            FileExistsError: if something other than a symlink is in the way
+        """
+        path = Path(entry.path)
+        with self._lock:
+            if path.is_symlink():
+                path.unlink()
+            elif path.exists():
+                raise FileExistsError(f"{path} exists, move it away to restore")
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if entry.kind == "link":
+                path.symlink_to(entry.ref)
+            elif entry.kind == "dir":
+                _move(self.root / entry.ref, path)
+            else:
+                # objects stay in the store, other backups may share them
+                shutil.copyfile(self.root / entry.ref, path)
+                if entry.mode is not None:
+                    os.chmod(path, entry.mode)
+
+            self._record({"restored": entry.id, "time": time.time()})
+        return path
+
+
+_store: BackupStore | None = None
+
+
+def backups() -> BackupStore:
+    global _store
+    if _store is None:
+        _store = BackupStore()
+    return _store
+
+
+def backup_path(path: Path) -> Backup:
+    """Move path into the backup store, see BackupStore.backup."""
+    return backups().backup(path)
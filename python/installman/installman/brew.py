@@ -0,0 +1,104 @@
+"""
+Batched Homebrew installs.
+
+Installers declare the packages they need, the requests are collected and
+everything missing is installed with a single `brew install a b c` rather
+than one brew invocation (with its startup and auto-update) per package.
+"""
+
+import subprocess
+import threading
+from typing import Iterable
+
+from installman.timing import span
+
+_installed: set[str] | None = None
+_installed_lock = threading.Lock()
+
+
+def installed_packages(brew: str) -> set[str]:
+    """Packages brew has installed, queried once per run with `brew list`."""
+    global _installed
+    with _installed_lock:
+        if _installed is None:
+            with span("brew list", "subprocess"):
+                result = subprocess.run(
+                    [brew, "list", "-1"], capture_output=True, text=True, check=False
+                )
+            _installed = set(result.stdout.split())
+        return _installed
+
+
+def _forget_installed():
+    global _installed
+    with _installed_lock:
+        _installed = None
+
+
+class BrewRequests:
+    def __init__(self) -> None:
+        self.requested: set[str] = set()
+        self._lock = threading.Lock()
+
+    def request(self, packages: Iterable[str]):
+        with self._lock:
+            self.requested.update(packages)
+
+    def missing(self) -> list[str]:
+        """Requested packages that are neither on the PATH nor installed by brew."""
+        from installman import dependency
+
+        off_path = [p for p in sorted(self.requested) if not dependency(p)]
+        if not off_path:
+            return []
+        brew = dependency("brew")
+        if not brew:
+            return off_path
+        installed = installed_packages(brew)
+        return [p for p in off_path if p not in installed]
+
+    def install(self, *, yes: bool = False) -> bool:
+        """Install every missing package with one brew call.
+
+        Returns:
+            True if nothing is missing afterwards
+        """
+        from installman import confirm, dependency
+
+        missing = self.missing()
+        if not missing:
+            return True
+
+        brew = dependency("brew")
+        if not brew:
+            print(f"brew not found. Cannot install {' '.join(missing)}.")
+            print("Please install Homebrew first: https://brew.sh/")
+            return False
+
+        if not confirm(
+            yes=yes,
+            prompt=f"Install {' '.join(missing)} via Homebrew? [y/N]: ",
+        ):
+            print(f"Skipping installation of {' '.join(missing)}")
+            return False
+
+        print(f"Installing {' '.join(missing)} via Homebrew...")
+        try:
+            with span(f"brew install {' '.join(missing)}", "subprocess"):
+                subprocess.run([brew, "install", *missing], check=True)
+        except subprocess.CalledProcessError as e:
+            print(f"Failed to install {' '.join(missing)}: {e}")
+            return False
+        finally:
+            # brew install may have partly succeeded either way
+            _forget_installed()
+
+        self.requested.clear()
+        return True
+
+
+def brew_install(packages: Iterable[str], *, yes: bool = False) -> bool:
+    """Install whichever of packages are missing right away, in one brew call."""
+    requests = BrewRequests()
+    requests.request(packages)
+    return requests.install(yes=yes)
@@ -0,0 +1,242 @@
+"""
+Static zsh completion for the installer CLI.
+
+Completing by running install.py on every TAB would import installers each
+time, so the whole argparse tree (installers, aliases, options, nested
+subcommands and choices) is written out once as a `_dotinstall` completion
+function. zsh loads it from `completion_dir()` through the fpath set up by
+zsh/completions.sh.
+
+Each installer's part of the tree is described (`describe_installer`) when
+the manifest imports its script and kept there, so the file can be written
+again without importing any installer. Choices listing a directory (an
+object with a `directory` attribute, like bin's scripts) record that
+listing too, and the manifest reads the installer again when it changes.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from argparse import SUPPRESS, Action, ArgumentParser, _SubParsersAction
+from pathlib import Path
+
+from installman.manifest import directory_listing
+from installman.state import state_dir
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+
+    from installman import Installer
+
+# specs of a parser's options and positionals, and for one with subcommands
+# their tag and [names, help, ParserInfo] each, plain JSON for the manifest
+type ParserInfo = dict[str, Any]
+
+
+def completion_dir() -> Path:
+    return state_dir() / "completions"
+
+
+def write_completion(
+    info: ParserInfo, commands: tuple[str, ...], path: Path | None = None
+) -> Path:
+    """Generate the completion for a described parser and write it.
+
+    Args:
+        info: the root parser, with every installer's full subparser
+        commands: the shell commands that run install.py, the first one
+            names the completion function and file
+        path: where to write, `_<command>` in `completion_dir()` by default
+    """
+    path = path or completion_dir() / f"_{commands[0]}"
+    text = zsh_completion(info, commands)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    _ = tmp.write_text(text)
+    os.replace(tmp, path)
+    return path
+
+
+def _quote(text: str) -> str:
+    """Single quote for zsh."""
+    return "'" + text.replace("'", "'\\''") + "'"
+
+
+def _escape(text: str | None, special: str) -> str:
+    text = " ".join((text or "").split())
+    return re.sub(f"([{re.escape(special)}])", r"\\\1", text)
+
+
+def _explanation(text: str | None) -> str:
+    """Text for the [...] part of an _arguments spec."""
+    return _escape(text, "\\[]")
+
+
+def _message(text: str | None) -> str:
+    """Text for the :message: part of an _arguments spec."""
+    return _escape(text, "\\:")
+
+
+def _values(action: Action) -> str:
+    """The action part of an _arguments spec, what to complete as the value."""
+    if action.choices is not None:
+        choices = (_escape(str(c), "\\:() ") for c in action.choices)
+        return "(" + " ".join(choices) + ")"
+    if action.type is Path:
+        return "_files"
+    return " "
+
+
+def _option(action: Action) -> str:
+    flags = action.option_strings
+    exclusive = f"({' '.join(flags)})" if len(flags) > 1 else ""
+    names = f"{{{','.join(flags)}}}" if len(flags) > 1 else flags[0]
+    spec = f"[{_explanation(action.help)}]"
+    if action.nargs != 0:
+        name = _message(action.metavar or action.dest)
+        spec += f":{name}:{_values(action)}"
+    if len(flags) > 1:
+        return f"{_quote(exclusive)}{names}{_quote(spec)}"
+    return _quote(names + spec)
+
+
+def _positional(action: Action) -> str:
+    repeat = "*" if action.nargs in ("*", "+", "...") else ""
+    name = _message(action.metavar or action.dest)
+    return _quote(f"{repeat}:{name}:{_values(action)}")
+
+
+def _function_name(path: list[str]) -> str:
+    return "_" + "_".join(re.sub(r"\W", "_", part) for part in path)
+
+
+type Subcommand = tuple[list[str], str, ArgumentParser]
+
+
+def _subcommands(action: _SubParsersAction) -> list[Subcommand]:
+    """(names, help, parser) of each subcommand, aliases grouped with their name."""
+    helps = {choice.dest: choice.help for choice in action._choices_actions}
+    grouped: dict[int, Subcommand] = {}
+    for name, parser in action._name_parser_map.items():
+        if id(parser) in grouped:
+            grouped[id(parser)][0].append(name)
+        else:
+            grouped[id(parser)] = ([name], helps.get(name) or "", parser)
+    return list(grouped.values())
+
+
+def describe(
+    parser: ArgumentParser,
+    listings: dict[str, list[str]] | None = None,
+    installers: dict[str, ParserInfo] | None = None,
+) -> ParserInfo:
+    """What the completion needs from parser, as JSON the manifest can keep.
+
+    Args:
+        parser: the parser to describe, with its subcommands
+        listings: filled with the listing of every directory choices came from
+        installers: already described subcommands, used instead of the
+            (stub) parsers of those names
+    """
+    specs: list[str] = []
+    subcommands: _SubParsersAction | None = None
+    for action in parser._actions:
+        if action.help == SUPPRESS:
+            continue
+        directory = getattr(action.choices, "directory", None)
+        if directory is not None and listings is not None:
+            listings[str(directory)] = directory_listing(directory)
+        if isinstance(action, _SubParsersAction):
+            subcommands = action
+        elif action.option_strings:
+            specs.append(_option(action))
+        else:
+            specs.append(_positional(action))
+
+    info: ParserInfo = {"specs": specs}
+    if subcommands is not None:
+        installers = installers or {}
+        info["tag"] = subcommands.dest or "command"
+        info["subcommands"] = [
+            [names, help, installers.get(names[0]) or describe(child, listings)]
+            for names, help, child in _subcommands(subcommands)
+        ]
+    return info
+
+
+def describe_installer(
+    installer: Installer, listings: dict[str, list[str]] | None = None
+) -> ParserInfo:
+    """describe() the full subparser of installer."""
+    subparsers = ArgumentParser(add_help=False).add_subparsers()
+    parser = installer._setup_subparser(subparsers)
+    installer._setup_parser(parser)
+    return describe(parser, listings)
+
+
+def _functions(info: ParserInfo, path: list[str]) -> list[str]:
+    """The completion function for a parser, then those of its subcommands."""
+    specs: list[str] = info["specs"]
+    function = _function_name(path)
+    lines = [f"{function}() {{"]
+    if "subcommands" not in info:
+        lines.append("  _arguments -s \\")
+        lines.extend(f"    {spec} \\" for spec in specs)
+        lines[-1] = lines[-1].removesuffix(" \\")
+        lines.append("}")
+        return ["\n".join(lines)]
+
+    children: list[list[Any]] = info["subcommands"]
+    lines += [
+        '  local curcontext="$curcontext" state line',
+        "  typeset -A opt_args",
+        "  _arguments -C -s \\",
+    ]
+    lines.extend(f"    {spec} \\" for spec in specs)
+    lines += [
+        "    ': :->command' \\",
+        "    '*:: :->argument' && return",
+        "",
+        "  case $state in",
+        "    command)",
+        "      local -a commands",
+        "      commands=(",
+    ]
+    for names, help, _ in children:
+        for name in names:
+            entry = name.replace(":", "\\:") + ":" + " ".join(help.split())
+            lines.append(f"        {_quote(entry)}")
+    tag = _quote(info["tag"])
+    lines += [
+        "      )",
+        f"      _describe -t commands {tag} commands",
+        "      ;;",
+        "    argument)",
+        "      case $words[1] in",
+    ]
+    nested: list[str] = []
+    for names, _, child in children:
+        child_path = [*path, names[0]]
+        pattern = "|".join(_quote(name) for name in names)
+        lines.append(f"        {pattern}) {_function_name(child_path)} ;;")
+        nested.extend(_functions(child, child_path))
+    lines += ["      esac", "      ;;", "  esac", "}"]
+    return ["\n".join(lines), *nested]
+
+
+def zsh_completion(info: ParserInfo, commands: tuple[str, ...]) -> str:
+    """A zsh completion file (`#compdef`) for a parser, run as any of commands."""
+    functions = _functions(info, [commands[0]])
+    return "\n".join(
+        [
+            f"#compdef {' '.join(commands)}",
+            "# generated by installman from the installers, do not edit",
+            "",
+            "\n\n".join(functions),
+            "",
+            f'{_function_name([commands[0]])} "$@"',
+            "",
+        ]
+    )
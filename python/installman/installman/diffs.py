@@ -0,0 +1,146 @@
+"""
+Unified diffs of just the edited parts of a file.
+
+A change made through fencing knows which ranges of the file it touched,
+so instead of running difflib over every line of a large rc file only the
+lines around each edited range are compared. Hunk headers are shifted to
+the line numbers of the whole file, so the output reads like a full diff.
+"""
+
+import difflib
+import re
+from itertools import islice
+from typing import Iterator
+
+# (start, end) in the text before the change, (start, end) in the text after
+type Region = tuple[tuple[int, int], tuple[int, int]]
+
+_HUNK = re.compile(r"^@@ -(\d+)(,\d+)? \+(\d+)(,\d+)? @@")
+
+
+class _LineCounter:
+    """Line numbers of increasing offsets, counting each newline only once."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.offset = 0
+        self.line = 0
+
+    def __call__(self, offset: int) -> int:
+        if offset < self.offset:
+            self.offset = self.line = 0
+        self.line += self.text.count("\n", self.offset, offset)
+        self.offset = offset
+        return self.line
+
+
+def _window(text: str, start: int, end: int, context: int) -> tuple[int, int]:
+    """Offsets of the whole lines touching text[start:end], plus context lines."""
+    window_start = text.rfind("\n", 0, start) + 1
+    for _ in range(context):
+        if window_start == 0:
+            break
+        window_start = text.rfind("\n", 0, window_start - 1) + 1
+
+    window_end = start if end == start else end
+    for _ in range(context + 1):
+        newline = text.find("\n", window_end)
+        if newline == -1:
+            return window_start, len(text)
+        window_end = newline + 1
+    return window_start, window_end
+
+
+def _merged_windows(
+    before: str, after: str, regions: list[Region], context: int
+) -> Iterator[Region]:
+    current: Region | None = None
+    for (before_start, before_end), (after_start, after_end) in sorted(regions):
+        window = (
+            _window(before, before_start, before_end, context),
+            _window(after, after_start, after_end, context),
+        )
+        if current is not None and window[0][0] <= current[0][1]:
+            current = (
+                (current[0][0], max(current[0][1], window[0][1])),
+                (current[1][0], max(current[1][1], window[1][1])),
+            )
+            continue
+        if current is not None:
+            yield current
+        current = window
+    if current is not None:
+        yield current
+
+
+def unified_diff(
+    before: str,
+    after: str,
+    name: str,
+    regions: list[Region] | None = None,
+    context: int = 2,
+    max_lines: int | None = None,
+) -> Iterator[str]:
+    """Lines of a unified diff, produced as they are computed.
+
+    Args:
+        before: the file's current text
+        after: the text it is changing to
+        name: shown as the file name in the diff
+        regions: the edited ranges, everything else is known to be the
+            same in both texts. None diffs the whole file
+        context: lines of context around each change
+        max_lines: stop after this many lines, with a note saying how many
+            more there were
+    """
+    if regions is None:
+        lines = difflib.unified_diff(
+            before.splitlines(keepends=True),
+            after.splitlines(keepends=True),
+            fromfile=name,
+            tofile=name,
+            n=context,
+        )
+    else:
+        lines = _region_diff(before, after, name, regions, context)
+
+    if max_lines is None:
+        yield from lines
+        return
+    yield from islice(lines, max_lines)
+    dropped = sum(1 for _ in lines)
+    if dropped:
+        yield f"... {dropped} more lines not shown\n"
+
+
+def _region_diff(
+    before: str, after: str, name: str, regions: list[Region], context: int
+) -> Iterator[str]:
+    before_lines = _LineCounter(before)
+    after_lines = _LineCounter(after)
+    header = False
+
+    for (before_start, before_end), (after_start, after_end) in _merged_windows(
+        before, after, regions, context
+    ):
+        before_offset = before_lines(before_start)
+        after_offset = after_lines(after_start)
+        hunks = difflib.unified_diff(
+            before[before_start:before_end].splitlines(keepends=True),
+            after[after_start:after_end].splitlines(keepends=True),
+            n=context,
+        )
+        # the first two lines are the file header, written once for all windows
+        for line in islice(hunks, 2, None):
+            if not header:
+                header = True
+                yield f"--- {name}\n"
+                yield f"+++ {name}\n"
+            match = _HUNK.match(line)
+            if match is not None:
+                old, old_length, new, new_length = match.groups()
+                line = (
+                    f"@@ -{int(old) + before_offset}{old_length or ''} "
+                    f"+{int(new) + after_offset}{new_length or ''} @@\n"
+                )
+            yield line
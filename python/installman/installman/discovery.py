@@ -0,0 +1,262 @@
+"""
+Finding install.py scripts under a dotfiles root.
+
+A pruned os.scandir walk: directories matched by the built-in prune list, a
+.gitignore or a .installignore are never descended into, so the cost of
+discovery follows the directories that can hold installers rather than the
+size of vendored trees like node_modules.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import re
+import time
+from collections import namedtuple
+from pathlib import Path
+
+DEFAULT_PRUNE = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        "node_modules",
+        "__pycache__",
+        "build",
+        "dist",
+        "target",
+        ".venv",
+        "venv",
+        ".tox",
+        ".nox",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".ruff_cache",
+        "*.egg-info",
+    }
+)
+
+IGNORE_FILES = (".gitignore", ".installignore")
+
+
+def _translate(pattern: str) -> str:
+    """gitignore glob -> regex matched against a /-separated relative path"""
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == n:
+            out.append("/.*")
+            i += 3
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = pattern.find("]", i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pattern[i + 1 : j].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = j + 1
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+# namedtuples and plain classes rather than dataclasses or typing.NamedTuple
+# here and in the rest of the modules every command imports: dataclasses pulls
+# in inspect and typing is slow to import, either costs as much as the rest of
+# start up together
+class IgnoreRule(namedtuple("IgnoreRule", ["regex", "base", "negate", "dir_only"])):
+    __slots__ = ()
+
+    regex: re.Pattern[str]
+    base: str
+    negate: bool
+    dir_only: bool
+
+    @staticmethod
+    def parse(line: str, base: str) -> IgnoreRule | None:
+        line = line.rstrip("\n").rstrip()
+        if not line or line.startswith("#"):
+            return None
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+
+        if "/" in line:
+            # anchored to the directory holding the ignore file
+            regex = _translate(line.lstrip("/"))
+        else:
+            regex = "(?:.*/)?" + _translate(line)
+
+        return IgnoreRule(re.compile(regex + r"\Z"), base, negate, dir_only)
+
+    def matches(self, rel: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel.startswith(self.base + "/"):
+                return False
+            rel = rel[len(self.base) + 1 :]
+        return self.regex.match(rel) is not None
+
+
+class IgnoreRules(namedtuple("IgnoreRules", ["rules"], defaults=[()])):
+    __slots__ = ()
+
+    rules: tuple[IgnoreRule, ...]
+
+    def extend(self, path: Path, base: str) -> IgnoreRules:
+        try:
+            lines = path.read_text().splitlines()
+        except OSError:
+            return self
+        parsed = (IgnoreRule.parse(line, base) for line in lines)
+        return IgnoreRules(self.rules + tuple(r for r in parsed if r is not None))
+
+    def ignored(self, rel: str, is_dir: bool) -> bool:
+        # last matching rule wins, like git
+        result = False
+        for rule in self.rules:
+            if rule.negate == result and rule.matches(rel, is_dir):
+                result = not rule.negate
+        return result
+
+
+class DiscoveryStats:
+    __slots__ = ("visited", "pruned", "elapsed")
+
+    def __init__(self, visited: int = 0, pruned: int = 0, elapsed: float = 0.0):
+        self.visited = visited
+        self.pruned = pruned
+        self.elapsed = elapsed
+
+    def merge(self, other: "DiscoveryStats"):
+        self.visited += other.visited
+        self.pruned += other.pruned
+
+
+class Discovery:
+    __slots__ = ("scripts", "stats")
+
+    def __init__(self) -> None:
+        self.scripts: list[Path] = []
+        self.stats = DiscoveryStats()
+
+
+def _pruned(name: str, prune: frozenset[str]) -> bool:
+    return name in prune or any(
+        fnmatch.fnmatchcase(name, p) for p in prune if "*" in p or "?" in p
+    )
+
+
+def _walk(
+    root: Path,
+    rel: str,
+    rules: IgnoreRules,
+    filename: str,
+    prune: frozenset[str],
+) -> Discovery:
+    found = Discovery()
+    stack = [(rel, rules)]
+    while stack:
+        rel, rules = stack.pop()
+        directory = root / rel if rel else root
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        found.stats.visited += 1
+
+        names = {entry.name for entry in entries}
+        for ignore_file in IGNORE_FILES:
+            if ignore_file in names:
+                rules = rules.extend(directory / ignore_file, rel)
+
+        for entry in entries:
+            child = f"{rel}/{entry.name}" if rel else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if _pruned(entry.name, prune) or rules.ignored(child, True):
+                    found.stats.pruned += 1
+                    continue
+                stack.append((child, rules))
+            elif entry.name == filename and not rules.ignored(child, False):
+                found.scripts.append(Path(entry.path))
+
+    return found
+
+
+def discover(
+    root: Path,
+    filename: str = "install.py",
+    *,
+    prune: frozenset[str] = DEFAULT_PRUNE,
+    parallel: bool = False,
+    max_workers: int | None = None,
+) -> Discovery:
+    """Find every `filename` under root, skipping pruned and ignored directories.
+
+    Args:
+        root: directory to search
+        filename: name of the files to collect
+        prune: directory names (or globs) that are never descended into
+        parallel: walk each top-level directory on its own thread
+        max_workers: thread pool size when parallel
+
+    Returns:
+        Discovery holding the sorted scripts and how many directories were
+        visited and pruned
+    """
+    start = time.perf_counter()
+    rules = IgnoreRules()
+
+    if not parallel:
+        result = _walk(root, "", rules, filename, prune)
+    else:
+        for ignore_file in IGNORE_FILES:
+            if (root / ignore_file).is_file():
+                rules = rules.extend(root / ignore_file, "")
+
+        result = Discovery()
+        result.stats.visited = 1
+        subdirs = []
+        for entry in os.scandir(root):
+            if entry.is_dir(follow_symlinks=False):
+                if _pruned(entry.name, prune) or rules.ignored(entry.name, True):
+                    result.stats.pruned += 1
+                else:
+                    subdirs.append(entry.name)
+            elif entry.name == filename and not rules.ignored(entry.name, False):
+                result.scripts.append(Path(entry.path))
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for found in pool.map(
+                lambda d: _walk(root, d, rules, filename, prune), subdirs
+            ):
+                result.scripts.extend(found.scripts)
+                result.stats.merge(found.stats)
+
+    result.scripts.sort()
+    result.stats.elapsed = time.perf_counter() - start
+    return result
+
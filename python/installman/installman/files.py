@@ -0,0 +1,78 @@
+"""
+Writing files safely: no-op writes are skipped, real ones are atomic.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+from installman.timing import span
+
+
+class WriteStats:
+    __slots__ = ("bytes_written", "bytes_skipped", "files_written", "files_skipped")
+
+    def __init__(self) -> None:
+        self.bytes_written = 0
+        self.bytes_skipped = 0
+        self.files_written = 0
+        self.files_skipped = 0
+
+    def summary(self) -> str:
+        return (
+            f"wrote {self.bytes_written} bytes to {self.files_written} file(s), "
+            f"skipped {self.bytes_skipped} bytes in {self.files_skipped} unchanged file(s)"
+        )
+
+
+# totals for this run, reported by the cli
+write_stats = WriteStats()
+_stats_lock = threading.Lock()
+
+
+def _digest(data: bytes) -> bytes:
+    import hashlib
+
+    return hashlib.sha256(data).digest()
+
+
+def _unchanged(path: Path, data: bytes) -> bool:
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        return _digest(path.read_bytes()) == _digest(data)
+    except OSError:
+        return False
+
+
+def write_file(path: Path, content: str | bytes) -> bool:
+    """Replace the contents of path, skipping the write if nothing changed.
+
+    The write itself is `fencing.write_atomic`: symlinks are followed so the
+    link stays in place and its target is updated, and the new contents are
+    fsynced to a temporary file that is renamed over the original, so a crash
+    leaves either the old or the new file and never a truncated one. The
+    original permissions (and owner, where allowed) are kept.
+
+    Returns:
+        True if the file was written, False if it already had this content
+    """
+    data = content.encode() if isinstance(content, str) else content
+    target = Path(os.path.realpath(path))
+
+    if _unchanged(target, data):
+        with _stats_lock:
+            write_stats.bytes_skipped += len(data)
+            write_stats.files_skipped += 1
+        return False
+
+    # fencing is only needed once something is written
+    from fencing import write_atomic
+
+    with span(f"write {target}", "write"):
+        write_atomic(target, data)
+
+    with _stats_lock:
+        write_stats.bytes_written += len(data)
+        write_stats.files_written += 1
+    return True
@@ -0,0 +1,205 @@
+"""
+Installed-state journal.
+
+After an installer succeeds, the args it ran with and fingerprints of the
+files it read (inputs) and produced (outputs) are recorded. If nothing has
+changed on the next run the installer is skipped entirely.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from argparse import Namespace
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+
+from installman.state import read_json, state_dir, write_json
+
+if TYPE_CHECKING:
+    from installman import Installer
+
+type Paths = Iterable[Path] | Callable[[Namespace], Iterable[Path]]
+
+JOURNAL_VERSION = 1
+
+# args that change how an installer talks to you, not what it installs
+IGNORED_ARGS = frozenset(
+    {"yes", "rerun", "discovery_stats", "subcommand", "timings", "trace"}
+)
+
+_local = threading.local()
+
+
+def note_declined():
+    """Called when a prompt is answered with no, the run is then not recorded."""
+    _local.declined = True
+
+
+def note_skipped():
+    """Called by an installer that returns without installing everything, e.g.
+    when a tool it needs is not available or a download failed. Like a
+    declined prompt, the run is then not recorded."""
+    _local.declined = True
+
+
+def reset_declined():
+    _local.declined = False
+
+
+def was_declined() -> bool:
+    return getattr(_local, "declined", False)
+
+
+def fingerprint(
+    path: Path, previous: dict[str, Any] | None = None
+) -> dict[str, Any] | None:
+    """Describe the current state of path, None if it does not exist.
+
+    Files (including the targets of symlinks) are hashed, unless size and
+    mtime match `previous`, in which case its hash is reused.
+    """
+    try:
+        stat = path.lstat()
+    except FileNotFoundError:
+        return None
+
+    found: dict[str, Any] = {}
+    if path.is_symlink():
+        found["link"] = os.readlink(path)
+        try:
+            stat = path.stat()
+        except OSError:
+            return found
+
+    if path.is_dir():
+        found["dir"] = True
+        return found
+
+    if (
+        previous is not None
+        and previous.get("link") == found.get("link")
+        and previous.get("size") == stat.st_size
+        and previous.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        return previous
+
+    found["size"] = stat.st_size
+    found["mtime_ns"] = stat.st_mtime_ns
+    found["sha256"] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return found
+
+
+def _same(a: dict[str, Any] | None, b: dict[str, Any] | None) -> bool:
+    if a is None or b is None:
+        return a is b
+    if a.get("link") != b.get("link"):
+        return False
+    if "sha256" in a and "sha256" in b:
+        # a touched but unmodified file is still the same
+        return a["sha256"] == b["sha256"]
+    return a == b
+
+
+def _resolve(paths: Paths | None, args: Namespace) -> list[Path]:
+    if paths is None:
+        return []
+    if callable(paths):
+        paths = paths(args)
+    return [Path(p).expanduser() for p in paths]
+
+
+def _args_key(args: Namespace) -> str:
+    return json.dumps(
+        {k: v for k, v in vars(args).items() if k not in IGNORED_ARGS},
+        sort_keys=True,
+        default=str,
+    )
+
+
+class Journal:
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or state_dir() / "journal.json"
+        data = read_json(self.path)
+        if not isinstance(data, dict) or data.get("version") != JOURNAL_VERSION:
+            data = {"installers": {}}
+        self._installers: dict[str, Any] = data["installers"]
+        self._lock = threading.Lock()
+        self.dirty = False
+
+    @staticmethod
+    def tracks(installer: "Installer") -> bool:
+        return installer.inputs is not None or installer.outputs is not None
+
+    def _paths(
+        self, installer: "Installer", args: Namespace
+    ) -> tuple[list[Path], list[Path]]:
+        # the script itself is always an input, editing it means re-running
+        script = Path(installer.install.__code__.co_filename)
+        inputs = [script, *_resolve(installer.inputs, args)]
+        return inputs, _resolve(installer.outputs, args)
+
+    def up_to_date(self, installer: "Installer", args: Namespace) -> bool:
+        """True if the installer already ran with these args and nothing changed."""
+        if not self.tracks(installer):
+            return False
+        with self._lock:
+            entry = self._installers.get(installer.name)
+        if entry is None or entry["args"] != _args_key(args):
+            return False
+
+        inputs, outputs = self._paths(installer, args)
+        for recorded, paths, required in (
+            (entry["inputs"], inputs, False),
+            (entry["outputs"], outputs, True),
+        ):
+            if set(recorded) != {str(p) for p in paths}:
+                return False
+            for p in paths:
+                current = fingerprint(p, recorded[str(p)])
+                # an output that is gone has to be installed again
+                if current is None and required:
+                    return False
+                if not _same(recorded[str(p)], current):
+                    return False
+        return True
+
+    def record(self, installer: "Installer", args: Namespace) -> bool:
+        """Record a successful run of the installer with args.
+
+        Returns:
+            False if one of its outputs is missing, the run is then not
+            recorded
+        """
+        inputs, outputs = self._paths(installer, args)
+        with self._lock:
+            previous = self._installers.get(installer.name) or {}
+            old_in = previous.get("inputs", {})
+            old_out = previous.get("outputs", {})
+            found = {str(p): fingerprint(p, old_out.get(str(p))) for p in outputs}
+            if None in found.values():
+                return False
+            self._installers[installer.name] = {
+                "args": _args_key(args),
+                "inputs": {
+                    str(p): fingerprint(p, old_in.get(str(p))) for p in inputs
+                },
+                "outputs": found,
+            }
+            self.dirty = True
+        return True
+
+    def forget(self, installer: "Installer"):
+        with self._lock:
+            if self._installers.pop(installer.name, None) is not None:
+                self.dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            write_json(
+                self.path,
+                {"version": JOURNAL_VERSION, "installers": self._installers},
+            )
+            self.dirty = False
@@ -0,0 +1,222 @@
+"""
+Cached index of the installers defined under a dotfiles root.
+
+Importing an install.py is the expensive part of starting the CLI, so the
+name/aliases/help and the described parser (for the zsh completion) of every
+installer is kept on disk along with the mtime, size and hash of the script
+that defined it. A script is only imported again when it changes, or when a
+directory its parser lists the choices of does; everything else is answered
+from the manifest.
+"""
+
+from __future__ import annotations
+
+import os
+import zlib
+from collections import namedtuple
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from installman.state import read_json, state_dir, write_json
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+
+    from installman import Installer
+
+MANIFEST_VERSION = 2
+
+
+class ManifestEntry(namedtuple("ManifestEntry", ["name", "aliases", "help", "script"])):
+    __slots__ = ()
+
+    name: str
+    aliases: tuple[str, ...]
+    help: str | None
+    script: Path
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        return (self.name, *self.aliases)
+
+
+def manifest_path(root: Path) -> Path:
+    # crc32 rather than hashlib, which takes longer to import than the rest
+    # of start up; load() checks the root, so a collision only costs a rescan
+    key = f"{zlib.crc32(str(root.resolve()).encode()):08x}"
+    return state_dir() / "manifests" / f"{key}.json"
+
+
+def _hash_file(path: Path) -> str:
+    import hashlib
+
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def directory_listing(directory: Path | str) -> list[str]:
+    try:
+        return sorted(os.listdir(directory))
+    except OSError:
+        return []
+
+
+def _listings_unchanged(cached: dict[str, Any]) -> bool:
+    return all(
+        directory_listing(directory) == names
+        for directory, names in cached["listings"].items()
+    )
+
+
+def _describe(installer: Installer, listings: dict[str, list[str]]) -> dict[str, Any]:
+    from installman.completion import describe_installer
+
+    return {
+        "name": installer.name,
+        "aliases": list(installer.aliases),
+        "help": installer.help,
+        "parser": describe_installer(installer, listings),
+    }
+
+
+class Manifest:
+    def __init__(
+        self,
+        root: Path,
+        path: Path,
+        scripts: dict[str, Any],
+        completion: dict[str, str] | None = None,
+    ) -> None:
+        self.root = root
+        self.path = path
+        self._scripts = scripts
+        # key and path of the zsh completion generated from these installers,
+        # dropped whenever an install script is added, removed or modified
+        self.completion = completion
+        self.dirty = False
+
+    @classmethod
+    def load(
+        cls,
+        root: Path,
+        scripts: Iterable[Path],
+        load_installers: Callable[[Path], list[Installer]],
+        path: Path | None = None,
+    ) -> Manifest:
+        """Load the manifest for root, re-importing only scripts that changed.
+
+        Args:
+            root: dotfiles root the scripts were discovered under
+            scripts: every install.py currently under root
+            load_installers: imports a script and returns its installers,
+                only called for new or modified scripts
+            path: where the manifest is stored, defaults to the state directory
+
+        Returns:
+            An up to date Manifest, saved back to disk if anything changed
+        """
+        path = path or manifest_path(root)
+        data = read_json(path)
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != MANIFEST_VERSION
+            or data.get("root") != str(root)
+        ):
+            data = {"scripts": {}}
+
+        manifest = cls(root, path, data["scripts"], data.get("completion"))
+        manifest.refresh(scripts, load_installers)
+        if manifest.dirty:
+            manifest.save()
+        return manifest
+
+    def refresh(
+        self,
+        scripts: Iterable[Path],
+        load_installers: Callable[[Path], list[Installer]],
+    ):
+        seen: set[str] = set()
+        for script in scripts:
+            key = str(script)
+            seen.add(key)
+            stat = script.stat()
+            cached = self._scripts.get(key)
+            if cached is not None and not _listings_unchanged(cached):
+                cached = None
+
+            if cached is not None and (
+                cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size
+            ):
+                continue
+
+            digest = _hash_file(script)
+            if cached is not None and cached["sha256"] == digest:
+                # touched but not modified, no need to import it again
+                cached["mtime_ns"] = stat.st_mtime_ns
+                cached["size"] = stat.st_size
+                self.dirty = True
+                continue
+
+            listings: dict[str, list[str]] = {}
+            installers = [_describe(i, listings) for i in load_installers(script)]
+            self._scripts[key] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": digest,
+                "installers": installers,
+                "listings": listings,
+            }
+            self.completion = None
+            self.dirty = True
+
+        for key in set(self._scripts) - seen:
+            del self._scripts[key]
+            self.completion = None
+            self.dirty = True
+
+    def save(self):
+        write_json(
+            self.path,
+            {
+                "version": MANIFEST_VERSION,
+                "root": str(self.root),
+                "scripts": self._scripts,
+                "completion": self.completion,
+            },
+        )
+        self.dirty = False
+
+    def entries(self) -> list[ManifestEntry]:
+        return [
+            ManifestEntry(
+                name=installer["name"],
+                aliases=tuple(installer["aliases"]),
+                help=installer["help"],
+                script=Path(script),
+            )
+            for script, info in sorted(self._scripts.items())
+            for installer in info["installers"]
+        ]
+
+    def parsers(self) -> dict[str, Any]:
+        """The described parser of every installer, by name."""
+        return {
+            installer["name"]: installer["parser"]
+            for info in self._scripts.values()
+            for installer in info["installers"]
+        }
+
+    def listings_key(self) -> str:
+        """Checksum of the directory listings the installers' parsers depend on."""
+        listings = sorted(
+            (directory, names)
+            for info in self._scripts.values()
+            for directory, names in info["listings"].items()
+        )
+        return f"{zlib.crc32(repr(listings).encode()):08x}"
+
+    def lookup(self, name: str) -> ManifestEntry | None:
+        for entry in self.entries():
+            if name in entry.names:
+                return entry
+        return None
@@ -0,0 +1,185 @@
+"""
+Coalescing fenced-block edits: every block aimed at one file is applied to a
+single in-memory copy, shown as one diff and written back once.
+"""
+
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, final
+
+from fencing import CodeFence, FencedDocument, copy_block
+
+from installman import SingleFileChange, editing
+from installman.timing import span
+
+if TYPE_CHECKING:
+    from installman.diffs import Region
+
+
+@dataclass(frozen=True)
+class FenceEdit:
+    fence: CodeFence
+    source: Path
+    replace: bool
+    label: str
+
+
+@final
+class FencePlan:
+    """All the fenced-block edits to make to one file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.edits: list[FenceEdit] = []
+        self.deferred = False
+        self._yes = True
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        fence: CodeFence,
+        source: Path,
+        *,
+        replace: bool = False,
+        label: str | None = None,
+    ) -> "FencePlan":
+        with self._lock:
+            self.edits.append(FenceEdit(fence, source, replace, label or fence.start))
+        return self
+
+    def change(self) -> SingleFileChange | None:
+        """Apply every edit to the current file contents in memory.
+
+        The file is scanned once for the blocks of every fence in the plan and
+        each edit only touches its own block.
+
+        Returns:
+            The combined change, or None if every block is already installed
+        """
+        before = self.path.read_text() if self.path.exists() else ""
+        with span(f"apply {len(self.edits)} blocks", "fencing", path=self.path):
+            after, regions = self._apply(before)
+
+        if after == before:
+            return None
+        return SingleFileChange(before, after, self.path, regions=regions)
+
+    def _apply(self, before: str) -> "tuple[str, list[Region] | None]":
+        """The new contents, and the edited regions if they are known."""
+        try:
+            document = FencedDocument(before, (edit.fence for edit in self.edits))
+        except ValueError:
+            # nested blocks, only one edit at a time gets these right
+            return self._apply_sequentially(before), None
+
+        for edit in self.edits:
+            block = edit.fence.first_block(edit.source.read_text())
+            if block is None:
+                raise ValueError(
+                    f"{edit.source} has no block matching the {edit.fence}"
+                )
+            if not document.copy_block(edit.fence, block, replace=edit.replace):
+                self._already_installed(edit)
+        return document.text, document.changes()
+
+    def _apply_sequentially(self, before: str) -> str:
+        after = before
+        for edit in self.edits:
+            _, after, changed = copy_block(
+                fence=edit.fence,
+                source=edit.source,
+                existing_content=after,
+                replace=edit.replace,
+            )
+            if not changed:
+                self._already_installed(edit)
+        return after
+
+    def _already_installed(self, edit: FenceEdit):
+        print(
+            f"{edit.label} is already installed in {self.path}! "
+            "Use --replace if you want to overwrite it"
+        )
+
+    def commit(self, yes: bool = False) -> bool:
+        """Show one diff for all the edits and write the file once.
+
+        Returns:
+            True if the file was changed
+        """
+        with editing(self.path):
+            change = self.change()
+            if change is None:
+                return False
+
+            applied = False
+
+            def onapplied():
+                nonlocal applied
+                applied = True
+                print("Applied!")
+
+            change.confirm(yes=yes, onapplied=onapplied)
+            return applied
+
+    def confirm(self, yes: bool = False) -> bool:
+        """Commit the plan now, or at the end of `deferred_plans()` if active."""
+        if self.deferred:
+            with self._lock:
+                self._yes = self._yes and yes
+            print(f"Queued {len(self.edits)} block(s) for {self.path}")
+            return False
+        return self.commit(yes=yes)
+
+
+_plans: dict[Path, FencePlan] = {}
+_plans_lock = threading.Lock()
+_deferring = False
+
+
+def plan_for(path: Path) -> FencePlan:
+    """The plan for edits to path.
+
+    Inside `deferred_plans()` every caller gets the same plan for a file, so
+    several installers editing e.g. ~/.zshrc end up with one write.
+    """
+    if not _deferring:
+        return FencePlan(path)
+
+    key = path.expanduser().absolute()
+    with _plans_lock:
+        if key not in _plans:
+            plan = _plans[key] = FencePlan(path)
+            plan.deferred = True
+        return _plans[key]
+
+
+@contextmanager
+def deferred_plans() -> Iterator[dict[Path, Exception]]:
+    """Collect plans from every installer and commit each file once on exit.
+
+    A plan that fails to commit doesn't stop the others from being written.
+
+    Yields:
+        The path of every plan that failed to commit, mapped to its error.
+        Filled in on exit.
+    """
+    global _deferring
+    _deferring = True
+    failures: dict[Path, Exception] = {}
+    try:
+        yield failures
+    finally:
+        _deferring = False
+        plans = list(_plans.values())
+        _plans.clear()
+
+    for plan in plans:
+        plan.deferred = False
+        try:
+            plan.commit(yes=plan._yes)
+        except Exception as e:
+            print(f"Failed to write {plan.path}: {type(e).__name__}: {e}")
+            failures[plan.path] = e
@@ -0,0 +1,170 @@
+"""
+Persistent cache of facts about the tools on this machine.
+
+PATH lookups, versions and things like `lazygit --print-config-dir` are
+stored in the state directory. A lookup is keyed by the PATH it was made
+with and is trusted for as long as the PATH directories it searched and the
+binary it found are unchanged (same inode, size and mtime), so repeated runs
+don't spawn subprocesses just to rediscover what is already known. Command
+output is also keyed by the environment variables that commonly change what
+a tool reports, see `PROBE_ENV`.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any
+
+from installman.state import read_json, state_dir, write_json
+from installman.timing import span
+
+PROBES_VERSION = 2
+
+# environment a tool's output usually depends on, e.g. where its config lives
+PROBE_ENV = (
+    "PATH",
+    "HOME",
+    "XDG_CONFIG_HOME",
+    "XDG_DATA_HOME",
+    "XDG_STATE_HOME",
+    "XDG_CACHE_HOME",
+)
+
+
+def _identity(path: str | None) -> list[int] | None:
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def _dir_mtimes(dirs: list[str]) -> list[int | None]:
+    mtimes = []
+    for d in dirs:
+        try:
+            mtimes.append(os.stat(d).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return mtimes
+
+
+class ProbeCache:
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or state_dir() / "probes.json"
+        data = read_json(self.path)
+        if not isinstance(data, dict) or data.get("version") != PROBES_VERSION:
+            data = {"which": {}, "output": {}}
+        self._which: dict[str, Any] = data["which"]
+        self._output: dict[str, Any] = data["output"]
+        self._lock = threading.Lock()
+
+    def save(self):
+        write_json(
+            self.path,
+            {"version": PROBES_VERSION, "which": self._which, "output": self._output},
+        )
+
+    def which(self, name: str) -> str | None:
+        """shutil.which, remembered across runs."""
+        search_path = os.environ.get("PATH", os.defpath)
+        key = f"{search_path}\0{name}"
+
+        with self._lock:
+            entry = self._which.get(key)
+        if (
+            entry is not None
+            and _dir_mtimes(entry["dirs"]) == entry["dir_mtimes"]
+            and _identity(entry["path"]) == entry["binary"]
+        ):
+            return entry["path"]
+
+        found = shutil.which(name, path=search_path)
+        # a new binary showing up in an earlier PATH directory changes that
+        # directory's mtime, so only the directories searched need checking
+        dirs = [d for d in search_path.split(os.pathsep) if d]
+        if found is not None:
+            parent = os.path.dirname(found)
+            dirs = dirs[: dirs.index(parent) + 1] if parent in dirs else dirs
+
+        with self._lock:
+            self._which[key] = {
+                "path": found,
+                "dirs": dirs,
+                "dir_mtimes": _dir_mtimes(dirs),
+                "binary": _identity(found),
+            }
+            self.save()
+        return found
+
+    def output(self, argv: list[str], env: tuple[str, ...] = ()) -> str:
+        """stdout of a command that only reports facts about a tool.
+
+        Re-run only when the tool's binary or the environment changes.
+
+        Args:
+            argv: the command, its first item is looked up on the PATH
+            env: environment variables the output depends on, on top of
+                `PROBE_ENV`
+
+        Raises:
+            FileNotFoundError: if the tool is not on the PATH
+            subprocess.CalledProcessError: if the command fails
+        """
+        binary = self.which(argv[0])
+        if binary is None:
+            raise FileNotFoundError(f"{argv[0]} not found on PATH")
+
+        environ = {name: os.environ.get(name) for name in (*PROBE_ENV, *env)}
+        key = json.dumps([binary, *argv[1:], environ], sort_keys=True)
+        with self._lock:
+            entry = self._output.get(key)
+        identity = _identity(binary)
+        if entry is not None and entry["binary"] == identity:
+            return entry["stdout"]
+
+        with span(" ".join(argv), "subprocess"):
+            stdout = subprocess.check_output([binary, *argv[1:]], text=True)
+        with self._lock:
+            self._output[key] = {"binary": identity, "stdout": stdout}
+            self.save()
+        return stdout
+
+    def clear(self):
+        with self._lock:
+            self._which.clear()
+            self._output.clear()
+            self.save()
+
+
+_probes: ProbeCache | None = None
+_probes_lock = threading.Lock()
+
+
+def probes() -> ProbeCache:
+    global _probes
+    with _probes_lock:
+        if _probes is None:
+            _probes = ProbeCache()
+        return _probes
+
+
+def which(name: str) -> str | None:
+    return probes().which(name)
+
+
+def probe_output(argv: list[str], env: tuple[str, ...] = ()) -> str:
+    return probes().output(argv, env)
+
+
+def tool_version(name: str, flag: str = "--version") -> str | None:
+    """First line of `name --version`, None if the tool isn't installed."""
+    try:
+        return probe_output([name, flag]).strip().splitlines()[0]
+    except (FileNotFoundError, subprocess.CalledProcessError, IndexError):
+        return None
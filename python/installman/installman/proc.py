@@ -0,0 +1,107 @@
+"""
+Async subprocess helper for installers that spend their time in external
+commands (git clones, cargo builds, downloads).
+
+Commands get a timeout, their output is streamed line by line with a
+prefix so concurrent commands stay readable, and a cancelled or timed out
+command is killed rather than left running.
+"""
+
+import asyncio
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+from installman.timing import span
+
+# how long a command gets to exit after SIGTERM before it is killed
+TERMINATE_GRACE = 5.0
+
+
+@dataclass(frozen=True)
+class Completed:
+    argv: list[str]
+    returncode: int
+    output: str
+
+
+async def _stop(proc: asyncio.subprocess.Process):
+    if proc.returncode is not None:
+        return
+    proc.terminate()
+    try:
+        await asyncio.wait_for(proc.wait(), TERMINATE_GRACE)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+
+
+async def run_command(
+    argv: list[str | Path],
+    *,
+    timeout: float | None = None,
+    prefix: str | None = None,
+    stream: bool = True,
+    check: bool = True,
+    cwd: Path | str | None = None,
+    env: dict[str, str] | None = None,
+) -> Completed:
+    """Run a command, streaming its combined stdout/stderr as it arrives.
+
+    Args:
+        argv: command and arguments
+        timeout: seconds before the command is killed
+        prefix: put in front of every output line, defaults to "[<command>] "
+        stream: print output while the command runs
+        check: raise if the command exits non-zero
+        cwd: working directory for the command
+        env: environment for the command
+
+    Returns:
+        Completed with the exit code and everything the command printed
+
+    Raises:
+        FileNotFoundError: if the command doesn't exist
+        subprocess.TimeoutExpired: if the timeout was reached
+        subprocess.CalledProcessError: if check and the command failed
+    """
+    args = [str(a) for a in argv]
+    if prefix is None:
+        prefix = f"[{Path(args[0]).name}] "
+
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        stdin=asyncio.subprocess.DEVNULL,
+        cwd=cwd,
+        env=env,
+        limit=2**20,
+    )
+    lines: list[str] = []
+
+    async def pump():
+        assert proc.stdout is not None
+        async for raw in proc.stdout:
+            line = raw.decode(errors="replace")
+            lines.append(line)
+            if stream:
+                print(prefix + line, end="" if line.endswith("\n") else "\n")
+        await proc.wait()
+
+    try:
+        with span(" ".join(args), "subprocess"):
+            await asyncio.wait_for(pump(), timeout)
+    except asyncio.TimeoutError:
+        await _stop(proc)
+        raise subprocess.TimeoutExpired(args, timeout or 0, "".join(lines)) from None
+    except BaseException:
+        # cancelled (or interrupted): don't leave the command running
+        await _stop(proc)
+        raise
+
+    output = "".join(lines)
+    assert proc.returncode is not None
+    if check and proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, args, output)
+    return Completed(args, proc.returncode, output)
@@ -0,0 +1,151 @@
+"""
+Dependency-aware scheduling of installers on a bounded thread pool.
+
+Jobs start as soon as everything they require has finished, so a full run
+takes as long as the slowest chain of dependencies rather than the sum of
+every installer.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Literal
+
+type Status = Literal["ok", "failed", "skipped"]
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    run: Callable[[], None]
+    requires: tuple[str, ...] = ()
+
+
+@dataclass
+class JobResult:
+    name: str
+    status: Status
+    elapsed: float = 0.0
+    error: BaseException | None = None
+    blocked_by: str | None = None
+
+
+@dataclass
+class Schedule:
+    results: list[JobResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(result.status == "ok" for result in self.results)
+
+    def summary(self) -> str:
+        width = max((len(r.name) for r in self.results), default=0)
+        lines = [f"Finished in {self.elapsed:.2f}s:"]
+        for r in self.results:
+            line = f"  {r.name:<{width}}  {r.status:<7}"
+            if r.status == "skipped":
+                line += f"  (needs {r.blocked_by})"
+            else:
+                line += f"  {r.elapsed:6.2f}s"
+            if r.error is not None:
+                line += f"  {type(r.error).__name__}: {r.error}"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def topological_order(jobs: list[Job]) -> list[str]:
+    """Order job names so every job comes after the jobs it requires.
+
+    Raises:
+        ValueError: if a job requires an unknown job or there is a cycle
+    """
+    by_name = {job.name: job for job in jobs}
+    for job in jobs:
+        for dep in job.requires:
+            if dep not in by_name:
+                raise ValueError(f"{job.name} requires {dep}, which is not scheduled")
+
+    order: list[str] = []
+    state: dict[str, int] = {}  # 1 = visiting, 2 = done
+
+    def visit(name: str, chain: tuple[str, ...]):
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"dependency cycle: {' -> '.join(chain + (name,))}")
+        state[name] = 1
+        for dep in by_name[name].requires:
+            visit(dep, chain + (name,))
+        state[name] = 2
+        order.append(name)
+
+    for job in jobs:
+        visit(job.name, ())
+    return order
+
+
+def run_jobs(jobs: list[Job], max_workers: int = 4) -> Schedule:
+    """Run jobs concurrently, each one only after all of its requirements.
+
+    A job whose requirement failed (or was skipped) is skipped.
+
+    Args:
+        jobs: jobs to run, requirements must refer to other jobs in the list
+        max_workers: maximum number of jobs running at once
+
+    Returns:
+        Schedule with a result per job, in topological order
+    """
+    order = topological_order(jobs)
+    by_name = {job.name: job for job in jobs}
+    waiting = {job.name: set(job.requires) for job in jobs}
+    dependents: dict[str, list[str]] = {job.name: [] for job in jobs}
+    for job in jobs:
+        for dep in job.requires:
+            dependents[dep].append(job.name)
+
+    results: dict[str, JobResult] = {}
+
+    def timed(job: Job) -> JobResult:
+        start = time.perf_counter()
+        try:
+            job.run()
+        except KeyboardInterrupt:
+            raise
+        except BaseException as e:
+            return JobResult(job.name, "failed", time.perf_counter() - start, e)
+        return JobResult(job.name, "ok", time.perf_counter() - start)
+
+    def skip(name: str, blocked_by: str):
+        if name in results:
+            return
+        results[name] = JobResult(name, "skipped", blocked_by=blocked_by)
+        for dependent in dependents[name]:
+            skip(dependent, name)
+
+    start = time.perf_counter()
+    ready = [name for name in order if not waiting[name]]
+    running: dict[Future[JobResult], str] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while ready or running:
+            for name in ready:
+                running[pool.submit(timed, by_name[name])] = name
+            ready = []
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                result = results[name] = future.result()
+                for dependent in dependents[name]:
+                    if result.status != "ok":
+                        skip(dependent, name)
+                        continue
+                    waiting[dependent].discard(name)
+                    if not waiting[dependent] and dependent not in results:
+                        ready.append(dependent)
+
+    return Schedule(
+        results=[results[name] for name in order],
+        elapsed=time.perf_counter() - start,
+    )
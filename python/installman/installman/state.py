@@ -0,0 +1,47 @@
+"""
+Location and helpers for the on-disk state installman keeps between runs
+(installer manifests, caches, journals).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+
+
+def state_dir() -> Path:
+    """Directory for installman state.
+
+    Uses $INSTALLMAN_STATE_DIR if set, otherwise $XDG_STATE_HOME/installman,
+    falling back to ~/.local/state/installman.
+    """
+    override = os.environ.get("INSTALLMAN_STATE_DIR")
+    if override:
+        return Path(override).expanduser()
+
+    xdg = os.environ.get("XDG_STATE_HOME")
+    base = Path(xdg).expanduser() if xdg else Path.home() / ".local" / "state"
+    return base / "installman"
+
+
+def read_json(path: Path) -> Any | None:
+    """Read a JSON state file, returning None if it is missing or unreadable."""
+    try:
+        with path.open() as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path: Path, data: Any) -> None:
+    """Write a JSON state file, replacing the old one in a single rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with tmp.open("w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
@@ -0,0 +1,160 @@
+"""
+Mirroring a directory tree as per-file symlinks.
+
+The source and destination trees are walked together with os.scandir to
+build a plan (links to create, links already correct, conflicts, stale
+links to remove) and only the difference is applied, so re-running on an
+installed tree costs one scandir per directory and no writes.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+DEFAULT_SKIP = frozenset({"__pycache__"})
+
+
+@dataclass
+class SymlinkPlan:
+    source: Path
+    destination: Path
+    mkdirs: list[Path] = field(default_factory=list)
+    create: list[tuple[Path, Path]] = field(default_factory=list)
+    correct: int = 0
+    conflicts: list[Path] = field(default_factory=list)
+    stale: list[Path] = field(default_factory=list)
+
+    @property
+    def changes(self) -> bool:
+        return bool(self.mkdirs or self.create or self.stale)
+
+    def apply(self, max_workers: int | None = None) -> list[tuple[Path, OSError]]:
+        """Create directories and links, remove stale links.
+
+        Conflicts are left alone. Links are created on a thread pool when
+        max_workers is more than 1.
+
+        Returns:
+            (path, error) for every link that could not be created or removed
+        """
+        failed: list[tuple[Path, OSError]] = []
+
+        for directory in self.mkdirs:
+            directory.mkdir(parents=True, exist_ok=True)
+
+        for link in self.stale:
+            try:
+                link.unlink()
+            except OSError as e:
+                failed.append((link, e))
+
+        def create(pair: tuple[Path, Path]) -> tuple[Path, OSError] | None:
+            link, target = pair
+            try:
+                link.symlink_to(target)
+            except OSError as e:
+                return (link, e)
+            return None
+
+        if max_workers is not None and max_workers > 1 and len(self.create) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(create, self.create))
+        else:
+            results = [create(pair) for pair in self.create]
+        failed.extend(r for r in results if r is not None)
+        return failed
+
+    def summary(self) -> str:
+        return (
+            f"{self.destination}: {len(self.create)} to link, {self.correct} already "
+            f"linked, {len(self.stale)} stale, {len(self.conflicts)} conflicting, "
+            f"{len(self.mkdirs)} new directories"
+        )
+
+
+def _points_to(link: str, target: str) -> bool:
+    try:
+        current = os.readlink(link)
+    except OSError:
+        return False
+    if current == target:
+        return True
+    return os.path.realpath(link) == os.path.realpath(target)
+
+
+def _is_stale(path: str, source: str) -> bool:
+    """A symlink into the source tree whose target is gone."""
+    try:
+        target = os.readlink(path)
+    except OSError:
+        return False
+    target = os.path.normpath(os.path.join(os.path.dirname(path), target))
+    return target.startswith(source + os.sep) and not os.path.exists(target)
+
+
+def plan_symlinks(
+    source: Path, destination: Path, skip: frozenset[str] = DEFAULT_SKIP
+) -> SymlinkPlan:
+    """Work out what it takes to mirror every file in source into destination.
+
+    Args:
+        source: tree with the real files
+        destination: tree to hold the symlinks
+        skip: names of files and directories in source to leave out
+    """
+    plan = SymlinkPlan(source, destination)
+    src_root = os.path.abspath(source)
+    # (source dir, destination dir, whether destination dir exists)
+    stack = [(src_root, os.path.abspath(destination), destination.is_dir())]
+
+    while stack:
+        src_dir, dest_dir, dest_exists = stack.pop()
+        existing: dict[str, os.DirEntry[str]] = {}
+        if dest_exists:
+            existing = {entry.name: entry for entry in os.scandir(dest_dir)}
+
+        seen: set[str] = set()
+        for entry in os.scandir(src_dir):
+            if entry.name in skip:
+                continue
+            seen.add(entry.name)
+            dest = os.path.join(dest_dir, entry.name)
+            current = existing.get(entry.name)
+
+            if entry.is_dir(follow_symlinks=False):
+                if current is None:
+                    plan.mkdirs.append(Path(dest))
+                    stack.append((entry.path, dest, False))
+                elif current.is_symlink():
+                    # a whole directory linked into source is already correct
+                    if _points_to(dest, entry.path):
+                        plan.correct += 1
+                    else:
+                        plan.conflicts.append(Path(dest))
+                elif current.is_dir():
+                    stack.append((entry.path, dest, True))
+                else:
+                    plan.conflicts.append(Path(dest))
+                continue
+
+            if not entry.is_file():
+                continue
+            if current is None:
+                plan.create.append((Path(dest), Path(entry.path)))
+            elif current.is_symlink() and _points_to(dest, entry.path):
+                plan.correct += 1
+            elif current.is_symlink() and _is_stale(dest, src_root):
+                # left over from an older layout of source, replace it
+                plan.stale.append(Path(dest))
+                plan.create.append((Path(dest), Path(entry.path)))
+            else:
+                plan.conflicts.append(Path(dest))
+
+        for name, current in existing.items():
+            if name in seen or not current.is_symlink():
+                continue
+            if _is_stale(current.path, src_root):
+                plan.stale.append(Path(current.path))
+
+    return plan
@@ -0,0 +1,167 @@
+"""
+Low-overhead spans for finding out where an install.py run spends its time.
+
+    with span("clone tpm", "subprocess"):
+        ...
+
+Spans cost a single attribute check while recording is off (the default).
+`install.py --timings` turns recording on and prints a per-category
+breakdown, `--trace FILE` also writes a Chrome/Perfetto trace.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+
+# categories used by installman itself
+DISCOVERY = "discovery"
+IMPORT = "import"
+PARSER = "parser"
+INSTALL = "install"
+FENCING = "fencing"
+DIFF = "diff"
+WRITE = "write"
+PROMPT = "prompt"
+SUBPROCESS = "subprocess"
+
+
+class Span:
+    __slots__ = ("name", "category", "start_ns", "end_ns", "thread", "args")
+
+    def __init__(
+        self,
+        name: str,
+        category: str,
+        start_ns: int,
+        end_ns: int = 0,
+        thread: int = 0,
+        args: dict[str, Any] | None = None,
+    ) -> None:
+        self.name = name
+        self.category = category
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self.thread = thread
+        self.args = args if args is not None else {}
+
+    @property
+    def seconds(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+
+class _ActiveSpan:
+    __slots__ = ("_recorder", "_span")
+
+    def __init__(self, recorder: "Recorder", span: Span) -> None:
+        self._recorder = recorder
+        self._span = span
+
+    def __enter__(self) -> Span:
+        self._span.start_ns = time.perf_counter_ns()
+        return self._span
+
+    def __exit__(self, *exc: object):
+        self._span.end_ns = time.perf_counter_ns()
+        self._recorder.add(self._span)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: object):
+        return None
+
+
+_NULL = _NullSpan()
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.spans: list[Span] = []
+        self.origin_ns = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+        self.origin_ns = time.perf_counter_ns()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def span(self, name: str, category: str = INSTALL, **args: Any):
+        if not self.enabled:
+            return _NULL
+        return _ActiveSpan(
+            self, Span(name, category, 0, thread=threading.get_ident(), args=args)
+        )
+
+    def breakdown(self) -> str:
+        """Total time per category, prompts reported on their own."""
+        total = (time.perf_counter_ns() - self.origin_ns) / 1e9
+        totals: dict[str, float] = {}
+        counts: dict[str, int] = {}
+        for s in self.spans:
+            totals[s.category] = totals.get(s.category, 0.0) + s.seconds
+            counts[s.category] = counts.get(s.category, 0) + 1
+
+        lines = [f"Timings (wall {total * 1000:.1f}ms):"]
+        for category, seconds in totals.items():
+            if category == PROMPT:
+                continue
+            lines.append(
+                f"  {category:<12} {seconds * 1000:10.1f}ms  ({counts[category]} spans)"
+            )
+        if PROMPT in totals:
+            lines.append(
+                f"  waiting on prompts {totals[PROMPT] * 1000:.1f}ms "
+                f"({counts[PROMPT]} prompts, included in the times above)"
+            )
+        lines.append(
+            "  (spans nest, e.g. subprocess and prompt time is part of install)"
+        )
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict[str, Any]:
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": s.name,
+                    "cat": s.category,
+                    "ph": "X",
+                    "ts": (s.start_ns - self.origin_ns) / 1000,
+                    "dur": (s.end_ns - s.start_ns) / 1000,
+                    "pid": pid,
+                    "tid": s.thread,
+                    "args": {k: str(v) for k, v in s.args.items()},
+                }
+                for s in self.spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write_trace(self, path: Path):
+        path.write_text(json.dumps(self.chrome_trace()))
+
+
+recorder = Recorder()
+
+
+def span(name: str, category: str = INSTALL, **args: Any):
+    """Time a block of code when recording is on, otherwise do nothing."""
+    if not recorder.enabled:
+        return _NULL
+    return recorder.span(name, category, **args)
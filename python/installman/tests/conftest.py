@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    """Keep manifests, journals and caches out of the real state directory."""
+    path = tmp_path / "state"
+    monkeypatch.setenv("INSTALLMAN_STATE_DIR", str(path))
+    return path
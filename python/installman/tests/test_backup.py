@@ -0,0 +1,76 @@
+import pytest
+
+from installman.backup import BackupStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BackupStore(tmp_path / "backups")
+
+
+def test_file_round_trip(tmp_path, store):
+    path = tmp_path / "rc"
+    path.write_text("original\n")
+    path.chmod(0o640)
+
+    entry = store.backup(path)
+    assert not path.exists()
+    assert entry.kind == "file"
+
+    path.symlink_to(tmp_path / "elsewhere")
+    assert store.restore(entry) == path
+    assert not path.is_symlink()
+    assert path.read_text() == "original\n"
+    assert path.stat().st_mode & 0o777 == 0o640
+    assert store.entries() == []
+
+
+def test_same_content_is_stored_once(tmp_path, store):
+    for name in ("a", "b"):
+        (tmp_path / name).write_text("same\n")
+    first = store.backup(tmp_path / "a")
+    second = store.backup(tmp_path / "b")
+
+    assert first.ref == second.ref
+    assert len(list((store.root / "objects").iterdir())) == 1
+
+    store.restore(first)
+    store.restore(second)
+    assert (tmp_path / "a").read_text() == (tmp_path / "b").read_text() == "same\n"
+
+
+def test_directory_and_link_round_trip(tmp_path, store):
+    directory = tmp_path / "config"
+    (directory / "nested").mkdir(parents=True)
+    (directory / "nested" / "file").write_text("x")
+    link = tmp_path / "link"
+    link.symlink_to("somewhere/else")
+
+    dir_entry, link_entry = store.backup(directory), store.backup(link)
+    assert (dir_entry.kind, link_entry.kind) == ("dir", "link")
+    assert not directory.exists() and not link.is_symlink()
+
+    store.restore(dir_entry)
+    store.restore(link_entry)
+    assert (directory / "nested" / "file").read_text() == "x"
+    assert str(link.readlink()) == "somewhere/else"
+
+
+def test_latest_and_restore_refuses_to_overwrite(tmp_path, store):
+    path = tmp_path / "rc"
+    path.write_text("first\n")
+    store.backup(path)
+    path.write_text("second\n")
+    latest = store.backup(path)
+
+    assert store.latest(path) == latest
+    assert len(store.entries()) == 2
+
+    path.write_text("in the way\n")
+    with pytest.raises(FileExistsError):
+        store.restore(latest)
+
+
+def test_nothing_to_back_up(tmp_path, store):
+    with pytest.raises(FileNotFoundError):
+        store.backup(tmp_path / "missing")
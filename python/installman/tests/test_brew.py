@@ -0,0 +1,56 @@
+import os
+import stat
+
+import pytest
+
+from installman import install_all, installer, probe
+from installman.brew import _forget_installed, brew_install
+
+
+@pytest.fixture
+def brew(tmp_path, monkeypatch):
+    """A stub brew on the PATH, returns the file it logs its calls to."""
+    bin_dir, calls = tmp_path / "bin", tmp_path / "brew-calls"
+    bin_dir.mkdir()
+    stub = bin_dir / "brew"
+    stub.write_text(
+        "#!/bin/sh\n"
+        f'echo "$*" >> {calls}\n'
+        'if [ "$1" = list ]; then echo installed-pkg; fi\n'
+    )
+    stub.chmod(stub.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.defpath}")
+    monkeypatch.setattr(probe, "_probes", None)
+    _forget_installed()
+    yield calls
+    _forget_installed()
+
+
+def logged(calls):
+    return calls.read_text().splitlines() if calls.exists() else []
+
+
+def test_missing_packages_are_installed_in_one_call(brew):
+    assert brew_install(["pkg-b", "installed-pkg", "pkg-a"], yes=True)
+
+    assert logged(brew) == ["list -1", "install pkg-a pkg-b"]
+
+
+def test_nothing_to_install(brew):
+    assert brew_install(["installed-pkg"], yes=True)
+
+    assert logged(brew) == ["list -1"]
+
+
+def test_install_all_batches_every_installers_packages(brew):
+    @installer("a", all_args=[], brew=["pkg-a", "installed-pkg"])
+    def a(args):
+        pass
+
+    @installer("b", all_args=[], brew=["pkg-b", "pkg-a"])
+    def b(args):
+        pass
+
+    assert install_all([a, b], yes=True)
+
+    assert logged(brew) == ["list -1", "install pkg-a pkg-b"]
@@ -0,0 +1,132 @@
+import installman
+import installman.completion
+from installman import Installer
+from installman.manifest import Manifest
+
+
+def make_manifest(tmp_path, scripts=(), load=lambda script: []):
+    root = tmp_path / "dotfiles"
+    root.mkdir(exist_ok=True)
+    return Manifest.load(root, list(scripts), load)
+
+
+class Scripts:
+    """Choices listing a directory, like bin's BinChoices."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def __contains__(self, name):
+        return (self.directory / name).is_file()
+
+    def __iter__(self):
+        return iter(sorted(p.name for p in self.directory.iterdir()))
+
+
+def bin_installer(directory):
+    bin = Installer("bin", print, {"help": "pick scripts"})
+
+    @bin.parser
+    def _(parser):
+        parser.add_argument("--force", action="store_true", help="overwrite")
+        parser.add_argument("config", nargs="+", choices=Scripts(directory))
+
+    return bin
+
+
+def load_bin(script):
+    return [bin_installer(script.parent)]
+
+
+def make_script(tmp_path):
+    script = tmp_path / "dotfiles" / "bin" / "install.py"
+    script.parent.mkdir(parents=True)
+    _ = script.write_text("")
+    return script
+
+
+def count_writes(monkeypatch):
+    writes = []
+    write = installman.completion.write_completion
+
+    def counting(info, commands, path=None):
+        writes.append(commands)
+        return write(info, commands, path)
+
+    monkeypatch.setattr(installman.completion, "write_completion", counting)
+    return writes
+
+
+def test_written_once_until_the_installers_change(tmp_path, monkeypatch):
+    writes = count_writes(monkeypatch)
+    manifest = make_manifest(tmp_path)
+
+    installman._update_completion(manifest, ("dotinstall", "di"))
+    path = installman.completion.completion_dir() / "_dotinstall"
+    assert path.read_text().startswith("#compdef dotinstall di\n")
+
+    installman._update_completion(make_manifest(tmp_path), ("dotinstall", "di"))
+    assert len(writes) == 1
+
+    script = tmp_path / "dotfiles" / "vim" / "install.py"
+    script.parent.mkdir()
+    _ = script.write_text("")
+    installman._update_completion(
+        make_manifest(tmp_path, [script]), ("dotinstall", "di")
+    )
+    assert len(writes) == 2
+
+
+def test_written_again_when_the_file_is_gone(tmp_path, monkeypatch):
+    writes = count_writes(monkeypatch)
+    installman._update_completion(make_manifest(tmp_path), ("dotinstall", "di"))
+    (installman.completion.completion_dir() / "_dotinstall").unlink()
+
+    installman._update_completion(make_manifest(tmp_path), ("dotinstall", "di"))
+    assert len(writes) == 2
+
+
+def test_renamed_commands_replace_the_old_file(tmp_path, monkeypatch):
+    writes = count_writes(monkeypatch)
+    installman._update_completion(make_manifest(tmp_path), ("dotinstall", "di"))
+
+    installman._update_completion(make_manifest(tmp_path), ("di",))
+    directory = installman.completion.completion_dir()
+    assert writes == [("dotinstall", "di"), ("di",)]
+    assert [p.name for p in directory.iterdir()] == ["_di"]
+    assert (directory / "_di").read_text().startswith("#compdef di\n")
+
+
+def test_written_from_the_manifest_without_importing(tmp_path):
+    script = make_script(tmp_path)
+    loaded = []
+
+    def load(script):
+        loaded.append(script)
+        return load_bin(script)
+
+    manifest = make_manifest(tmp_path, [script], load)
+    assert loaded == [script]
+    (installman.completion.completion_dir() / "_di").unlink(missing_ok=True)
+
+    installman._update_completion(manifest, ("di",))
+
+    assert loaded == [script]
+    text = (installman.completion.completion_dir() / "_di").read_text()
+    assert "'--force[overwrite]'" in text
+    assert "(install.py)" in text
+
+
+def test_written_again_when_a_listed_directory_changes(tmp_path, monkeypatch):
+    writes = count_writes(monkeypatch)
+    script = make_script(tmp_path)
+    installman._update_completion(make_manifest(tmp_path, [script], load_bin), ("di",))
+    installman._update_completion(make_manifest(tmp_path, [script], load_bin), ("di",))
+    assert len(writes) == 1
+
+    _ = (script.parent / "tmux-sessionizer").write_text("")
+    installman._update_completion(make_manifest(tmp_path, [script], load_bin), ("di",))
+
+    assert len(writes) == 2
+    text = (installman.completion.completion_dir() / "_di").read_text()
+    assert "(install.py tmux-sessionizer)" in text
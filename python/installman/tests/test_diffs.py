@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+import installman
+from installman import SingleFileChange
+from installman.diffs import unified_diff
+
+
+def full_diff(before, after, name="rc"):
+    return list(unified_diff(before, after, name))
+
+
+def edit(before, rng):
+    """Replace a few runs of lines, returning the new text and the regions."""
+    lines = before.splitlines(keepends=True)
+    regions, pieces, position, offset = [], [], 0, 0
+    for start in sorted(rng.sample(range(len(lines)), 3)):
+        if start < position:
+            continue
+        end = min(len(lines), start + rng.randrange(1, 3))
+        old = "".join(lines[start:end])
+        added = [f"-- changed {start}\n", f"++ added {start}\n"]
+        new = "".join(added[: rng.randrange(3)])
+        before_start = sum(map(len, lines[:start]))
+        after_start = before_start + offset
+        regions.append(
+            (
+                (before_start, before_start + len(old)),
+                (after_start, after_start + len(new)),
+            )
+        )
+        pieces += ["".join(lines[position:start]), new]
+        offset += len(new) - len(old)
+        position = end
+    pieces.append("".join(lines[position:]))
+    return "".join(pieces), regions
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_region_diff_matches_full_diff(seed):
+    rng = random.Random(seed)
+    prefixes = ["-- lua comment", "++i;", "--- x", "+++ y", "line"]
+    before = "".join(f"{rng.choice(prefixes)} {i}\n" for i in range(40))
+    after, regions = edit(before, rng)
+
+    assert list(unified_diff(before, after, "rc", regions=regions)) == full_diff(
+        before, after
+    )
+
+
+def test_changed_lines_starting_like_headers_are_kept():
+    before = "a\n-- removed lua comment\nb\n"
+    after = "a\n++ added\nb\n"
+    regions = [((2, 25), (2, 11))]
+
+    lines = list(unified_diff(before, after, "init.lua", regions=regions))
+
+    assert lines == full_diff(before, after, "init.lua")
+    assert "--- removed lua comment\n" in lines
+    assert "+++ added\n" in lines
+
+
+def test_diff_is_truncated():
+    before = "".join(f"{i}\n" for i in range(100))
+    after = "".join(f"{i} changed\n" for i in range(100))
+
+    lines = list(unified_diff(before, after, "rc", max_lines=10))
+
+    dropped = len(full_diff(before, after)) - 10
+    assert len(lines) == 11
+    assert lines[-1] == f"... {dropped} more lines not shown\n"
+
+
+def test_diff_within_the_limit_is_whole():
+    before, after = "a\n", "b\n"
+    full = full_diff(before, after, "rc")
+
+    assert list(unified_diff(before, after, "rc", max_lines=len(full))) == full
+
+
+def test_confirm_shows_the_whole_diff_by_default(tmp_path, capsys):
+    before = "".join(f"{i}\n" for i in range(1000))
+    after = before.replace("\n", " changed\n")
+    change = SingleFileChange(before, after, tmp_path / "rc")
+
+    change.confirm(yes=True)
+
+    out = capsys.readouterr().out
+    assert "not shown" not in out
+    assert "+999 changed\n" in out
+
+
+def test_confirm_cuts_the_diff_at_the_configured_limit(tmp_path, capsys, monkeypatch):
+    before = "".join(f"{i}\n" for i in range(100))
+    after = before.replace("\n", " changed\n")
+    change = SingleFileChange(before, after, tmp_path / "rc")
+    monkeypatch.setattr(installman, "MAX_DIFF_LINES", 10)
+
+    change.confirm(yes=True)
+
+    out = capsys.readouterr().out
+    assert "+99 changed\n" not in out
+    assert f"... {len(full_diff(before, after)) - 10} more lines not shown\n" in out
+
+
+def test_limit_comes_from_the_environment(tmp_path, monkeypatch):
+    manifest = installman.Manifest.load(tmp_path, [], lambda script: [])
+    monkeypatch.setenv("INSTALLMAN_MAX_DIFF_LINES", "40")
+    parser = installman._root_parser(manifest, {})
+
+    assert parser.parse_args([]).max_diff_lines == 40
+    assert parser.parse_args(["--max-diff-lines", "5"]).max_diff_lines == 5
@@ -0,0 +1,79 @@
+import pytest
+
+from installman.discovery import discover
+
+
+def touch(root, *paths):
+    for path in paths:
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text("")
+
+
+def found(root, **kwargs):
+    return [p.relative_to(root).as_posix() for p in discover(root, **kwargs).scripts]
+
+
+@pytest.fixture
+def dotfiles(tmp_path):
+    touch(
+        tmp_path,
+        "install.py",
+        "vim/install.py",
+        "zsh/plugins/install.py",
+        "node_modules/pkg/install.py",
+        "pkg.egg-info/install.py",
+        ".git/hooks/install.py",
+    )
+    return tmp_path
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_default_prune_list(dotfiles, parallel):
+    result = discover(dotfiles, parallel=parallel)
+
+    assert [p.relative_to(dotfiles).as_posix() for p in result.scripts] == [
+        "install.py",
+        "vim/install.py",
+        "zsh/plugins/install.py",
+    ]
+    assert result.stats.pruned == 3
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_ignore_files(dotfiles, parallel):
+    touch(dotfiles, "vendor/install.py", "zsh/old/install.py", "zsh/keep/install.py")
+    (dotfiles / ".gitignore").write_text("# comment\nvendor/\n")
+    (dotfiles / "zsh" / ".installignore").write_text("*\n!keep/\n!install.py\n")
+
+    assert found(dotfiles, parallel=parallel) == [
+        "install.py",
+        "vim/install.py",
+        "zsh/keep/install.py",
+    ]
+
+
+def test_anchored_rules_only_match_below_their_directory(dotfiles):
+    touch(dotfiles, "vim/plugins/install.py")
+    (dotfiles / "vim" / ".installignore").write_text("/plugins\n")
+
+    assert found(dotfiles) == [
+        "install.py",
+        "vim/install.py",
+        "zsh/plugins/install.py",
+    ]
+
+
+def test_dir_only_rules_keep_files(dotfiles):
+    (dotfiles / ".installignore").write_text("install.py/\n")
+
+    assert "vim/install.py" in found(dotfiles)
+
+
+def test_custom_filename_and_prune(dotfiles):
+    touch(dotfiles, "vim/setup.py", "build/setup.py")
+
+    assert found(dotfiles, filename="setup.py", prune=frozenset()) == [
+        "build/setup.py",
+        "vim/setup.py",
+    ]
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from installman import files
+from installman.files import write_file
+
+
+def test_unchanged_content_is_not_written(tmp_path):
+    path = tmp_path / "rc"
+    assert write_file(path, "same\n")
+    os.utime(path, ns=(0, 0))
+    skipped = files.write_stats.files_skipped
+
+    assert not write_file(path, "same\n")
+    assert path.stat().st_mtime_ns == 0
+    assert files.write_stats.files_skipped == skipped + 1
+
+
+def test_writes_through_symlinks(tmp_path):
+    target = tmp_path / "dotfiles" / "rc"
+    target.parent.mkdir()
+    _ = target.write_text("old\n")
+    link = tmp_path / "rc"
+    link.symlink_to(target)
+
+    assert write_file(link, "new\n")
+    assert link.is_symlink()
+    assert target.read_text() == "new\n"
+
+
+def test_keeps_the_mode(tmp_path):
+    path = tmp_path / "script"
+    _ = path.write_text("old\n")
+    path.chmod(0o751)
+
+    assert write_file(path, "new\n")
+    assert path.stat().st_mode & 0o7777 == 0o751
+
+
+@pytest.mark.skipif(os.geteuid() != 0, reason="only root can give files away")
+def test_keeps_the_owner(tmp_path):
+    path = tmp_path / "rc"
+    _ = path.write_text("old\n")
+    os.chown(path, 1234, 1234)
+
+    assert write_file(path, "new\n")
+    assert (path.stat().st_uid, path.stat().st_gid) == (1234, 1234)
+
+
+def test_failed_write_leaves_the_original(tmp_path, monkeypatch):
+    path = tmp_path / "rc"
+    _ = path.write_text("old\n")
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(files.os, "replace", fail)
+    with pytest.raises(OSError, match="disk full"):
+        _ = write_file(path, "new\n")
+
+    assert path.read_text() == "old\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["rc"]
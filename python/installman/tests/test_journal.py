@@ -0,0 +1,104 @@
+from argparse import Namespace
+
+import pytest
+
+from installman import _run_journaled, installer
+from installman.journal import Journal, note_skipped
+
+
+@pytest.fixture
+def paths(tmp_path):
+    source, target = tmp_path / "source", tmp_path / "target"
+    source.write_text("config\n")
+    return source, target
+
+
+def copier(source, target, skip=False):
+    @installer("copy", inputs=[source], outputs=[target])
+    def install(args):
+        if skip:
+            note_skipped()
+            return
+        target.write_text(source.read_text())
+
+    return install
+
+
+def run(journal, copy, args=None):
+    args = args or Namespace(yes=True)
+    if _run_journaled(copy, args, journal):
+        journal.record(copy, args)
+        return True
+    return False
+
+
+def test_unchanged_installer_is_up_to_date(paths):
+    copy, journal = copier(*paths), Journal()
+
+    assert run(journal, copy)
+    assert journal.up_to_date(copy, Namespace(yes=True))
+    # args that only change how it asks are ignored
+    assert journal.up_to_date(copy, Namespace(yes=False))
+    assert not journal.up_to_date(copy, Namespace(yes=True, replace=True))
+
+
+def test_changed_input_or_output_is_stale(paths):
+    source, target = paths
+    copy, journal = copier(source, target), Journal()
+    run(journal, copy)
+
+    source.write_text("new config\n")
+    assert not journal.up_to_date(copy, Namespace())
+    run(journal, copy)
+    assert journal.up_to_date(copy, Namespace())
+
+    target.write_text("edited by hand\n")
+    assert not journal.up_to_date(copy, Namespace())
+
+
+def test_missing_output_is_stale(paths):
+    source, target = paths
+    copy, journal = copier(source, target), Journal()
+    run(journal, copy)
+
+    target.unlink()
+
+    assert not journal.up_to_date(copy, Namespace())
+
+
+def test_run_with_missing_outputs_is_not_recorded(paths):
+    source, target = paths
+
+    @installer("copy", inputs=[source], outputs=[target])
+    def does_nothing(args):
+        pass
+
+    journal = Journal()
+    assert not journal.record(does_nothing, Namespace())
+    assert not journal.dirty
+    assert not journal.up_to_date(does_nothing, Namespace())
+
+
+def test_skipped_run_is_not_recorded(paths):
+    source, target = paths
+    target.write_text("left over from before\n")
+    journal = Journal()
+
+    assert not run(journal, copier(source, target, skip=True))
+    assert not journal.up_to_date(copier(source, target), Namespace())
+
+
+def test_journal_is_saved(paths, state_dir):
+    copy, journal = copier(*paths), Journal()
+    run(journal, copy)
+    journal.save()
+
+    assert (state_dir / "journal.json").exists()
+    assert Journal().up_to_date(copy, Namespace())
+
+
+def test_profiling_args_are_ignored(paths):
+    copy, journal = copier(*paths), Journal()
+    run(journal, copy, Namespace(timings=False, trace=None))
+
+    assert journal.up_to_date(copy, Namespace(timings=True, trace="run.json"))
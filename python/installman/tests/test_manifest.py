@@ -0,0 +1,102 @@
+import os
+
+from installman import Installer
+from installman.manifest import Manifest
+
+
+def installer(name, *aliases, help=None):
+    return Installer(name, print, {"aliases": aliases, "help": help})
+
+
+class Loader:
+    """Stands in for importing a script, recording which ones were imported."""
+
+    def __init__(self, installers):
+        self.installers = installers
+        self.loaded = []
+
+    def __call__(self, script):
+        self.loaded.append(script)
+        return self.installers[script.parent.name]
+
+
+def make_script(root, name):
+    script = root / name / "install.py"
+    script.parent.mkdir(parents=True, exist_ok=True)
+    script.write_text(f"# {name}\n")
+    return script
+
+
+def test_imports_only_new_or_changed_scripts(tmp_path):
+    root = tmp_path / "dotfiles"
+    vim, zsh = make_script(root, "vim"), make_script(root, "zsh")
+    loader = Loader({"vim": [installer("vim", "v")], "zsh": [installer("zsh")]})
+
+    manifest = Manifest.load(root, [vim, zsh], loader)
+    assert sorted(loader.loaded) == sorted([vim, zsh])
+    assert [e.name for e in manifest.entries()] == ["vim", "zsh"]
+
+    loader.loaded.clear()
+    Manifest.load(root, [vim, zsh], loader)
+    assert loader.loaded == []
+
+    zsh.write_text("# zsh, edited\n")
+    manifest = Manifest.load(root, [vim, zsh], loader)
+    assert loader.loaded == [zsh]
+    assert manifest.lookup("v").script == vim
+
+
+def test_touched_but_unmodified_script_is_not_imported(tmp_path):
+    root = tmp_path / "dotfiles"
+    vim = make_script(root, "vim")
+    loader = Loader({"vim": [installer("vim")]})
+    Manifest.load(root, [vim], loader)
+
+    stat = vim.stat()
+    os.utime(vim, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    loader.loaded.clear()
+    manifest = Manifest.load(root, [vim], loader)
+
+    assert loader.loaded == []
+    assert not manifest.dirty
+
+
+def test_removed_scripts_are_dropped(tmp_path):
+    root = tmp_path / "dotfiles"
+    vim, zsh = make_script(root, "vim"), make_script(root, "zsh")
+    loader = Loader({"vim": [installer("vim")], "zsh": [installer("zsh")]})
+    Manifest.load(root, [vim, zsh], loader)
+
+    manifest = Manifest.load(root, [vim], loader)
+
+    assert [e.name for e in manifest.entries()] == ["vim"]
+    assert manifest.lookup("zsh") is None
+
+
+def test_manifest_for_another_root_is_ignored(tmp_path):
+    root = tmp_path / "dotfiles"
+    vim = make_script(root, "vim")
+    loader = Loader({"vim": [installer("vim")]})
+    path = tmp_path / "manifest.json"
+    Manifest.load(tmp_path / "elsewhere", [vim], loader, path=path)
+
+    loader.loaded.clear()
+    Manifest.load(root, [vim], loader, path=path)
+
+    assert loader.loaded == [vim]
+
+
+def test_completion_is_kept_until_a_script_changes(tmp_path):
+    root = tmp_path / "dotfiles"
+    vim = make_script(root, "vim")
+    loader = Loader({"vim": [installer("vim")]})
+    manifest = Manifest.load(root, [vim], loader)
+    manifest.completion = {"key": "1:di", "path": "_di"}
+    manifest.save()
+
+    stat = vim.stat()
+    os.utime(vim, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert Manifest.load(root, [vim], loader).completion == manifest.completion
+
+    vim.write_text("# vim, edited\n")
+    assert Manifest.load(root, [vim], loader).completion is None
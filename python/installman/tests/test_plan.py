@@ -0,0 +1,66 @@
+from fencing import CodeFence
+
+from installman import files
+from installman.plan import FencePlan, deferred_plans, plan_for
+
+VIM = CodeFence("### VIM ###", "### END VIM ###")
+GIT = CodeFence("### GIT ###", "### END GIT ###")
+
+
+def block(tmp_path, fence, body):
+    source = tmp_path / f"{fence.start.strip('# ').lower()}.block"
+    source.write_text(f"{fence.start}\n{body}\n{fence.end}\n")
+    return source
+
+
+def test_edits_to_one_file_are_written_once(tmp_path):
+    rc = tmp_path / "rc"
+    rc.write_text("# my rc\n")
+    written = files.write_stats.files_written
+
+    plan = FencePlan(rc)
+    plan.add(VIM, block(tmp_path, VIM, "alias v=vim"))
+    plan.add(GIT, block(tmp_path, GIT, "alias g=git"))
+    assert plan.commit(yes=True)
+
+    text = rc.read_text()
+    assert text.startswith("# my rc\n")
+    assert "alias v=vim" in text and "alias g=git" in text
+    assert files.write_stats.files_written == written + 1
+
+
+def test_replace_only_touches_its_block(tmp_path):
+    rc = tmp_path / "rc"
+    FencePlan(rc).add(VIM, block(tmp_path, VIM, "old")).add(
+        GIT, block(tmp_path, GIT, "git")
+    ).commit(yes=True)
+
+    change = FencePlan(rc).add(VIM, block(tmp_path, VIM, "new"), replace=True).change()
+
+    assert change is not None
+    assert "new" in change.after and "old" not in change.after
+    assert change.regions is not None and len(change.regions) == 1
+    assert change.after.count("git") == 1
+
+
+def test_installed_blocks_are_left_alone(tmp_path, capsys):
+    rc = tmp_path / "rc"
+    source = block(tmp_path, VIM, "alias v=vim")
+    FencePlan(rc).add(VIM, source).commit(yes=True)
+
+    assert FencePlan(rc).add(VIM, source).change() is None
+    assert "already installed" in capsys.readouterr().out
+
+
+def test_deferred_plans_share_one_plan_per_file(tmp_path):
+    rc = tmp_path / "rc"
+    with deferred_plans() as failures:
+        first = plan_for(rc).add(VIM, block(tmp_path, VIM, "alias v=vim"))
+        second = plan_for(rc).add(GIT, block(tmp_path, GIT, "alias g=git"))
+        assert first is second
+        assert not first.confirm(yes=True)
+        assert not rc.exists()
+
+    assert failures == {}
+    assert "alias v=vim" in rc.read_text() and "alias g=git" in rc.read_text()
+    assert plan_for(rc) is not first
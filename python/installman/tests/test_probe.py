@@ -0,0 +1,85 @@
+import os
+import stat
+
+import pytest
+
+from installman.probe import ProbeCache
+
+
+def tool(directory, name, body):
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / name
+    path.write_text(f"#!/bin/sh\n{body}\n")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return path
+
+
+@pytest.fixture
+def bin_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "bin"
+    calls = tmp_path / "calls"
+    tool(directory, "fake", f'echo run >> {calls}\necho "$XDG_CONFIG_HOME $FAKE_DIR"')
+    monkeypatch.setenv("PATH", f"{directory}{os.pathsep}{os.defpath}")
+    monkeypatch.setenv("XDG_CONFIG_HOME", "/config")
+    monkeypatch.delenv("FAKE_DIR", raising=False)
+    return directory
+
+
+def runs(tmp_path):
+    calls = tmp_path / "calls"
+    return len(calls.read_text().splitlines()) if calls.exists() else 0
+
+
+def test_which_is_remembered_across_caches(tmp_path, bin_dir):
+    path = tmp_path / "probes.json"
+
+    assert ProbeCache(path).which("fake") == str(bin_dir / "fake")
+    assert ProbeCache(path).which("fake") == str(bin_dir / "fake")
+    assert ProbeCache(path).which("missing") is None
+
+
+def test_which_sees_a_new_binary_earlier_on_path(tmp_path, bin_dir, monkeypatch):
+    earlier = tmp_path / "earlier"
+    earlier.mkdir()
+    monkeypatch.setenv("PATH", f"{earlier}{os.pathsep}{os.environ['PATH']}")
+    cache = ProbeCache(tmp_path / "probes.json")
+    assert cache.which("fake") == str(bin_dir / "fake")
+
+    tool(earlier, "fake", "echo newer")
+
+    assert cache.which("fake") == str(earlier / "fake")
+
+
+def test_output_is_cached_until_the_binary_changes(tmp_path, bin_dir):
+    cache = ProbeCache(tmp_path / "probes.json")
+
+    assert cache.output(["fake"]) == "/config \n"
+    assert cache.output(["fake"]) == "/config \n"
+    assert runs(tmp_path) == 1
+
+    tool(bin_dir, "fake", f"echo run >> {tmp_path / 'calls'}\necho changed")
+
+    assert cache.output(["fake"]) == "changed\n"
+    assert runs(tmp_path) == 2
+
+
+def test_output_is_keyed_by_environment(tmp_path, bin_dir, monkeypatch):
+    cache = ProbeCache(tmp_path / "probes.json")
+    assert cache.output(["fake"]) == "/config \n"
+
+    monkeypatch.setenv("XDG_CONFIG_HOME", "/elsewhere")
+    assert cache.output(["fake"]) == "/elsewhere \n"
+
+    monkeypatch.setenv("XDG_CONFIG_HOME", "/config")
+    assert cache.output(["fake"]) == "/config \n"
+    assert runs(tmp_path) == 2
+
+    monkeypatch.setenv("FAKE_DIR", "/fake")
+    assert cache.output(["fake"]) == "/config \n"
+    assert cache.output(["fake"], env=("FAKE_DIR",)) == "/config /fake\n"
+    assert runs(tmp_path) == 3
+
+
+def test_output_of_missing_tool(tmp_path, bin_dir):
+    with pytest.raises(FileNotFoundError):
+        ProbeCache(tmp_path / "probes.json").output(["missing", "--version"])
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from installman.proc import run_command
+
+
+def python(code: str) -> list[str]:
+    return [sys.executable, "-c", code]
+
+
+def test_streams_prefixed_output(capsys):
+    code = "import sys; print('one'); print('two', flush=True); sys.stderr.write('3')"
+    completed = asyncio.run(run_command(python(code), prefix="[py] "))
+
+    assert completed.returncode == 0
+    assert completed.output == "one\ntwo\n3"
+    assert capsys.readouterr().out == "[py] one\n[py] two\n[py] 3\n"
+
+
+def test_quiet_when_not_streaming(capsys):
+    completed = asyncio.run(run_command(python("print('hi')"), stream=False))
+
+    assert completed.output == "hi\n"
+    assert capsys.readouterr().out == ""
+
+
+def test_non_zero_exit():
+    code = "print('broken'); raise SystemExit(3)"
+    with pytest.raises(subprocess.CalledProcessError) as raised:
+        _ = asyncio.run(run_command(python(code), stream=False))
+    assert raised.value.returncode == 3
+    assert raised.value.output == "broken\n"
+
+    completed = asyncio.run(run_command(python(code), stream=False, check=False))
+    assert completed.returncode == 3
+
+
+def test_timeout_kills_the_command(tmp_path):
+    pid_file = tmp_path / "pid"
+    code = (
+        f"import os, time; open({str(pid_file)!r}, 'w').write(str(os.getpid())); "
+        "print('started', flush=True); time.sleep(60)"
+    )
+    started = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired) as raised:
+        _ = asyncio.run(run_command(python(code), timeout=1, stream=False))
+
+    assert time.monotonic() - started < 30
+    assert raised.value.output == "started\n"
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+
+def test_cancelling_kills_the_command(tmp_path):
+    pid_file = tmp_path / "pid"
+    code = (
+        f"import os, time; open({str(pid_file)!r}, 'w').write(str(os.getpid())); "
+        "time.sleep(60)"
+    )
+
+    async def cancel_once_started():
+        task = asyncio.ensure_future(run_command(python(code), stream=False))
+        while not pid_file.exists() or not pid_file.read_text():
+            await asyncio.sleep(0.01)
+        _ = task.cancel()
+        await task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(cancel_once_started())
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+from fencing import CodeFence
+
+from installman import install_all, installer
+from installman.plan import plan_for
+from installman.schedule import Job, run_jobs, topological_order
+
+
+def test_topological_order():
+    jobs = [
+        Job("c", lambda: None, ("b",)),
+        Job("b", lambda: None, ("a",)),
+        Job("a", lambda: None),
+    ]
+
+    assert topological_order(jobs) == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize(
+    "jobs, message",
+    [
+        ([Job("a", lambda: None, ("missing",))], "not scheduled"),
+        ([Job("a", lambda: None, ("b",)), Job("b", lambda: None, ("a",))], "cycle"),
+    ],
+)
+def test_invalid_requirements(jobs, message):
+    with pytest.raises(ValueError, match=message):
+        topological_order(jobs)
+
+
+def test_jobs_wait_for_their_requirements():
+    finished = []
+    lock = threading.Lock()
+
+    def job(name, *requires):
+        def run():
+            with lock:
+                assert all(dep in finished for dep in requires)
+                finished.append(name)
+
+        return Job(name, run, requires)
+
+    schedule = run_jobs(
+        [job("d", "b", "c"), job("b", "a"), job("c", "a"), job("a")], max_workers=4
+    )
+
+    assert schedule.ok
+    assert finished[0] == "a" and finished[-1] == "d"
+    assert [r.name for r in schedule.results] == ["a", "b", "c", "d"]
+
+
+def test_independent_jobs_run_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+    jobs = [Job(name, barrier.wait) for name in "abc"]
+
+    assert run_jobs(jobs, max_workers=3).ok
+
+
+def test_failure_skips_dependents_only():
+    def fail():
+        raise RuntimeError("boom")
+
+    schedule = run_jobs(
+        [
+            Job("a", fail),
+            Job("b", lambda: None, ("a",)),
+            Job("c", lambda: None, ("b",)),
+            Job("d", lambda: None),
+        ]
+    )
+    results = {r.name: r for r in schedule.results}
+
+    assert not schedule.ok
+    assert results["a"].status == "failed"
+    assert isinstance(results["a"].error, RuntimeError)
+    assert (results["b"].status, results["b"].blocked_by) == ("skipped", "a")
+    assert (results["c"].status, results["c"].blocked_by) == ("skipped", "b")
+    assert results["d"].status == "ok"
+    assert "RuntimeError: boom" in schedule.summary()
+
+
+def test_install_all_writes_other_plans_when_one_fails(tmp_path, capsys):
+    fence = CodeFence("### MARK ###", "### END MARK ###")
+    source = tmp_path / "block"
+    source.write_text("### MARK ###\nexport X=1\n### END MARK ###\n")
+    (tmp_path / "not-a-dir").write_text("")
+    broken = tmp_path / "not-a-dir" / "rc"
+    good = tmp_path / "rc"
+
+    def edits(path):
+        def install(args):
+            plan_for(path).add(fence, source).confirm(yes=True)
+
+        return install
+
+    installers = [
+        installer("broken", all_args=[])(edits(broken)),
+        installer("good", all_args=[])(edits(good)),
+    ]
+
+    assert not install_all(installers, yes=True)
+
+    assert "export X=1" in good.read_text()
+    summary = capsys.readouterr().out.split("Finished in")[1]
+    assert f"write {broken}" in summary
+    assert "failed" in summary
@@ -0,0 +1,63 @@
+import pytest
+
+from installman import symlink_rec
+from installman.symlinks import plan_symlinks
+
+
+@pytest.fixture
+def source(tmp_path):
+    source = tmp_path / "source"
+    (source / "lua").mkdir(parents=True)
+    _ = (source / "init.lua").write_text("init\n")
+    _ = (source / "lua" / "plugins.lua").write_text("plugins\n")
+    return source
+
+
+def test_links_every_file(tmp_path, source):
+    destination = tmp_path / "nvim"
+    plan = symlink_rec(source, destination, quiet=True)
+
+    assert len(plan.create) == 2
+    assert (destination / "lua").is_dir() and not (destination / "lua").is_symlink()
+    assert (destination / "init.lua").resolve() == source / "init.lua"
+    assert (destination / "lua" / "plugins.lua").read_text() == "plugins\n"
+
+
+def test_correct_links_are_left_alone(tmp_path, source):
+    destination = tmp_path / "nvim"
+    _ = symlink_rec(source, destination, quiet=True)
+
+    plan = plan_symlinks(source, destination)
+    assert plan.correct == 2
+    assert not plan.changes
+    assert plan.conflicts == []
+
+
+def test_existing_files_are_conflicts(tmp_path, source):
+    destination = tmp_path / "nvim"
+    destination.mkdir()
+    _ = (destination / "init.lua").write_text("mine\n")
+
+    plan = symlink_rec(source, destination, quiet=True)
+    assert plan.conflicts == [destination / "init.lua"]
+    assert (destination / "init.lua").read_text() == "mine\n"
+    assert (destination / "lua" / "plugins.lua").is_symlink()
+
+
+def test_stale_links_are_removed(tmp_path, source):
+    destination = tmp_path / "nvim"
+    _ = symlink_rec(source, destination, quiet=True)
+    (source / "lua" / "plugins.lua").rename(source / "lua" / "lazy.lua")
+
+    plan = symlink_rec(source, destination, quiet=True)
+    assert plan.stale == [destination / "lua" / "plugins.lua"]
+    assert not (destination / "lua" / "plugins.lua").is_symlink()
+    assert (destination / "lua" / "lazy.lua").resolve() == source / "lua" / "lazy.lua"
+
+
+def test_missing_parent_directories_are_created(tmp_path, source):
+    # ~/.config/nvim on a fresh HOME
+    destination = tmp_path / "home" / ".config" / "nvim"
+    _ = symlink_rec(source, destination, quiet=True)
+
+    assert (destination / "init.lua").resolve() == source / "init.lua"
@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+import time
+
+from installman.timing import Recorder
+
+
+def contains(outer, inner):
+    return outer.start_ns <= inner.start_ns and inner.end_ns <= outer.end_ns
+
+
+def test_nothing_is_recorded_until_enabled():
+    recorder = Recorder()
+    with recorder.span("install vim") as span:
+        assert span is None
+
+    assert recorder.spans == []
+
+
+def test_nested_spans():
+    recorder = Recorder()
+    recorder.enable()
+    with recorder.span("install zsh", "install"):
+        with recorder.span("diff ~/.zshrc", "diff"):
+            time.sleep(0.01)
+        with recorder.span("write ~/.zshrc", "write"):
+            pass
+
+    diff, write, install = recorder.spans
+    # a span is added when it ends, so children come before their parent
+    assert [s.name for s in recorder.spans] == [
+        "diff ~/.zshrc",
+        "write ~/.zshrc",
+        "install zsh",
+    ]
+    # the trace viewer nests spans of one thread by their times
+    assert contains(install, diff) and contains(install, write)
+    assert diff.end_ns <= write.start_ns
+    assert install.seconds >= diff.seconds + write.seconds
+    assert diff.seconds >= 0.01
+    assert {s.thread for s in recorder.spans} == {threading.get_ident()}
+
+
+def test_chrome_trace(tmp_path):
+    recorder = Recorder()
+    recorder.enable()
+    with recorder.span("install tmux", "install", args=["--yes"]):
+        with recorder.span("git clone tpm", "subprocess"):
+            time.sleep(0.01)
+
+    def in_a_thread():
+        with recorder.span("in a thread"):
+            pass
+
+    thread = threading.Thread(target=in_a_thread)
+    thread.start()
+    thread.join()
+
+    path = tmp_path / "trace.json"
+    recorder.write_trace(path)
+    trace = json.loads(path.read_text())
+
+    assert trace["displayTimeUnit"] == "ms"
+    clone, install, threaded = trace["traceEvents"]
+    for event, span in zip(trace["traceEvents"], recorder.spans):
+        assert event["ph"] == "X"
+        assert event["pid"] == os.getpid()
+        assert event["tid"] == span.thread
+        # microseconds since recording was enabled
+        assert event["ts"] == (span.start_ns - recorder.origin_ns) / 1000
+        assert event["dur"] == (span.end_ns - span.start_ns) / 1000
+        assert event["ts"] >= 0
+    assert (clone["name"], clone["cat"]) == ("git clone tpm", "subprocess")
+    assert install["args"] == {"args": "['--yes']"}
+    assert 10_000 <= clone["dur"] <= install["dur"]
+    assert install["ts"] <= clone["ts"]
+    assert clone["ts"] + clone["dur"] <= install["ts"] + install["dur"]
+    assert threaded["name"] == "in a thread"
+    assert threaded["tid"] == thread.ident != install["tid"]
@@ -0,0 +1,144 @@
+import importlib.util
+import os
+import re
+from argparse import ArgumentParser
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[3]
+
+
+@pytest.fixture(scope="module")
+def zsh_install():
+    path = ROOT / "zsh" / "install.py"
+    spec = importlib.util.spec_from_file_location("zsh_install", path)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def started(tmp_path, monkeypatch):
+    """A stub zsh on PATH, saving the .zshrc of every start under the log dir."""
+    bin, log = tmp_path / "bin", tmp_path / "log"
+    bin.mkdir()
+    log.mkdir()
+    zsh = bin / "zsh"
+    _ = zsh.write_text(
+        '#!/bin/sh\ncp "$ZDOTDIR/.zshrc" "$ZSH_LOG/$(basename "$ZDOTDIR").$$"\n'
+    )
+    zsh.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("ZSH_LOG", str(log))
+
+    def rcs() -> dict[str, str]:
+        """The rc each variant started with, by variant."""
+        return {p.name.split(".")[0]: p.read_text() for p in log.iterdir()}
+
+    return rcs
+
+
+ALIASES = (ROOT / "zsh" / "aliases.sh").read_text()
+# the block as it is in zsh/aliases.sh, so block_sources can find it there
+ALIAS_BLOCK = ALIASES[: ALIASES.rindex("### ALIAS ###")] + "### ALIAS ###"
+SLOW_BLOCK = "## SLOW ##\nsleep 1\n## SLOW ##"
+
+RC = (
+    "export EDITOR=nvim\n"
+    f"{ALIAS_BLOCK}\n"
+    f"{SLOW_BLOCK}\n"
+    "# a lone ### NOTE ### marker is not a block\n"
+)
+
+
+def test_rc_fences_need_a_marker_twice(zsh_install):
+    text = "## A.B ##\nx\n## A.B ##\n### ONCE ###\n"
+
+    (fence,) = zsh_install.rc_fences(text)
+
+    assert fence.first_block(text) is not None
+    assert fence.first_block("## AxB ##\nx\n## AxB ##\n") is None
+    assert zsh_install.rc_fences(RC) == [
+        zsh_install.CodeFence.symettric(re.escape(marker))
+        for marker in ("### ALIAS ###", "## SLOW ##")
+    ]
+
+
+def test_block_sources_finds_the_snippet_files(tmp_path, zsh_install):
+    fences = zsh_install.rc_fences(RC)
+    _ = (tmp_path / "zsh").mkdir()
+    _ = (tmp_path / "zsh" / "aliases.sh").write_text(ALIAS_BLOCK)
+    _ = (tmp_path / "zsh" / "install.py").write_text(RC)
+
+    sources = zsh_install.block_sources(fences, tmp_path)
+
+    assert sources == {fences[0]: tmp_path / "zsh" / "aliases.sh"}
+
+
+def test_profile_times_the_rc_without_each_block(
+    tmp_path, zsh_install, started, capsys
+):
+    rc = tmp_path / ".zshrc"
+    _ = rc.write_text(RC)
+
+    zsh_install.profile_rc(rc, runs=2)
+
+    rcs = started()
+    without_aliases = RC.replace(ALIAS_BLOCK, "")
+    assert rcs == {
+        "full": RC,
+        "empty": "",
+        "unfenced": without_aliases.replace(SLOW_BLOCK, ""),
+        "block0": without_aliases,
+        "block1": RC.replace(SLOW_BLOCK, ""),
+    }
+    out = capsys.readouterr().out
+    assert "Timing 5 variants" in out
+    assert "(median of 2 runs, removed blocks)" in out
+    lines = {line.split()[0]: line for line in out.splitlines() if "ms ±" in line}
+    assert "zsh/aliases.sh" in lines["ALIAS"]
+    assert "(not in dotfiles)" in lines["SLOW"]
+
+
+def test_profile_subcommand_isolates_blocks(tmp_path, zsh_install, started, capsys):
+    rc = tmp_path / ".zshrc"
+    _ = rc.write_text(RC)
+    parser = ArgumentParser()
+    subparsers = parser.add_subparsers(dest="subcommand")
+    zsh_install.install_zsh._setup_parser(
+        zsh_install.install_zsh._setup_subparser(subparsers)
+    )
+
+    args = parser.parse_args(
+        ["zsh", "profile", "--isolate", "-n", "1", "--rc", str(rc)]
+    )
+    assert args.journal is False
+    zsh_install.install_zsh.run(args)
+
+    rcs = started()
+    assert rcs["block0"] == ALIAS_BLOCK
+    assert rcs["block1"] == SLOW_BLOCK
+    assert "(median of 1 runs, isolated blocks)" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    ("make_rc", "message"),
+    [
+        (lambda rc: None, "No rc file at {rc}, nothing to profile"),
+        (lambda rc: rc.mkdir(), "Could not read {rc}: "),
+        (lambda rc: rc.write_bytes(b"\xff\xfe"), "Could not read {rc}: "),
+    ],
+    ids=["missing", "directory", "not-utf8"],
+)
+def test_unreadable_rc_is_reported(
+    tmp_path, zsh_install, started, capsys, make_rc, message
+):
+    rc = tmp_path / ".zshrc"
+    make_rc(rc)
+
+    zsh_install.profile_rc(rc)
+
+    assert capsys.readouterr().out.startswith(message.format(rc=rc))
+    assert started() == {}
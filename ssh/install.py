@@ -1,9 +1,8 @@
-import os
 from argparse import ArgumentParser, Namespace
 from pathlib import Path
 
-from fencing import CodeFence, copy_block
-from installman import SingleFileChange, confirm, confirm_dir, dependency, installer
+from fencing import CodeFence
+from installman import confirm_dir, installer, plan_for
 
 HERE = Path(__file__).parent
 HOME = Path.home()
@@ -14,13 +13,16 @@ SSH_MULTIPLEXING_FENCE = CodeFence(
 )
 
 
-@installer("ssh", help="add ssh configuration snippets")
+@installer(
+    "ssh",
+    all_args=[],
+    inputs=[HERE / "multiplexing"],
+    outputs=[HOME / ".ssh" / "config"],
+    brew=["autossh"],
+    help="add ssh configuration snippets",
+)
 def install_ssh(args: Namespace):
     """Configure SSH multiplexing in ~/.ssh/config."""
-    if not args.no_install:
-        brew = dependency("brew")
-        os.system(f"{brew} install autossh")
-
     ssh_dir = HOME / ".ssh"
     ssh_config = ssh_dir / "config"
     sockets_dir = ssh_dir / "sockets"
@@ -28,16 +30,12 @@ def install_ssh(args: Namespace):
     _ = confirm_dir(ssh_dir, yes=args.yes)
     _ = confirm_dir(sockets_dir, yes=args.yes)
 
-    existing_config = ssh_config.read_text()
-
-    before, after, changed = copy_block(
+    plan_for(ssh_config).add(
         fence=SSH_MULTIPLEXING_FENCE,
         source=HERE / "multiplexing",
-        existing_content=existing_config,
         replace=True,
-    )
-
-    SingleFileChange(before, after, ssh_config).confirm(
+        label="ssh multiplexing",
+    ).confirm(
         yes=args.yes,
     )
 
@@ -1,25 +1,40 @@
-import subprocess
 from argparse import ArgumentParser, Namespace
 from pathlib import Path
 
-from fencing import CodeFence, copy_block
+from fencing import CodeFence
 from installman import (
     confirm,
     confirm_brewed,
     confirm_dir,
     confirm_symlink,
     installer,
+    note_skipped,
     path_exists,
+    plan_for,
+    run_command,
 )
 
 HERE = Path(__file__).parent
 HOME = Path.home()
 TPM_DIR = HOME / ".tmux" / "plugins" / "tpm"
 TPM_URL = "https://github.com/tmux-plugins/tpm"
-
-
-@installer("tmux", help="install tmux config with TPM (Tmux Plugin Manager)")
-def install_tmux(args: Namespace):
+GIT_TIMEOUT = 120
+PLUGINS_TIMEOUT = 300
+
+
+@installer(
+    "tmux",
+    all_args=[],
+    inputs=[HERE / "tmux.conf", HERE / "shell_functions.sh"],
+    outputs=lambda args: [
+        HOME / ".tmux.conf",
+        HOME / ".zshrc",
+        *([] if args.no_tpm else [TPM_DIR]),
+    ],
+    brew=["tmux"],
+    help="install tmux config with TPM (Tmux Plugin Manager)",
+)
+async def install_tmux(args: Namespace):
     """Install tmux configuration with TPM setup."""
     tmux_config = HOME / ".tmux.conf"
     source_config = HERE / "tmux.conf"
@@ -30,11 +45,12 @@ def install_tmux(args: Namespace):
         print(
             "tmux not available. Install tmux first or use --yes to install automatically."
         )
+        note_skipped()
         return
 
     # Install TPM if not already installed
     if not args.no_tpm:
-        install_tpm(tpm_dir=TPM_DIR, yes=args.yes)
+        await install_tpm(tpm_dir=TPM_DIR, yes=args.yes)
 
     # Use confirm_symlink helper to handle symlink creation
     if not confirm_symlink(
@@ -44,6 +60,7 @@ def install_tmux(args: Namespace):
         backup=True,
     ):
         print("OK, aborting then :p")
+        note_skipped()
         return
 
     # Install TPM plugins if TPM is installed
@@ -58,28 +75,27 @@ def install_tmux(args: Namespace):
             install_plugins_path = TPM_DIR / "bin" / "install_plugins"
             if path_exists(install_plugins_path):
                 try:
-                    subprocess.run([str(install_plugins_path)], check=False)
+                    await run_command(
+                        [install_plugins_path], check=False, timeout=PLUGINS_TIMEOUT
+                    )
                 except Exception as e:
                     print(f"Could not automatically install plugins: {e}")
                     print(
                         "Please run manually: ~/.tmux/plugins/tpm/bin/install_plugins"
                     )
 
-    _, new, changed = copy_block(
+    plan_for(HOME / ".zshrc").add(
         CodeFence.symettric("### TMUX Functions ###"),
         HERE / "shell_functions.sh",
-        (HOME / ".zshrc").read_text(),
         replace=True,
+        label="tmux shell functions",
+    ).confirm(
+        # the shell functions have always been added without asking
+        yes=True
     )
 
-    if changed:
-        print("Addding shell functions...")
-        (HOME / ".zshrc").write_text(new)
-    else:
-        print("Shell functions are already added in the .zshrc")
-
 
-def install_tpm(tpm_dir: Path, yes: bool = False) -> None:
+async def install_tpm(tpm_dir: Path, yes: bool = False) -> None:
     """Install TPM (Tmux Plugin Manager) if not already installed."""
     # Check if TPM is already installed using path_exists helper
     if path_exists(tpm_dir):
@@ -98,20 +114,21 @@ def install_tpm(tpm_dir: Path, yes: bool = False) -> None:
     confirm_dir(tpm_dir.parent, yes=yes)
 
     try:
-        subprocess.run(
-            ["git", "clone", TPM_URL, str(tpm_dir)],
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
+        await run_command(
+            ["git", "clone", TPM_URL, tpm_dir],
+            timeout=GIT_TIMEOUT,
+            stream=False,
         )
         print(f"TPM installed successfully at {tpm_dir}")
     except FileNotFoundError:
         print("git not found. Please install git first or install TPM manually:")
         print(f"git clone {TPM_URL} {tpm_dir}")
+        note_skipped()
 
     except Exception as e:
         print(f"Failed to install TPM: {e}")
         print(f"Please install manually: git clone {TPM_URL} {tpm_dir}")
+        note_skipped()
 
 
 @install_tmux.parser
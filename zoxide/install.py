@@ -1,8 +1,8 @@
 from argparse import ArgumentParser, Namespace
 from pathlib import Path
 
-from fencing import CodeFence, copy_block
-from installman import SingleFileChange, confirm_brewed, installer
+from fencing import CodeFence
+from installman import confirm_brewed, installer, note_skipped, plan_for
 
 HERE = Path(__file__).parent
 HOME = Path.home()
@@ -13,7 +13,15 @@ ZOXIDE_FENCE = CodeFence(
 )
 
 
-@installer("zoxide", help="install zoxide and configure shell integration")
+@installer(
+    "zoxide",
+    requires=["zsh"],  # zoxide init has to come after compinit in the .zshrc
+    all_args=[],
+    inputs=[HERE / "init.sh"],
+    outputs=[HOME / ".zshrc"],
+    brew=["zoxide"],
+    help="install zoxide and configure shell integration",
+)
 def install_zoxide(args: Namespace):
     """Install zoxide and add initialization to .zshrc."""
     # Install zoxide if not already installed
@@ -22,31 +30,16 @@ def install_zoxide(args: Namespace):
         print(
             "zoxide not available. Install zoxide first or use --yes to install automatically."
         )
+        note_skipped()
         return
 
-    # Read existing .zshrc if it exists
-    rc_path = HOME / ".zshrc"
-    if rc_path.exists():
-        rc_sh = rc_path.read_text()
-    else:
-        rc_sh = ""
-
     # Add zoxide initialization to .zshrc
-    before, after, changed = copy_block(
+    plan_for(HOME / ".zshrc").add(
         fence=ZOXIDE_FENCE,
         source=HERE / "init.sh",
-        existing_content=rc_sh,
         replace=args.replace,
-    )
-    
-    if not changed:
-        print(
-            "zoxide config already installed! Use --replace if you want to overwrite it"
-        )
-        return
-    
-    change = SingleFileChange(before, after, rc_path)
-    change.confirm(yes=args.yes)
+        label="zoxide config",
+    ).confirm(yes=args.yes)
 
 
 @install_zoxide.parser
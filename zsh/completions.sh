@@ -1,4 +1,6 @@
 ### COMPLETIONS ###
+# _dotinstall, generated by install.py whenever the installers change
+fpath=("${INSTALLMAN_STATE_DIR:-${XDG_STATE_HOME:-$HOME/.local/state}/installman}/completions" $fpath)
 autoload -Uz compinit
 compinit
 ### COMPLETIONS ###
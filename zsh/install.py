@@ -1,8 +1,15 @@
+from __future__ import annotations
+
+import os
 from argparse import ArgumentParser, Namespace
 from pathlib import Path
 
-from fencing import CodeFence, copy_block
-from installman import SingleFileChange, installer
+from fencing import CodeFence
+from installman import dependency, installer
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from fencing import IndexedBlock
 
 HERE = Path(__file__).parent
 HOME = Path.home()
@@ -46,34 +53,36 @@ configs = {
 }
 
 
-@installer("zsh", help="install zsh config snippets")
+@installer(
+    "zsh",
+    requires=["bin"],  # the wrappers call scripts from bin
+    all_args=["--replace", "all"],
+    inputs=[conf["source"] for conf in configs.values()],  # pyright: ignore
+    outputs=[HOME / ".zshrc"],
+    help="install zsh config snippets",
+)
 def install_zsh(args: Namespace):
-    rc_path = HOME / ".zshrc"
-    # Read existing config if it exists
-    if rc_path.exists():
-        rc_sh = rc_path.read_text()
-    else:
-        rc_sh = ""
+    if args.config == "profile":
+        profile_rc(args.rc, runs=args.runs, isolate=args.isolate)
+        return
+
+    from installman import plan_for
 
     if args.config == "all":
         _configs = configs
     else:
         _configs = {args.config: configs[args.config]}
 
-    for conf in _configs.values():
-        before, after, changed = copy_block(
+    # every block goes into one read, one diff and one write of the .zshrc
+    plan = plan_for(HOME / ".zshrc")
+    for name, conf in _configs.items():
+        plan.add(
             fence=conf["fence"],  # pyright: ignore
             source=conf["source"],  # pyright: ignore
-            existing_content=rc_sh,
             replace=args.replace,
+            label=name,
         )
-        if not changed:
-            print(
-                "you already have this config installed! Use --replace if you want to overwrite it"
-            )
-            continue
-        change = SingleFileChange(before, after, rc_path)
-        change.confirm(yes=args.yes)
+    plan.confirm(yes=args.yes)
 
 
 @install_zsh.parser
@@ -96,3 +105,182 @@ def setup_zsh_args(parser: ArgumentParser):
         _help: str = v.get("help") or ""  # pyright: ignore[reportAssignmentType]
         parser_configs.add_parser(k, help=_help)
     parser_configs.add_parser("all", help="The Kitchen Sink")
+
+    profile = parser_configs.add_parser(
+        "profile", help="time what each block of the .zshrc adds to shell start up"
+    )
+    _ = profile.add_argument(
+        "-n", "--runs", type=int, default=10, help="timed shell starts per variant"
+    )
+    _ = profile.add_argument(
+        "--isolate",
+        action="store_true",
+        help="time each block on its own, instead of the rc without it",
+    )
+    _ = profile.add_argument(
+        "--rc", type=Path, default=HOME / ".zshrc", help="rc file to profile"
+    )
+    # only reports, so running it again should never be skipped
+    profile.set_defaults(journal=False)
+
+
+# a symmetric `### NAME ###` marker, on a line of its own
+MARKER = r"(?m)^(#{2,} [^\n]*? #{2,})[ \t]*$"
+
+
+def rc_fences(text: str) -> list[CodeFence]:
+    """A fence for every marker that appears at least twice in text."""
+    # only profile needs these, not every `install.py zsh` run
+    import re
+    from collections import Counter
+
+    counts = Counter(match.group(1) for match in re.finditer(MARKER, text))
+    return [CodeFence.symettric(re.escape(m)) for m, n in counts.items() if n >= 2]
+
+
+def block_sources(fences: list[CodeFence], root: Path) -> dict[CodeFence, Path]:
+    """The snippet file in the dotfiles that each fence's block comes from."""
+    sources: dict[CodeFence, Path] = {}
+    for path in sorted(root.glob("*/*")):
+        if path.suffix == ".py" or not path.is_file() or path.stat().st_size > 2**20:
+            continue
+        try:
+            text = path.read_text()
+        except (OSError, UnicodeDecodeError):
+            continue
+        for fence in fences:
+            if fence not in sources and fence.first_block(text) is not None:
+                sources[fence] = path
+    return sources
+
+
+def _time_startup(zsh: str, zdotdir: Path) -> float:
+    import subprocess
+    import time
+
+    started = time.perf_counter()
+    _ = subprocess.run(
+        [zsh, "-i", "-c", "exit"],
+        env={**os.environ, "ZDOTDIR": str(zdotdir)},
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - started
+
+
+def _block_name(block: IndexedBlock) -> str:
+    return block.block.text.splitlines()[0].strip("# \t")
+
+
+def profile_rc(rc: Path, runs: int = 10, isolate: bool = False):
+    """Report how many milliseconds each top-level block of rc adds to start up.
+
+    Every variant of the rc (as is, empty, without any blocks and one per
+    block, either without that block or with only that block when isolate)
+    gets its own ZDOTDIR and is started `runs` times with `zsh -i -c exit`,
+    taking turns so drift on the machine hits all of them alike. A block
+    costs the difference between the median start up with and without it,
+    give or take the combined standard error.
+    """
+    import shutil
+    import statistics
+    import tempfile
+
+    from fencing import BlockIndex
+
+    zsh = dependency("zsh")
+    if zsh is None:
+        print("zsh is not installed")
+        return
+
+    try:
+        text = rc.read_text()
+    except FileNotFoundError:
+        print(f"No rc file at {rc}, nothing to profile")
+        return
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Could not read {rc}: {e}")
+        return
+    fences = rc_fences(text)
+    index = BlockIndex(text, fences, block_sources(fences, HERE.parent))
+    blocks = [b for b in index.blocks if b.parent is None]
+
+    unfenced, position = [], 0
+    for block in blocks:
+        start, end = block.block.block_location
+        unfenced.append(text[position:start])
+        position = end
+    unfenced.append(text[position:])
+
+    variants = {"full": text, "empty": "", "unfenced": "".join(unfenced)}
+    for i, block in enumerate(blocks):
+        start, end = block.block.block_location
+        variants[f"block{i}"] = (
+            block.block.text if isolate else text[:start] + text[end:]
+        )
+
+    samples: dict[str, list[float]] = {key: [] for key in variants}
+    with tempfile.TemporaryDirectory(prefix="zsh-profile-") as tmp:
+        zdotdirs: dict[str, Path] = {}
+        for key, content in variants.items():
+            # a directory each, compinit keeps a .zcompdump per variant
+            zdotdir = zdotdirs[key] = Path(tmp) / key
+            zdotdir.mkdir()
+            _ = (zdotdir / ".zshrc").write_text(content)
+            if (HOME / ".zshenv").is_file():
+                _ = shutil.copy(HOME / ".zshenv", zdotdir / ".zshenv")
+
+        print(f"Timing {len(variants)} variants of {rc}, {runs} runs each...")
+        # first starts write caches like .zcompdump, they aren't counted
+        for zdotdir in zdotdirs.values():
+            _ = _time_startup(zsh, zdotdir)
+        for _ in range(runs):
+            for key, zdotdir in zdotdirs.items():
+                samples[key].append(_time_startup(zsh, zdotdir))
+
+    median = {key: statistics.median(times) for key, times in samples.items()}
+
+    def error(*keys: str) -> float:
+        if runs < 2:
+            return 0.0
+        return sum(statistics.variance(samples[k]) / runs for k in keys) ** 0.5
+
+    def cost(key: str) -> tuple[float, float]:
+        """ms the block adds, and the standard error of that."""
+        if isolate:
+            return median[key] - median["empty"], error(key, "empty")
+        return median["full"] - median[key], error("full", key)
+
+    ms = 1000
+    print(
+        f"{rc}: {median['full'] * ms:.1f}ms ±{error('full') * ms:.1f}"
+        f" to start, {median['empty'] * ms:.1f}ms with an empty rc"
+        f" (median of {runs} runs, {'isolated' if isolate else 'removed'} blocks)"
+    )
+
+    rows: list[tuple[str, str, float, float]] = []
+    per_source: dict[str, float] = {}
+    for i, block in enumerate(blocks):
+        seconds, err = cost(f"block{i}")
+        source = (
+            str(block.source.relative_to(HERE.parent))
+            if block.source
+            else "(not in dotfiles)"
+        )
+        rows.append((_block_name(block), source, seconds, err))
+        per_source[source] = per_source.get(source, 0.0) + seconds
+    outside = median["unfenced"] - median["empty"]
+    rows.append(("(outside any block)", "-", outside, error("unfenced", "empty")))
+
+    width = max(len(name) for name, *_ in rows)
+    source_width = max(len(source) for _, source, *_ in rows)
+    for name, source, seconds, err in sorted(rows, key=lambda r: -r[2]):
+        print(
+            f"  {name:<{width}}  {source:<{source_width}}"
+            f"  {seconds * ms:7.1f}ms ±{err * ms:.1f}"
+        )
+
+    print("By source file:")
+    for source, seconds in sorted(per_source.items(), key=lambda s: -s[1]):
+        print(f"  {source:<{source_width}}  {seconds * ms:7.1f}ms")